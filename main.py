@@ -10,16 +10,19 @@ from pathlib import Path
 # Add src to path
 sys.path.append(str(Path(__file__).parent / "src"))
 
+# Only lightweight modules are imported here; torch, timm, pandas etc. are
+# imported inside the modes that need them so the CLI starts fast
 from src.config.config import MIDASConfig
 from src.utils.helpers import setup_logging, set_seed, log_system_info
-from src.data.dataloader import DataManager
-from src.models.model import ModelFactory
+
+# Modes that skip seeding and system/device info; they don't build or run models
+LIGHT_MODES = {"register", "convert"}
 
 def main():
     """Main function to run MIDAS system."""
     
     parser = argparse.ArgumentParser(description="MIDAS - Skin Cancer Detection System")
-    parser.add_argument("--mode", choices=["train", "api", "test"], default="api",
+    parser.add_argument("--mode", choices=["train", "api", "test", "bench", "export", "quantize", "register", "loadtest", "convert"], default="api",
                        help="Mode to run the system in")
     parser.add_argument("--model", default="efficientnet_b0",
                        help="Model architecture to use")
@@ -29,6 +32,35 @@ def main():
                        help="Batch size for training")
     parser.add_argument("--lr", type=float, default=0.001,
                        help="Learning rate")
+    parser.add_argument("--suite", choices=["preprocessing", "decode", "backends", "fastmath", "imports", "models", "checkpoint"],
+                       default="preprocessing",
+                       help="Benchmark suite to run in bench mode")
+    parser.add_argument("--iterations", type=int, default=200,
+                       help="Timed iterations per benchmark case")
+    parser.add_argument("--checkpoint", default=None,
+                       help="Checkpoint to export (defaults to models/trained/best_model.pth)")
+    parser.add_argument("--output", default=None,
+                       help="Output path for exported or converted models")
+    parser.add_argument("--quantization", choices=["dynamic", "static"], default="static",
+                       help="Quantization mode: INT8 head only, or calibrated INT8 backbone plus head")
+    parser.add_argument("--version", default=None,
+                       help="Version name when registering a model (defaults to a timestamp)")
+    parser.add_argument("--url", default=None,
+                       help="Base URL of a running API to load test (defaults to an in-process app)")
+    parser.add_argument("--endpoint", choices=["/predict", "/batch_predict"], default="/predict",
+                       help="Endpoint to load test")
+    parser.add_argument("--concurrency", type=int, default=8,
+                       help="Closed-loop load-test clients")
+    parser.add_argument("--rate", type=float, default=None,
+                       help="Open-loop arrival rate in requests/sec (overrides --concurrency)")
+    parser.add_argument("--duration", type=float, default=30.0,
+                       help="Measured load-test duration in seconds, after a 5 s warmup")
+    parser.add_argument("--batch-files", type=int, default=4,
+                       help="Images per /batch_predict load-test request")
+    parser.add_argument("--images", default=None,
+                       help="Directory of sample lesion images to replay (defaults to synthetic images)")
+    parser.add_argument("--untrained", action="store_true",
+                       help="Let the in-process load-test app serve untrained weights")
     
     args = parser.parse_args()
     
@@ -37,32 +69,31 @@ def main():
     config.num_epochs = args.epochs
     config.batch_size = args.batch_size
     config.learning_rate = args.lr
+    config.ensure_dirs()
     
     # Setup logging
     logger = setup_logging(config.logs_dir, config.project_name)
     
-    # Set random seed
-    set_seed(config.seed)
-    logger.info(f"Random seed set to {config.seed}")
-    
-    # Log system information
-    log_system_info(logger)
+    if args.mode not in LIGHT_MODES:
+        # Set random seed
+        set_seed(config.seed)
+        logger.info(f"Random seed set to {config.seed}")
+        
+        # Log system information
+        log_system_info(logger)
     
     if args.mode == "api":
         # Run API server
         logger.info("Starting API server...")
-        import uvicorn
-        from src.api.inference_api import app
-        
-        uvicorn.run(
-            app,
-            host=config.api_host,
-            port=config.api_port,
-            log_level="info"
-        )
+        from src.api.server import serve
+        
+        serve(config, logger, log_level="info")
     
     elif args.mode == "train":
         # Training mode (to be implemented)
+        from src.data.dataloader import DataManager
+        from src.models.model import ModelFactory
+        
         logger.info("Training mode - To be implemented")
         logger.info(f"Model: {args.model}")
         logger.info(f"Epochs: {config.num_epochs}")
@@ -85,13 +116,22 @@ def main():
             pretrained=True
         )
         
-        model_info = ModelFactory.get_model_info(args.model)
+        model_info = ModelFactory.get_model_info(args.model, config.num_classes, config.image_size)
         logger.info(f"Model created: {model_info}")
         
+        # Checkpoints are snapshotted to CPU and written atomically in the background
+        from src.models.checkpoints import CheckpointWriter
+        checkpoint_writer = CheckpointWriter.from_config(config, logger)
+        logger.info(f"Checkpoints: {checkpoint_writer.directory} (last {config.checkpoint_keep_last}), "
+                    f"best model: {checkpoint_writer.best_path}")
+        
         logger.info("Training pipeline ready. Implementation needed for full training loop.")
     
     elif args.mode == "test":
         # Test mode
+        from src.data.dataloader import DataManager
+        from src.models.model import ModelFactory
+        
         logger.info("Test mode - Running system checks...")
         
         # Test imports
@@ -110,6 +150,132 @@ def main():
         
         logger.info("All system checks passed!")
     
+    elif args.mode == "bench":
+        # Benchmark mode
+        from src.utils import benchmark
+        
+        suites = {
+            "preprocessing": benchmark.benchmark_preprocessing,
+            "decode": benchmark.benchmark_decode,
+            "backends": benchmark.benchmark_backends,
+            "fastmath": benchmark.benchmark_fast_math,
+            "imports": benchmark.benchmark_imports,
+            "models": benchmark.benchmark_models,
+            "checkpoint": benchmark.benchmark_checkpoint_loading
+        }
+        
+        logger.info(f"Running {args.suite} benchmark...")
+        results = suites[args.suite](config, logger, iterations=args.iterations)
+        
+        output_path = benchmark.save_results(results, f"{args.suite}_benchmark", config.results_dir)
+        logger.info(f"Benchmark results saved to {output_path}")
+        if "rows" in results:
+            csv_path = benchmark.save_csv(results["rows"], f"{args.suite}_benchmark", config.results_dir)
+            logger.info(f"Benchmark table saved to {csv_path}")
+    
+    elif args.mode == "export":
+        # Export a trained checkpoint to ONNX and verify it against eager PyTorch
+        from src.models.model import ModelFactory, load_checkpoint
+        from src.models.export import export_onnx
+        from src.models.backends import TorchBackend, OnnxRuntimeBackend, compare_backends
+        from src.utils.benchmark import sample_batches
+        
+        checkpoint_path = Path(args.checkpoint) if args.checkpoint else config.models_dir / "trained" / "best_model.pth"
+        output_path = Path(args.output) if args.output else config.onnx_model_path
+        
+        model = ModelFactory.create_model(args.model, num_classes=config.num_classes, pretrained=False)
+        if checkpoint_path.exists():
+            model = load_checkpoint(model, str(checkpoint_path), 'cpu', logger)
+        else:
+            logger.warning(f"Checkpoint not found at {checkpoint_path}; exporting untrained weights")
+        model.eval()
+        
+        export_onnx(model, output_path, config.image_size, logger=logger)
+        
+        batches, source = sample_batches(config, logger)
+        parity = compare_backends(
+            TorchBackend(model),
+            OnnxRuntimeBackend(output_path, num_threads=config.onnx_num_threads),
+            batches
+        )
+        logger.info(f"ONNX parity on {parity['images']} {source} images: "
+                    f"top-1 {parity['top1_agreement']:.2%} | top-{parity['k']} {parity['topk_agreement']:.2%} | "
+                    f"max prob diff {parity['max_abs_prob_diff']:.2e}")
+    
+    elif args.mode == "quantize":
+        # Quantize a trained checkpoint to INT8 for CPU serving
+        from src.models.model import ModelFactory, load_checkpoint
+        from src.models.quantization import quantize_model, save_quantized
+        from src.utils import benchmark
+        
+        checkpoint_path = Path(args.checkpoint) if args.checkpoint else config.models_dir / "trained" / "best_model.pth"
+        output_path = Path(args.output) if args.output else config.quantized_model_path
+        
+        model = ModelFactory.create_model(args.model, num_classes=config.num_classes, pretrained=False)
+        if checkpoint_path.exists():
+            model = load_checkpoint(model, str(checkpoint_path), 'cpu', logger)
+        else:
+            logger.warning(f"Checkpoint not found at {checkpoint_path}; quantizing untrained weights")
+        model.eval()
+        
+        calibration_batches = None
+        if args.quantization == "static":
+            calibration_batches, _, source = benchmark.labeled_sample_batches(
+                config, logger, max_images=config.quantization_calibration_images, split='train'
+            )
+            logger.info(f"Calibrating on {source} images")
+        
+        quantized = quantize_model(model, args.quantization, calibration_batches, logger)
+        save_quantized(quantized, output_path, config.image_size, logger)
+        
+        results = benchmark.evaluate_quantization(model, quantized, config, logger)
+        # Static quantization falls back to head-only INT8 for backbones FX cannot trace
+        results["mode"] = quantized.quantization_mode
+        results["requested_mode"] = args.quantization
+        if quantized.quantization_mode != args.quantization:
+            logger.warning(f"Requested {args.quantization} quantization; applied {quantized.quantization_mode}")
+        results["model"] = args.model
+        results_path = benchmark.save_results(results, "quantization_report", config.results_dir)
+        logger.info(f"Quantization report saved to {results_path}")
+    
+    elif args.mode == "register":
+        # Add a trained checkpoint to the model registry; running APIs pick it up
+        # automatically unless routing.json pins traffic to other versions
+        from src.models.registry import ModelRegistry
+        
+        checkpoint_path = Path(args.checkpoint) if args.checkpoint else config.models_dir / "trained" / "best_model.pth"
+        registry = ModelRegistry(config.registry_dir)
+        version = registry.register(
+            checkpoint_path, args.model, version=args.version,
+            metadata={"image_size": list(config.image_size)}
+        )
+        logger.info(f"Registered {version.model_name} as version {version.version} in {registry.root}")
+        logger.info(f"Current routing: {registry.get_routing()}")
+    
+    elif args.mode == "convert":
+        # Convert a .pth checkpoint to safetensors, which the API loads memory-mapped
+        from src.models.checkpoints import convert_to_safetensors
+        
+        checkpoint_path = Path(args.checkpoint) if args.checkpoint else config.models_dir / "trained" / "best_model.pth"
+        output_path = convert_to_safetensors(checkpoint_path, args.output, metadata={"model_name": args.model})
+        logger.info(f"Converted {checkpoint_path} to {output_path}")
+    
+    elif args.mode == "loadtest":
+        # Replay images against the API and report throughput, latency and error rates
+        from src.utils.loadtest import load_test
+        from src.utils.benchmark import save_results, save_csv
+        
+        results = load_test(
+            config, logger, url=args.url, endpoint=args.endpoint,
+            concurrency=args.concurrency, rate=args.rate, duration_s=args.duration,
+            batch_files=args.batch_files, image_dir=Path(args.images) if args.images else None,
+            allow_untrained=args.untrained
+        )
+        
+        output_path = save_results(results, "loadtest", config.results_dir)
+        timeline_path = save_csv(results["timeline"], "loadtest_timeline", config.results_dir)
+        logger.info(f"Load test summary saved to {output_path} (timeline: {timeline_path})")
+    
     logger.info("MIDAS system execution complete")
 
 if __name__ == "__main__":
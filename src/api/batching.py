@@ -0,0 +1,167 @@
+"""
+Dynamic micro-batching for MIDAS inference
+"""
+
+import asyncio
+import logging
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+import torch
+
+@dataclass
+class _PendingRequest:
+    """A single queued inference request waiting for its batch."""
+    tensor: torch.Tensor
+    future: asyncio.Future
+
+class MicroBatcher:
+    """
+    Collects single-image inference requests into batches.
+
+    The first request to arrive opens a batching window of ``max_wait_ms``.
+    Every request submitted before the window closes (up to ``max_batch_size``)
+    is stacked into one tensor, run through a single forward pass, and each
+    caller receives its own row of the output.
+    """
+
+    def __init__(self,
+                 run_batch: Callable[[torch.Tensor], torch.Tensor],
+                 max_batch_size: int = 16,
+                 max_wait_ms: float = 5.0,
+                 executor: Optional[Executor] = None,
+                 logger: Optional[logging.Logger] = None):
+        """
+        Initialize the batcher.
+
+        Args:
+            run_batch: Blocking function mapping a (N, C, H, W) batch to N outputs
+            max_batch_size: Maximum number of requests per forward pass
+            max_wait_ms: Maximum time to hold the first request while filling a batch
+            executor: Executor the forward pass runs on (default loop executor if None)
+            logger: Optional logger instance
+        """
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max(0.0, max_wait_ms)
+        self.executor = executor
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # Requests taken off the queue whose results have not been delivered yet
+        self._batch: List[_PendingRequest] = []
+
+    @property
+    def running(self) -> bool:
+        """Whether the batching loop is active."""
+        return self._task is not None and not self._task.done()
+
+    @property
+    def queue_size(self) -> int:
+        """Number of requests waiting to be batched."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self) -> None:
+        """Start the batching loop on the running event loop."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the batching loop and fail every request it has not answered."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        pending = self._batch
+        self._batch = []
+        if self._queue is not None:
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+        self._fail(pending, RuntimeError("Inference batcher stopped"))
+
+    @staticmethod
+    def _fail(requests: List[_PendingRequest], error: BaseException) -> None:
+        """Resolve every unanswered request with ``error``."""
+        for request in requests:
+            if not request.future.done():
+                request.future.set_exception(error)
+
+    async def submit(self, tensor: torch.Tensor) -> torch.Tensor:
+        """
+        Queue one preprocessed image and wait for its result.
+
+        Args:
+            tensor: Image tensor of shape (channels, height, width)
+
+        Returns:
+            The row of the batched output belonging to this image
+        """
+        if not self.running:
+            raise RuntimeError("Inference batcher is not running")
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_PendingRequest(tensor, future))
+        return await future
+
+    async def _collect(self) -> List[_PendingRequest]:
+        """Wait for a request, then gather more until the batch is full or the window closes."""
+        loop = asyncio.get_running_loop()
+        # Collect into self._batch so stop() can fail requests taken off the queue
+        batch = self._batch = []
+        batch.append(await self._queue.get())
+        deadline = loop.time() + self.max_wait_ms / 1000.0
+
+        while len(batch) < self.max_batch_size:
+            # Take whatever is already queued without paying for a timer
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self) -> None:
+        """Batching loop: collect, run one forward, fan results back out."""
+        loop = asyncio.get_running_loop()
+
+        try:
+            while True:
+                batch = await self._collect()
+                # Callers that disconnected while queued don't need a forward pass
+                batch = self._batch = [request for request in batch if not request.future.done()]
+                if not batch:
+                    continue
+
+                try:
+                    inputs = torch.stack([request.tensor for request in batch])
+                    outputs = await loop.run_in_executor(self.executor, self.run_batch, inputs)
+                except Exception as e:
+                    self.logger.error(f"Batched inference failed for {len(batch)} requests: {e}")
+                    self._fail(batch, e)
+                    self._batch = []
+                    continue
+
+                for request, output in zip(batch, outputs):
+                    if not request.future.done():
+                        request.future.set_result(output)
+                self._batch = []
+        except asyncio.CancelledError:
+            # Don't leave callers waiting on a batch that will never run
+            self._fail(self._batch, RuntimeError("Inference batcher stopped"))
+            self._batch = []
+            raise
@@ -0,0 +1,206 @@
+"""
+Content-addressed result cache with request coalescing for MIDAS inference
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+def estimate_size(value: Any) -> int:
+    """
+    Estimate the memory footprint of a cached value.
+
+    Args:
+        value: JSON-serializable value
+
+    Returns:
+        Approximate size in bytes
+    """
+    return len(json.dumps(value, default=str))
+
+class PredictionCache:
+    """
+    LRU cache of inference results keyed by image content and model identity.
+
+    Entries expire after ``ttl_s`` seconds and the cache evicts least recently
+    used entries once it holds more than ``max_entries`` items or
+    ``max_bytes`` of estimated payload. Concurrent lookups for the same key
+    that miss share a single in-flight computation.
+    """
+
+    def __init__(self,
+                 max_entries: int = 4096,
+                 ttl_s: Optional[float] = 3600.0,
+                 max_bytes: int = 64 * 1024 * 1024,
+                 sizeof: Callable[[Any], int] = estimate_size,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of cached results
+            ttl_s: Time to live of an entry in seconds (None disables expiry)
+            max_bytes: Memory budget for cached payloads
+            sizeof: Function estimating the size of a value in bytes
+            clock: Monotonic time source for expiry
+        """
+        self.max_entries = max(1, max_entries)
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.clock = clock
+
+        # key -> (expires_at, size, value)
+        self._entries: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(contents: bytes, model_id: str, *extra: str) -> str:
+        """
+        Build a cache key from raw image bytes and model identity.
+
+        Args:
+            contents: Raw uploaded image bytes
+            model_id: Identifier of the model name and weights version
+            *extra: Additional discriminators (e.g. class or mode)
+
+        Returns:
+            Hex digest identifying the request
+        """
+        digest = hashlib.sha256()
+        for part in (model_id, *extra):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        digest.update(contents)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Look up a cached value, refreshing its LRU position.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached value or None on a miss
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, size, value = entry
+        if expires_at < self.clock():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        Store a value, evicting least recently used entries as needed.
+
+        Args:
+            key: Cache key
+            value: Value to cache
+        """
+        if key in self._entries:
+            self._remove(key)
+
+        # Too large to cache; the old entry is gone too, so it is not served stale
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+
+        expires_at = self.clock() + self.ttl_s if self.ttl_s is not None else float("inf")
+        self._entries[key] = (expires_at, size, value)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return the cached value for ``key`` or compute it exactly once.
+
+        Concurrent callers missing on the same key wait for the first caller's
+        computation instead of starting their own. The computation runs as a
+        separate task, so a disconnecting caller does not cancel it for others.
+
+        Args:
+            key: Cache key
+            compute: Coroutine factory producing the value on a miss
+
+        Returns:
+            Cached or freshly computed value
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(compute())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Future) -> None:
+        """Cache a completed computation and drop it from the in-flight table."""
+        self._inflight.pop(key, None)
+        if task.cancelled():
+            return
+        # Retrieving the exception also stops asyncio warning when no caller awaited it
+        if task.exception() is None:
+            self.put(key, task.result())
+
+    def _remove(self, key: str) -> None:
+        """Remove an entry and release its size from the budget."""
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self) -> None:
+        """Drop every cached entry."""
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters.
+
+        Returns:
+            Dictionary of hit/miss counters and current occupancy
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "inflight": len(self._inflight)
+        }
@@ -0,0 +1,106 @@
+"""
+Admission control and backpressure for MIDAS inference
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+class ServerBusyError(Exception):
+    """
+    Raised when a request cannot be admitted because the server is saturated.
+    """
+
+    def __init__(self, retry_after: int, message: str = "Server is busy, please retry later"):
+        """
+        Initialize the error.
+
+        Args:
+            retry_after: Suggested number of seconds before the client retries
+            message: Human readable reason
+        """
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """
+    Bounds the number of inference requests in progress and waiting.
+
+    At most ``max_concurrency`` requests hold a slot at once. Up to
+    ``max_queue`` more may wait for one, each for at most ``queue_timeout_s``.
+    Anything beyond that is rejected immediately with ``ServerBusyError`` so
+    that queueing delay, and therefore latency, stays bounded.
+    """
+
+    def __init__(self,
+                 max_concurrency: int = 32,
+                 max_queue: int = 64,
+                 queue_timeout_s: Optional[float] = 10.0,
+                 retry_after: int = 1):
+        """
+        Initialize the controller.
+
+        Args:
+            max_concurrency: Maximum number of requests processed at once
+            max_queue: Maximum number of requests waiting for a slot
+            queue_timeout_s: Maximum time a request may wait for a slot (None waits forever)
+            retry_after: Retry-After hint, in seconds, attached to rejections
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout_s = queue_timeout_s
+        self.retry_after = retry_after
+
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._waiting = 0
+        self._active = 0
+
+    @property
+    def active(self) -> int:
+        """Number of requests currently holding a slot."""
+        return self._active
+
+    @property
+    def waiting(self) -> int:
+        """Number of requests queued for a slot."""
+        return self._waiting
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """
+        Hold a processing slot for the duration of the block.
+
+        Raises:
+            ServerBusyError: If the wait queue is full or the wait times out
+        """
+        if self._semaphore.locked() and self._waiting >= self.max_queue:
+            raise ServerBusyError(self.retry_after)
+
+        self._waiting += 1
+        # wait_for() can time out just after acquire() succeeded and leak the permit,
+        # so acquire in a task and hand back any permit it gets after we give up
+        acquire = asyncio.ensure_future(self._semaphore.acquire())
+        try:
+            done, _ = await asyncio.wait({acquire}, timeout=self.queue_timeout_s)
+        except BaseException:
+            self._abandon(acquire)
+            raise
+        finally:
+            self._waiting -= 1
+        if not done:
+            self._abandon(acquire)
+            raise ServerBusyError(self.retry_after, "Timed out waiting for an inference slot")
+
+        self._active += 1
+        try:
+            yield
+        finally:
+            self._active -= 1
+            self._semaphore.release()
+
+    def _abandon(self, acquire: asyncio.Future) -> None:
+        """Cancel a pending acquire, releasing the permit if it was granted anyway."""
+        acquire.cancel()
+        acquire.add_done_callback(
+            lambda task: None if task.cancelled() or task.exception() else self._semaphore.release()
+        )
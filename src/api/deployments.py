@@ -0,0 +1,171 @@
+"""
+Versioned model deployments and A/B routing for the MIDAS API
+"""
+
+import asyncio
+import logging
+import random
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import torch
+
+from api.batching import MicroBatcher
+
+class Deployment:
+    """
+    One loaded model version with its own backend and micro-batcher.
+
+    Requests hold the deployment through ``serve()`` for their whole
+    lifetime, so a deployment that is swapped out keeps running until the
+    requests already routed to it have finished.
+    """
+
+    def __init__(self,
+                 version: str,
+                 model_name: str,
+                 model_id: str,
+                 backend: Callable[[torch.Tensor], torch.Tensor],
+                 model: Optional[torch.nn.Module] = None,
+                 trained: bool = True):
+        """
+        Initialize deployment.
+
+        Args:
+            version: Version label reported in responses and metrics
+            model_name: Architecture name
+            model_id: Identity of the architecture and weights (cache keys)
+            backend: Inference backend mapping a batch to logits
+            model: Eager model behind the backend, if there is one
+            trained: Whether trained weights were loaded
+        """
+        self.version = version
+        self.model_name = model_name
+        self.model_id = model_id
+        self.backend = backend
+        self.model = model
+        self.trained = trained
+        self.batcher: Optional[MicroBatcher] = None
+
+        self._active = 0
+        self._idle: Optional[asyncio.Event] = None
+
+    @property
+    def labels(self) -> Tuple[str, str]:
+        """Metric labels (model name, version)."""
+        return self.model_name, self.version
+
+    @property
+    def active(self) -> int:
+        """Number of requests currently using this deployment."""
+        return self._active
+
+    def start(self,
+              run_batch: Callable[[torch.Tensor], torch.Tensor],
+              max_batch_size: int,
+              max_wait_ms: float,
+              executor=None,
+              logger: Optional[logging.Logger] = None) -> None:
+        """
+        Start this deployment's micro-batcher on the running event loop.
+
+        Args:
+            run_batch: Function mapping a stacked batch to per-row outputs
+            max_batch_size: Maximum number of requests per forward pass
+            max_wait_ms: Maximum time to hold the first request while filling a batch
+            executor: Executor the forward pass runs on
+            logger: Optional logger instance
+        """
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self.batcher = MicroBatcher(run_batch, max_batch_size, max_wait_ms, executor=executor, logger=logger)
+        self.batcher.start()
+
+    @asynccontextmanager
+    async def serve(self) -> AsyncIterator["Deployment"]:
+        """Mark a request as using this deployment until the block exits."""
+        self._active += 1
+        if self._idle is not None:
+            self._idle.clear()
+        try:
+            yield self
+        finally:
+            self._active -= 1
+            if self._active == 0 and self._idle is not None:
+                self._idle.set()
+
+    async def drain(self) -> None:
+        """Wait for in-flight requests to finish, then stop the batcher and backend."""
+        if self._idle is not None:
+            await self._idle.wait()
+        if self.batcher is not None:
+            await self.batcher.stop()
+        close = getattr(self.backend, "close", None)
+        if close is not None:
+            close()
+
+class DeploymentRouter:
+    """
+    Routes requests across live deployments by weight.
+
+    The routing table is replaced as a whole, so a request sees either the
+    old set of deployments or the new one, never a mix.
+    """
+
+    def __init__(self):
+        """Initialize an empty router."""
+        self._table: Tuple[Dict[str, Deployment], List[str], List[float]] = ({}, [], [])
+
+    @property
+    def deployments(self) -> Dict[str, Deployment]:
+        """Live deployments by version."""
+        return self._table[0]
+
+    @property
+    def weights(self) -> Dict[str, float]:
+        """Traffic weight per version."""
+        _, versions, weights = self._table
+        return dict(zip(versions, weights))
+
+    def __bool__(self) -> bool:
+        return bool(self._table[0])
+
+    def choose(self, version: Optional[str] = None) -> Deployment:
+        """
+        Pick the deployment for a request.
+
+        Args:
+            version: Optional version to pin the request to
+
+        Returns:
+            The chosen deployment
+
+        Raises:
+            KeyError: If the pinned version is not deployed, or nothing is
+        """
+        deployments, versions, weights = self._table
+        if version is not None:
+            if version not in deployments:
+                raise KeyError(f"Model version {version} is not deployed")
+            return deployments[version]
+        if not versions:
+            raise KeyError("No model version is deployed")
+        if len(versions) == 1:
+            return deployments[versions[0]]
+        return deployments[random.choices(versions, weights=weights)[0]]
+
+    def swap(self, deployments: Dict[str, Deployment], weights: Dict[str, float]) -> List[Deployment]:
+        """
+        Atomically replace the live deployments and their weights.
+
+        Args:
+            deployments: Deployments to serve, by version
+            weights: Traffic weight per version (versions without a positive weight get no traffic)
+
+        Returns:
+            Deployments that are no longer live and should be drained
+        """
+        versions = [v for v in deployments if weights.get(v, 0.0) > 0]
+        previous = self._table[0]
+        self._table = (dict(deployments), versions, [weights[v] for v in versions])
+        return [d for v, d in previous.items() if deployments.get(v) is not d]
@@ -2,15 +2,23 @@
 FastAPI backend for MIDAS inference
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, Header, Query, UploadFile, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.datastructures import FormData, UploadFile as FormFile
 import torch
 import torch.nn.functional as F
-from PIL import Image
 import io
-import numpy as np
-from typing import Dict, List, Optional
+import base64
+import json
+import time
+import hashlib
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 import logging
 from pathlib import Path
 import sys
@@ -19,8 +27,17 @@ import sys
 sys.path.append(str(Path(__file__).parent.parent))
 
 from config.config import MIDASConfig
-from models.model import ModelFactory, load_checkpoint
-from data.dataloader import DataManager
+from models.backends import EnsembleBackend, EnsembleMember, backend_artifact_path, create_backend
+from models.optimization import apply_graph_mode, configure_cpu_fast_math, warmup
+from models.registry import ModelRegistry
+from models.tta import augment_batch, average_views, non_identity_views
+from models.explain import grad_cam, heatmap_to_png
+from data.preprocessing import InferencePreprocessor, open_image
+from data.archives import iter_archive_images
+from api.deployments import Deployment, DeploymentRouter
+from api.concurrency import AdmissionController, ServerBusyError
+from api.cache import PredictionCache
+from api import metrics
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -40,50 +57,548 @@ app.add_middleware(
 
 # Global variables
 config = MIDASConfig()
-model = None
-device = None
-data_manager = None
+registry = None
+router = DeploymentRouter()
+applied_routing = None
+inference_transform = None
+preprocess_executor = None
+inference_executor = None
+admission = None
+prediction_cache = None
+explanation_cache = None
+ready = False
+readiness_detail = "starting"
+prepare_task = None
+watch_task = None
+reload_event = None
+draining = set()
 logger = logging.getLogger(__name__)
 
-def load_model(model_path: Optional[str] = None):
-    """Load the trained model."""
-    global model, device
+def file_identity(path: Path) -> str:
+    """Identify a weights file by name and a hash of its contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return f"{Path(path).name}:{digest.hexdigest()[:16]}"
+
+def load_deployment(model_path: Optional[str] = None,
+                    model_name: str = 'efficientnet_b0',
+                    version: Optional[str] = None) -> Deployment:
+    """
+    Load a model and its inference backend.
+    
+    Args:
+        model_path: Checkpoint to load (None serves untrained weights)
+        model_name: Architecture the checkpoint belongs to
+        version: Version label (defaults to a hash of the weights' identity)
     
+    Returns:
+        Deployment, not yet started
+    """
     device = torch.device(config.device)
     
-    # Create model
-    model = ModelFactory.create_model(
-        model_name='efficientnet_b0',
-        num_classes=config.num_classes,
-        pretrained=False
-    )
+    artifact_path = backend_artifact_path(config)
+    if artifact_path is not None:
+        # Exported artifacts carry their own weights, so no eager model is built
+        backend = create_backend(config, logger=logger)
+        model_id = f"{backend.name}:{file_identity(artifact_path)}"
+        logger.info(f"Serving {backend.name} model from {artifact_path}")
+        return Deployment(version or version_label(model_id), model_name, model_id, backend)
+    
+    # timm is only needed when an eager model is built, not for exported artifacts
+    from models.model import load_model
     
-    # Load checkpoint if provided
-    if model_path and Path(model_path).exists():
-        model = load_checkpoint(model, model_path, device, logger)
+    # Build the model straight from the checkpoint, memory-mapping its weights
+    trained = bool(model_path and Path(model_path).exists())
+    model = load_model(model_name, str(model_path) if trained else None, config.num_classes, device, logger)
+    if trained:
+        # Identify the weights by file identity so cached results never outlive them
+        model_id = f"{model_name}:{file_identity(model_path)}"
+    else:
+        model_id = f"{model_name}:untrained"
     
-    model.to(device)
     model.eval()
     
-    logger.info(f"Model loaded on {device}")
+    # Optionally switch to channels_last / bf16 on CPU, falling back to float32
+    fast_math = None
+    if config.cpu_fast_math and device.type == 'cpu':
+        fast_math = configure_cpu_fast_math(model, config, logger)
+    
+    # Optionally serve a TorchScript / torch.compile graph instead of eager Python
+    serving_model = apply_graph_mode(model, config, model_id, device, logger)
+    backend = create_backend(config, serving_model, device, logger, fast_math)
+    
+    version = version or version_label(model_id)
+    logger.info(f"Model {model_name} version {version} loaded on {device}")
+    return Deployment(version, model_name, model_id, backend, model, trained)
+
+def version_label(model_id: str) -> str:
+    """Short, stable version label for weights that are not in the registry."""
+    return hashlib.sha256(model_id.encode("utf-8")).hexdigest()[:12]
+
+def cache_key(contents: bytes, deployment: Deployment, *extra: str) -> str:
+    """
+    Cache key for an upload served by a deployment.
+    
+    Includes the version label as well as the weights' identity: cached
+    results carry the label, and one checkpoint may be registered twice.
+    
+    Args:
+        contents: Raw uploaded image bytes
+        deployment: Model version serving the request
+        *extra: Additional discriminators (e.g. TTA settings or class)
+    
+    Returns:
+        Cache key
+    """
+    return PredictionCache.make_key(contents, deployment.model_id, deployment.version, *extra)
+
+def default_model_path() -> Optional[str]:
+    """Path of the trained model checkpoint, or None if there is none yet."""
+    candidates = [config.models_dir / "trained" / name for name in ("best_model.safetensors", "best_model.pth")]
+    candidates = [path for path in candidates if path.exists()]
+    if not candidates:
+        return None
+    # Prefer safetensors, unless training has written a newer .pth since it was converted
+    return str(max(candidates, key=lambda path: (path.stat().st_mtime, path.suffix == ".safetensors")))
+
+def get_registry() -> ModelRegistry:
+    """Get the model registry for the current config."""
+    global registry
+    if registry is None or registry.root != Path(config.registry_dir):
+        registry = ModelRegistry(config.registry_dir)
+    return registry
+
+def registry_routing() -> Dict[str, float]:
+    """
+    Traffic weights from the registry.
+    
+    Returns:
+        Dictionary of version to weight, empty when the registry is empty or
+        an ensemble or exported artifact backend is configured
+    """
+    if config.ensemble_members or backend_artifact_path(config) is not None:
+        return {}
+    return get_registry().get_routing()
+
+def load_ensemble(members: Dict[str, float]) -> Deployment:
+    """
+    Load registered versions and combine them into one ensemble deployment.
+    
+    A member's input resolution comes from the "image_size" recorded when it
+    was registered, falling back to config.image_size.
+    
+    Args:
+        members: Dictionary of registry version to ensemble weight
+    
+    Returns:
+        Ensemble deployment, not yet started
+    
+    Raises:
+        ValueError: If an exported artifact backend is configured
+    """
+    if backend_artifact_path(config) is not None:
+        raise ValueError("Ensembles are served with the torch backend only")
+    
+    version = "+".join(members)
+    ensemble_members, member_ids = [], []
+    for member_version, weight in members.items():
+        info = get_registry().get(member_version)
+        deployment = load_deployment(str(info.checkpoint_path), info.model_name, member_version)
+        image_size = tuple(info.metadata.get("image_size", config.image_size))
+        ensemble_members.append(EnsembleMember(member_version, deployment.backend, weight, image_size))
+        member_ids.append(f"{deployment.model_id}*{weight}@{image_size[0]}x{image_size[1]}")
+    
+    def observe_latency(member: str, seconds: float) -> None:
+        metrics.ENSEMBLE_MEMBER_LATENCY.labels(version, member).observe(seconds)
+    
+    backend = EnsembleBackend(ensemble_members, on_member_latency=observe_latency)
+    logger.info(f"Serving ensemble of {len(ensemble_members)} models as version {version}")
+    return Deployment(version, "ensemble", "ensemble:" + "|".join(member_ids), backend)
+
+def load_deployments(current: Dict[str, Deployment],
+                     routing: Dict[str, float]) -> Tuple[Dict[str, Deployment], Dict[str, float]]:
+    """
+    Load every version the routing table sends traffic to.
+    
+    Versions that are already live are reused rather than reloaded. Without
+    registered versions, the trained checkpoint in models/trained is served;
+    with config.ensemble_members set, a single ensemble deployment is.
+    
+    Args:
+        current: Live deployments by version
+        routing: Dictionary of version to weight from the registry
+    
+    Returns:
+        Tuple of (deployments by version, weights by version)
+    """
+    if config.ensemble_members:
+        deployment = current.get("+".join(config.ensemble_members)) or load_ensemble(config.ensemble_members)
+        return {deployment.version: deployment}, {deployment.version: 1.0}
+    
+    if not routing:
+        deployment = load_deployment(default_model_path())
+        return {deployment.version: deployment}, {deployment.version: 1.0}
+    
+    deployments = {}
+    for version in routing:
+        if version in current:
+            deployments[version] = current[version]
+            continue
+        info = get_registry().get(version)
+        deployments[version] = load_deployment(str(info.checkpoint_path), info.model_name, version)
+    return deployments, dict(routing)
+
+def preload_deployments() -> None:
+    """Load the served versions synchronously, e.g. in a pre-forking parent."""
+    global applied_routing
+    routing = registry_routing()
+    router.swap(*load_deployments({}, routing))
+    applied_routing = routing
+
+def preprocess_image(contents: bytes, labels: Tuple[str, str]) -> torch.Tensor:
+    """
+    Decode raw image bytes and apply the inference transforms.
+    
+    Args:
+        contents: Encoded image bytes
+        labels: Metric labels (model name, version) of the serving deployment
+    
+    Returns:
+        Image tensor of shape (channels, height, width)
+    """
+    decode_size = config.image_size if config.reduced_decode else None
+    with metrics.stage_timer("decode", *labels):
+        image = open_image(io.BytesIO(contents), decode_size, config.max_image_pixels)
+    with metrics.stage_timer("transform", *labels):
+        return inference_transform(image)
+
+def run_model(deployment: Deployment, batch: torch.Tensor) -> torch.Tensor:
+    """
+    Run a deployment's model on a preprocessed batch.
+    
+    Args:
+        deployment: Model version to run
+        batch: Image tensor of shape (batch_size, channels, height, width)
+    
+    Returns:
+        Logits of shape (batch_size, num_classes) on CPU
+    """
+    metrics.BATCH_SIZE.labels(*deployment.labels).observe(batch.shape[0])
+    with metrics.stage_timer("forward", *deployment.labels):
+        return deployment.backend(batch)
+
+def run_inference(deployment: Deployment, batch: torch.Tensor) -> torch.Tensor:
+    """
+    Run a deployment's model on a preprocessed batch and return class probabilities.
+    
+    Args:
+        deployment: Model version to run
+        batch: Image tensor of shape (batch_size, channels, height, width)
+    
+    Returns:
+        Class probabilities of shape (batch_size, num_classes) on CPU
+    """
+    return F.softmax(run_model(deployment, batch), dim=1)
+
+def build_predictions(probabilities: torch.Tensor, deployment: Deployment) -> List[Dict]:
+    """
+    Turn class probabilities into prediction responses.
+    
+    Args:
+        probabilities: Tensor of shape (batch_size, num_classes)
+        deployment: Model version that produced the probabilities
+    
+    Returns:
+        One prediction result per row
+    """
+    start = time.perf_counter()
+    top_probs, top_indices = torch.topk(probabilities, k=min(3, config.num_classes), dim=1)
+    
+    results = []
+    for row_probs, row_indices in zip(top_probs.tolist(), top_indices.tolist()):
+        predictions = []
+        for prob, class_idx in zip(row_probs, row_indices):
+            class_name = config.class_names[class_idx]
+            class_desc = config.class_name_map.get(class_name.lower(), class_name)
+            
+            predictions.append({
+                "class": class_name,
+                "description": class_desc,
+                "confidence": float(prob * 100)
+            })
+        
+        # Get primary prediction
+        primary_class = predictions[0]["class"]
+        primary_confidence = predictions[0]["confidence"]
+        
+        results.append({
+            "success": True,
+            "primary_prediction": {
+                "class": primary_class,
+                "description": predictions[0]["description"],
+                "confidence": primary_confidence
+            },
+            "all_predictions": predictions,
+            "risk_level": get_risk_level(primary_class, primary_confidence),
+            "model_version": deployment.version
+        })
+        metrics.record_prediction(primary_class, primary_confidence, *deployment.labels)
+    
+    metrics.STAGE_LATENCY.labels("postprocess", *deployment.labels).observe(time.perf_counter() - start)
+    return results
+
+async def activate(deployments: Dict[str, Deployment], weights: Dict[str, float]) -> None:
+    """
+    Warm up and start new deployments, then swap them in atomically.
+    
+    Requests already routed to a replaced deployment finish on it; it is
+    stopped in the background once they have.
+    
+    Args:
+        deployments: Deployments to serve, by version
+        weights: Traffic weight per version
+    """
+    loop = asyncio.get_running_loop()
+    for deployment in deployments.values():
+        if deployment.batcher is not None:
+            continue
+        if config.warmup_enabled:
+            # Pay for allocator growth, kernel selection and graph specialization
+            # at every serving batch size before taking traffic. This runs off the
+            # inference pool so live versions keep serving during a hot swap.
+            await loop.run_in_executor(
+                None, warmup, deployment.backend, config.serving_batch_sizes,
+                config.image_size, config.warmup_iterations, logger
+            )
+        deployment.start(
+            functools.partial(run_inference, deployment),
+            max_batch_size=config.inference_max_batch_size,
+            max_wait_ms=config.inference_max_wait_ms,
+            executor=inference_executor,
+            logger=logger
+        )
+    
+    for retired in router.swap(deployments, weights):
+        logger.info(f"Retiring model version {retired.version} after {retired.active} in-flight requests")
+        task = loop.create_task(retired.drain())
+        draining.add(task)
+        task.add_done_callback(draining.discard)
+
+async def prepare_model() -> None:
+    """
+    Load the served versions if needed and warm them up, then mark this instance ready.
+    
+    Runs in the background after startup so liveness checks answer while
+    the model loads; /ready reports progress and any failure.
+    """
+    global ready, readiness_detail, applied_routing
+    
+    loop = asyncio.get_running_loop()
+    try:
+        # Load models, unless a pre-forking parent already loaded them for us
+        if router:
+            deployments, weights = router.deployments, router.weights
+        else:
+            readiness_detail = "loading model"
+            routing = await loop.run_in_executor(None, registry_routing)
+            deployments, weights = await loop.run_in_executor(None, load_deployments, {}, routing)
+            applied_routing = routing
+        
+        if not config.serve_untrained_model and not all(d.trained for d in deployments.values()):
+            readiness_detail = "no trained model checkpoint found"
+            logger.error(f"Not ready: {readiness_detail}")
+            return
+        
+        readiness_detail = "warming up"
+        await activate(deployments, weights)
+    except Exception as e:
+        readiness_detail = f"model failed to load: {e}"
+        logger.error(f"Not ready: {readiness_detail}")
+        return
+    
+    ready = True
+    readiness_detail = "ready"
+    logger.info(f"Model warm; instance is ready (versions: {router.weights})")
+
+async def watch_registry() -> None:
+    """
+    Hot swap deployments whenever the registry's routing table changes.
+    
+    Every worker process polls the registry, so a change made through any
+    worker (or by editing routing.json directly) reaches all of them. An
+    instance that started without a usable model becomes ready once a
+    version is registered.
+    """
+    global applied_routing, ready, readiness_detail
+    
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            await asyncio.wait_for(reload_event.wait(), config.registry_poll_interval_s)
+        except asyncio.TimeoutError:
+            pass
+        reload_event.clear()
+        if prepare_task is not None and not prepare_task.done():
+            continue
+        
+        try:
+            routing = await loop.run_in_executor(None, registry_routing)
+            if routing == applied_routing:
+                continue
+            # A broken version is not retried until the routing changes again
+            applied_routing = routing
+            logger.info(f"Registry routing changed to {routing}; loading in the background")
+            deployments, weights = await loop.run_in_executor(None, load_deployments, router.deployments, routing)
+            await activate(deployments, weights)
+            logger.info(f"Now serving model versions {router.weights}")
+            if not ready and all(d.trained for d in deployments.values()):
+                ready = True
+                readiness_detail = "ready"
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Model hot swap failed; still serving {router.weights}: {e}")
+
+def ensure_ready() -> None:
+    """
+    Reject inference requests until the model is loaded and warm.
+    
+    Raises:
+        HTTPException: 503 while the instance is not ready
+    """
+    if not ready:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Model not ready: {readiness_detail}",
+            headers={"Retry-After": str(config.inference_retry_after_s)}
+        )
+
+def select_deployment(version: Optional[str] = None) -> Deployment:
+    """
+    Route a request to a model version.
+    
+    Args:
+        version: Optional version requested through the X-Model-Version header
+    
+    Returns:
+        Deployment to serve the request
+    
+    Raises:
+        HTTPException: 503 while not ready, 404 for an unknown pinned version
+    """
+    ensure_ready()
+    try:
+        return router.choose(version)
+    except KeyError as e:
+        raise HTTPException(status_code=404 if version else 503, detail=str(e).strip("'\""))
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize model and data manager on startup."""
-    global data_manager
+    global inference_transform, preprocess_executor, inference_executor, admission
+    global prediction_cache, explanation_cache, prepare_task, watch_task, reload_event
     
     # Setup logging
     logging.basicConfig(level=logging.INFO)
     
-    # Initialize data manager
-    data_manager = DataManager(config, logger)
+    # Build the inference preprocessor once; the training data pipeline
+    # (pandas, sklearn, torchvision) is never imported by the API
+    inference_transform = InferencePreprocessor.from_config(config)
+    preprocess_executor = ThreadPoolExecutor(
+        max_workers=config.inference_preprocess_workers,
+        thread_name_prefix="midas-preprocess"
+    )
     
-    # Load model
-    model_path = config.models_dir / "trained" / "best_model.pth"
-    load_model(str(model_path) if model_path.exists() else None)
+    # Forward passes run on their own pool so the event loop stays responsive
+    inference_executor = ThreadPoolExecutor(
+        max_workers=config.inference_threads,
+        thread_name_prefix="midas-inference"
+    )
+    admission = AdmissionController(
+        max_concurrency=config.inference_max_concurrency,
+        max_queue=config.inference_max_queue,
+        queue_timeout_s=config.inference_queue_timeout_s,
+        retry_after=config.inference_retry_after_s
+    )
     
+    if config.prediction_cache_enabled:
+        prediction_cache = PredictionCache(
+            max_entries=config.prediction_cache_max_entries,
+            ttl_s=config.prediction_cache_ttl_s,
+            max_bytes=int(config.prediction_cache_max_mb * 1024 * 1024)
+        )
+        # Heatmaps are much larger than predictions, so they get their own budget
+        explanation_cache = PredictionCache(
+            max_entries=config.explain_cache_max_entries,
+            ttl_s=config.prediction_cache_ttl_s,
+            max_bytes=int(config.explain_cache_max_mb * 1024 * 1024)
+        )
+    
+    loop = asyncio.get_running_loop()
+    prepare_task = loop.create_task(prepare_model())
+    reload_event = asyncio.Event()
+    if config.registry_poll_interval_s > 0:
+        watch_task = loop.create_task(watch_registry())
     logger.info("API startup complete")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the batching schedulers and worker pools."""
+    for task in (prepare_task, watch_task, *draining):
+        if task is not None:
+            task.cancel()
+    for deployment in router.deployments.values():
+        if deployment.batcher is not None:
+            await deployment.batcher.stop()
+    for executor in (preprocess_executor, inference_executor):
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+def update_queue_metrics() -> None:
+    """Publish admission and batching queue depths."""
+    if admission is not None:
+        metrics.QUEUE_DEPTH.labels("admission").set(admission.waiting)
+    metrics.QUEUE_DEPTH.labels("batcher").set(sum(
+        d.batcher.queue_size for d in router.deployments.values() if d.batcher is not None
+    ))
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Count requests, errors and in-flight requests per endpoint."""
+    # Unknown paths share one label so scanners cannot blow up label cardinality
+    route_paths = {getattr(route, "path", None) for route in app.routes}
+    endpoint = request.url.path if request.url.path in route_paths else "other"
+    if endpoint == "/metrics":
+        return await call_next(request)
+    
+    in_flight = metrics.IN_FLIGHT.labels(endpoint)
+    in_flight.inc()
+    update_queue_metrics()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        in_flight.dec()
+        update_queue_metrics()
+        metrics.REQUEST_LATENCY.labels(endpoint).observe(time.perf_counter() - start)
+        metrics.REQUESTS.labels(endpoint, request.method, str(status)).inc()
+        if status >= 400:
+            metrics.ERRORS.labels(endpoint, request.method, str(status)).inc()
+
+@app.exception_handler(ServerBusyError)
+async def server_busy_handler(request, exc: ServerBusyError):
+    """Reject saturated requests with 503 and a Retry-After hint."""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 @app.get("/")
 async def root():
     """Root endpoint."""
@@ -95,12 +610,20 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint."""
+    """Liveness check: the process is up and serving HTTP."""
     return {
         "status": "healthy",
-        "model_loaded": model is not None
+        "model_loaded": bool(router),
+        "ready": ready
     }
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness check: 200 once the model is loaded and warm, 503 until then."""
+    if not ready:
+        return JSONResponse(status_code=503, content={"ready": False, "detail": readiness_detail})
+    return {"ready": True, "model_versions": router.weights}
+
 @app.get("/classes")
 async def get_classes():
     """Get list of classes."""
@@ -109,97 +632,638 @@ async def get_classes():
         "class_descriptions": config.class_name_map
     }
 
-@app.post("/predict")
-async def predict(file: UploadFile = File(...)):
+@app.get("/models")
+async def list_models():
+    """Registered model versions and the live routing table."""
+    loop = asyncio.get_running_loop()
+    versions = await loop.run_in_executor(None, get_registry().list_versions)
+    return {
+        "registered": [version.to_dict() for version in versions],
+        "live": {
+            version: {
+                "model_name": deployment.model_name,
+                "model_id": deployment.model_id,
+                "weight": router.weights.get(version, 0.0),
+                "in_flight": deployment.active,
+                **({"members": deployment.backend.member_stats()}
+                   if isinstance(deployment.backend, EnsembleBackend) else {})
+            }
+            for version, deployment in router.deployments.items()
+        }
+    }
+
+@app.put("/models/routing")
+async def set_model_routing(weights: Dict[str, float]):
     """
-    Predict skin lesion class from uploaded image.
+    Set the traffic weights per registered version, e.g. {"v3": 0.9, "v4": 0.1}.
+    
+    New versions are loaded and warmed in the background and swapped in
+    once ready; every worker picks the change up from the registry.
     
     Args:
-        file: Uploaded image file
+        weights: Dictionary of version to non-negative weight
     
     Returns:
-        Prediction results
+        Routing table that will be applied
     """
     try:
-        # Validate file type
-        if not file.content_type.startswith("image/"):
-            raise HTTPException(status_code=400, detail="File must be an image")
-        
-        # Read and process image
-        contents = await file.read()
-        image = Image.open(io.BytesIO(contents)).convert('RGB')
-        
-        # Apply transforms
-        transform = data_manager.get_transforms(is_train=False)
-        image_tensor = transform(image).unsqueeze(0).to(device)
+        routing = get_registry().set_routing(weights)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e).strip("'\""))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if reload_event is not None:
+        reload_event.set()
+    return JSONResponse(status_code=202, content={"routing": routing})
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus metrics in the text exposition format."""
+    update_queue_metrics()
+    if prediction_cache is not None:
+        metrics.update_cache_stats(prediction_cache.stats())
+    payload, content_type = metrics.render_metrics()
+    return Response(content=payload, media_type=content_type)
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Prediction and explanation cache hit/miss counters."""
+    if prediction_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **prediction_cache.stats(), "explanations": explanation_cache.stats()}
+
+def run_tta(deployment: Deployment, image_tensor: torch.Tensor, probabilities: torch.Tensor) -> torch.Tensor:
+    """
+    Average class probabilities over the configured test-time augmentation views.
+    
+    All augmented views of the image are built in tensor space and run as
+    one batch, so TTA costs a single extra forward pass.
+    
+    Args:
+        deployment: Model version to run
+        image_tensor: Preprocessed image of shape (channels, height, width)
+        probabilities: Probabilities already computed for the unaugmented image
+    
+    Returns:
+        Tensor of shape (num_views, num_classes) holding every view's probabilities
+    """
+    views = non_identity_views(config.tta_views)
+    view_probabilities = run_inference(deployment, augment_batch(image_tensor.unsqueeze(0), views))
+    if len(views) < len(config.tta_views):
+        view_probabilities = torch.cat([probabilities.unsqueeze(0), view_probabilities])
+    return view_probabilities
+
+async def run_classification(contents: bytes, deployment: Deployment, tta: bool = False) -> Dict:
+    """
+    Preprocess and classify one image.
+    
+    Callers are responsible for admission control.
+    
+    Args:
+        contents: Encoded image bytes
+        deployment: Model version to classify with
+        tta: Average over augmented views when the prediction is not confident enough
+    
+    Returns:
+        Prediction result
+    """
+    # Decode/transform the image off the event loop
+    loop = asyncio.get_running_loop()
+    image_tensor = await loop.run_in_executor(preprocess_executor, preprocess_image, contents, deployment.labels)
+    
+    # Make prediction; concurrent requests share one batched forward pass
+    probabilities = await deployment.batcher.submit(image_tensor)
+    
+    tta_views = 0
+    if tta and non_identity_views(config.tta_views) and \
+            float(probabilities.max()) * 100 < config.tta_confidence_threshold:
+        with metrics.stage_timer("tta", *deployment.labels):
+            view_probabilities = await loop.run_in_executor(
+                inference_executor, run_tta, deployment, image_tensor, probabilities
+            )
+        tta_views = view_probabilities.shape[0]
+        probabilities = average_views(view_probabilities, tta_views)[0]
+    
+    prediction = build_predictions(probabilities.unsqueeze(0), deployment)[0]
+    if tta_views:
+        prediction["tta_views"] = tta_views
+    return prediction
+
+async def classify_image(contents: bytes, deployment: Deployment, tta: bool = False) -> Dict:
+    """
+    Preprocess and classify one image under admission control.
+    
+    Args:
+        contents: Encoded image bytes
+        deployment: Model version to classify with
+        tta: Average over augmented views when the prediction is not confident enough
+    
+    Returns:
+        Prediction result
+    """
+    async with admission.slot():
+        return await run_classification(contents, deployment, tta)
+
+async def cached_classification(contents: bytes,
+                                deployment: Deployment,
+                                classify: Callable[..., Awaitable[Dict]] = classify_image,
+                                tta: bool = False) -> Dict:
+    """
+    Classify an image through the prediction cache.
+    
+    Identical uploads are served from cache or share one in-flight computation.
+    
+    Args:
+        contents: Encoded image bytes
+        deployment: Model version to classify with
+        classify: Coroutine function computing the prediction on a miss
+        tta: Average over augmented views when the prediction is not confident enough
+    
+    Returns:
+        Prediction result
+    """
+    if prediction_cache is None:
+        return await classify(contents, deployment, tta)
+    
+    extra = ("tta", ",".join(config.tta_views), str(config.tta_confidence_threshold)) if tta else ()
+    key = cache_key(contents, deployment, *extra)
+    return await prediction_cache.get_or_compute(key, lambda: classify(contents, deployment, tta))
+
+@asynccontextmanager
+async def admitted(deployment: Deployment) -> AsyncIterator[Deployment]:
+    """
+    Hold a deployment and an admission slot for the duration of the block.
+    
+    The deployment is held before waiting for a slot, so a hot swap while
+    the request is queued cannot drain it.
+    
+    Raises:
+        ServerBusyError: If no admission slot frees up in time
+    """
+    async with deployment.serve(), admission.slot():
+        yield deployment
+
+async def decode_uploads(files: List[UploadFile],
+                         deployment: Deployment,
+                         results: List[Optional[Dict]],
+                         lookup: Callable[[str, bytes], Tuple[Any, Optional[Dict]]]) -> List[Tuple[int, Any, torch.Tensor]]:
+    """
+    Read uploads and decode/transform them in parallel on the preprocessing pool.
+    
+    Non-images, cache hits and images that fail to decode get their entry in
+    results filled in here; everything else is returned for a forward pass.
+    
+    Args:
+        files: Uploaded files
+        deployment: Model version the images are preprocessed for
+        results: Per-file results, one slot per upload
+        lookup: Maps (filename, contents) to (cache key, cached result or None)
+    
+    Returns:
+        List of (index, cache key, image tensor) in upload order
+    """
+    loop = asyncio.get_running_loop()
+    pending = []
+    for index, file in enumerate(files):
+        if not (file.content_type or "").startswith("image/"):
+            results[index] = {"filename": file.filename, "error": "File must be an image"}
+            continue
+        with metrics.stage_timer("upload_read", *deployment.labels):
+            contents = await file.read()
         
-        # Make prediction
-        with torch.no_grad():
-            outputs = model(image_tensor)
-            probabilities = F.softmax(outputs, dim=1)
-            
-            # Get top predictions
-            top_probs, top_indices = torch.topk(probabilities[0], k=min(3, config.num_classes))
-            
-            predictions = []
-            for i in range(len(top_indices)):
-                class_idx = top_indices[i].item()
-                class_name = config.class_names[class_idx]
-                class_desc = config.class_name_map.get(class_name.lower(), class_name)
-                prob = top_probs[i].item()
-                
-                predictions.append({
-                    "class": class_name,
-                    "description": class_desc,
-                    "confidence": float(prob * 100)
-                })
+        key, cached = lookup(file.filename, contents)
+        if cached is not None:
+            results[index] = cached
+            continue
         
-        # Get primary prediction
-        primary_class = predictions[0]["class"]
-        primary_confidence = predictions[0]["confidence"]
+        pending.append((index, key, loop.run_in_executor(
+            preprocess_executor, preprocess_image, contents, deployment.labels
+        )))
+    
+    decoded = await asyncio.gather(*(task for _, _, task in pending), return_exceptions=True)
+    
+    ready_items = []
+    for (index, key, _), outcome in zip(pending, decoded):
+        if isinstance(outcome, Exception):
+            results[index] = {"filename": files[index].filename, "error": str(outcome)}
+        else:
+            ready_items.append((index, key, outcome))
+    return ready_items
+
+async def stream_predictions(items: AsyncIterator[Tuple[int, str, Callable[[], Awaitable[bytes]]]],
+                             deployment: Deployment,
+                             max_inflight: int) -> AsyncIterator[bytes]:
+    """
+    Classify images as they arrive and yield one NDJSON line per finished image.
+    
+    At most max_inflight images are loaded or classified at once, so memory
+    stays flat however many images the request holds. Lines are written in
+    completion order and tagged with the image's index and filename.
+    
+    Args:
+        items: Async iterator of (index, filename, loader) where loader returns the image bytes
+        deployment: Model version to classify with
+        max_inflight: Maximum number of images being processed concurrently
+    
+    Yields:
+        UTF-8 encoded JSON lines
+    """
+    async def process(index: int, filename: str, load: Callable[[], Awaitable[bytes]]) -> Dict:
+        try:
+            contents = await load()
+            prediction = await cached_classification(contents, deployment, run_classification)
+            return {"index": index, "filename": filename, "prediction": prediction}
+        except Exception as e:
+            return {"index": index, "filename": filename, "error": str(e)}
+    
+    pending = set()
+    try:
+        async for index, filename, load in items:
+            pending.add(asyncio.ensure_future(process(index, filename, load)))
+            if len(pending) < max_inflight:
+                continue
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield (json.dumps(task.result()) + "\n").encode("utf-8")
         
-        return {
-            "success": True,
-            "primary_prediction": {
-                "class": primary_class,
-                "description": predictions[0]["description"],
-                "confidence": primary_confidence
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield (json.dumps(task.result()) + "\n").encode("utf-8")
+    finally:
+        # The client went away or the request failed: don't keep computing for nobody,
+        # but let cancelled reads finish before the caller closes the uploads
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+async def open_stream(request: Request, deployment: Deployment, max_files: int) -> Tuple[AsyncExitStack, FormData]:
+    """
+    Hold a deployment and an admission slot and parse the upload before a stream starts.
+    
+    The body has to be read before the StreamingResponse starts, since
+    Starlette then listens for client disconnects on the same channel and
+    would consume body chunks. Taking the slot before answering also keeps
+    overload a clean 503.
+    
+    Args:
+        request: Incoming multipart request
+        deployment: Deployment the request was routed to
+        max_files: Maximum number of file parts
+    
+    Returns:
+        Tuple of (exit stack releasing the deployment, slot and uploaded files, parsed form).
+        Parsed files are Starlette UploadFiles, which are not instances of FastAPI's UploadFile subclass
+    
+    Raises:
+        ServerBusyError: If no admission slot frees up in time
+        HTTPException: 400 for malformed multipart data
+    """
+    stack = AsyncExitStack()
+    await stack.enter_async_context(admitted(deployment))
+    try:
+        form = await request.form(max_files=max_files)
+        stack.push_async_callback(form.close)
+    except BaseException:
+        await stack.aclose()
+        raise
+    return stack, form
+
+def ndjson_response(items: AsyncIterator[Tuple[int, str, Callable[[], Awaitable[bytes]]]],
+                    deployment: Deployment,
+                    slot: AsyncExitStack,
+                    description: str) -> StreamingResponse:
+    """
+    Stream predictions for uploaded images as an NDJSON response.
+    
+    The response owns the exit stack from open_stream and closes it when the
+    stream ends; a background task closes it too, in case the stream never
+    starts. A failure mid-stream ends it with a final error line.
+    
+    Args:
+        items: Async iterator of (index, filename, loader), as for stream_predictions
+        deployment: Model version to classify with
+        slot: Exit stack returned by open_stream
+        description: What the route does, for error logs
+    
+    Returns:
+        Streaming NDJSON response
+    """
+    async def body() -> AsyncIterator[bytes]:
+        async with slot:
+            try:
+                async for line in stream_predictions(items, deployment, config.stream_max_inflight):
+                    yield line
+            except Exception as e:
+                logger.error(f"{description} error: {e}")
+                yield (json.dumps({"error": str(e)}) + "\n").encode("utf-8")
+    
+    return StreamingResponse(
+        body(),
+        media_type="application/x-ndjson",
+        headers={"X-Model-Version": deployment.version},
+        background=BackgroundTask(slot.aclose)
+    )
+
+def multipart_request_body(field: str, multiple: bool = False) -> Dict:
+    """
+    OpenAPI request body for a route that parses its multipart form itself.
+    
+    Args:
+        field: Name of the file part
+        multiple: Whether the part may repeat
+    
+    Returns:
+        Value for the route's openapi_extra
+    """
+    schema = {"type": "string", "format": "binary"}
+    if multiple:
+        schema = {"type": "array", "items": schema}
+    return {
+        "requestBody": {
+            "content": {
+                "multipart/form-data": {
+                    "schema": {"type": "object", "properties": {field: schema}, "required": [field]}
+                }
             },
-            "all_predictions": predictions,
-            "risk_level": get_risk_level(primary_class, primary_confidence)
+            "required": True
         }
+    }
+
+@app.post("/predict")
+async def predict(file: UploadFile = File(...),
+                  tta: Optional[bool] = None,
+                  x_model_version: Optional[str] = Header(None)):
+    """
+    Predict skin lesion class from uploaded image.
     
-    except Exception as e:
-        logger.error(f"Prediction error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    Args:
+        file: Uploaded image file
+        tta: Enable test-time augmentation below the confidence threshold (defaults to config)
+        x_model_version: Optional X-Model-Version header pinning a deployed version
+    
+    Returns:
+        Prediction results
+    """
+    deployment = select_deployment(x_model_version)
+    
+    # Validate file type
+    if not (file.content_type or "").startswith("image/"):
+        raise HTTPException(status_code=400, detail="File must be an image")
+    
+    async with deployment.serve():
+        try:
+            with metrics.stage_timer("upload_read", *deployment.labels):
+                contents = await file.read()
+            use_tta = config.tta_enabled if tta is None else tta
+            return await cached_classification(contents, deployment, tta=use_tta)
+        
+        except ServerBusyError:
+            raise
+        except Exception as e:
+            logger.error(f"Prediction error: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/batch_predict")
-async def batch_predict(files: List[UploadFile] = File(...)):
+async def batch_predict(files: List[UploadFile] = File(...), x_model_version: Optional[str] = Header(None)):
     """
     Predict skin lesion classes for multiple images.
     
     Args:
         files: List of uploaded image files
+        x_model_version: Optional X-Model-Version header pinning a deployed version
     
     Returns:
         Batch prediction results
     """
-    results = []
+    deployment = select_deployment(x_model_version)
     
-    for file in files:
-        try:
-            result = await predict(file)
-            results.append({
-                "filename": file.filename,
-                "prediction": result
-            })
-        except Exception as e:
-            results.append({
-                "filename": file.filename,
-                "error": str(e)
+    def lookup(filename: str, contents: bytes) -> Tuple[Optional[str], Optional[Dict]]:
+        if prediction_cache is None:
+            return None, None
+        key = cache_key(contents, deployment)
+        cached = prediction_cache.get(key)
+        return key, {"filename": filename, "prediction": cached} if cached is not None else None
+    
+    async with admitted(deployment):
+        loop = asyncio.get_running_loop()
+        results: List[Optional[Dict]] = [None] * len(files)
+        ready_items = await decode_uploads(files, deployment, results, lookup)
+        indices = [index for index, _, _ in ready_items]
+        keys = [key for _, key, _ in ready_items]
+        tensors = [tensor for _, _, tensor in ready_items]
+        
+        # One forward per chunk, then softmax/topk over the whole batch at once
+        if tensors:
+            chunk_size = max(1, config.inference_max_batch_size)
+            try:
+                logits = []
+                for start in range(0, len(tensors), chunk_size):
+                    chunk = torch.stack(tensors[start:start + chunk_size])
+                    logits.append(await loop.run_in_executor(inference_executor, run_model, deployment, chunk))
+                predictions = build_predictions(F.softmax(torch.cat(logits), dim=1), deployment)
+            except Exception as e:
+                logger.error(f"Batch prediction error: {e}")
+                for index in indices:
+                    results[index] = {"filename": files[index].filename, "error": str(e)}
+            else:
+                for index, key, prediction in zip(indices, keys, predictions):
+                    results[index] = {"filename": files[index].filename, "prediction": prediction}
+                    if key is not None:
+                        prediction_cache.put(key, prediction)
+        
+        return {"results": results, "model_version": deployment.version}
+
+@app.post("/batch_predict/stream", openapi_extra=multipart_request_body("files", multiple=True))
+async def batch_predict_stream(request: Request, x_model_version: Optional[str] = Header(None)):
+    """
+    Predict skin lesion classes for multiple images, streaming results as NDJSON.
+    
+    Each line is written as soon as its image is classified, so lines may
+    arrive out of order; every line carries the image's index and filename.
+    Uploads stay open until the last image is done.
+    
+    Args:
+        request: Incoming multipart request with one or more "files" parts
+        x_model_version: Optional X-Model-Version header pinning a deployed version
+    
+    Returns:
+        Streaming NDJSON response
+    """
+    deployment = select_deployment(x_model_version)
+    slot, form = await open_stream(request, deployment, config.stream_max_files)
+    
+    async def uploads() -> AsyncIterator[Tuple[int, str, Callable[[], Awaitable[bytes]]]]:
+        for index, file in enumerate(form.getlist("files")):
+            if not isinstance(file, FormFile) or not (file.content_type or "").startswith("image/"):
+                async def reject() -> bytes:
+                    raise ValueError("File must be an image")
+                yield index, getattr(file, "filename", None), reject
+            else:
+                yield index, file.filename, file.read
+    
+    return ndjson_response(uploads(), deployment, slot, "Streaming batch prediction")
+
+@app.post("/archive_predict", openapi_extra=multipart_request_body("archive"))
+async def archive_predict(request: Request, x_model_version: Optional[str] = Header(None)):
+    """
+    Predict skin lesion classes for every image in a zip or tar archive.
+    
+    Entries are read straight from the uploaded archive (never extracted
+    to disk), decoded in parallel, classified in batches and streamed back
+    as NDJSON lines in completion order. The number of entries, their total
+    uncompressed size and each image's pixel count are limited by config.
+    
+    Args:
+        request: Incoming multipart request with one "archive" file part
+        x_model_version: Optional X-Model-Version header pinning a deployed version
+    
+    Returns:
+        Streaming NDJSON response
+    """
+    deployment = select_deployment(x_model_version)
+    slot, form = await open_stream(request, deployment, max_files=1)
+    archive = form.get("archive")
+    if not isinstance(archive, FormFile):
+        await slot.aclose()
+        raise HTTPException(status_code=400, detail="Request must include an 'archive' file")
+    
+    async def entries() -> AsyncIterator[Tuple[int, str, Callable[[], Awaitable[bytes]]]]:
+        images = iter_archive_images(
+            archive.file,
+            max_entries=config.archive_max_entries,
+            max_total_bytes=int(config.archive_max_total_mb * 1024 * 1024)
+        )
+        loop = asyncio.get_running_loop()
+        index = 0
+        while True:
+            # Entries are read lazily, only as fast as they are classified
+            try:
+                entry = await loop.run_in_executor(None, next, images, None)
+            except Exception as e:
+                # Limit breaches and corrupt archives end the stream with an error line
+                async def fail(error: Exception = e) -> bytes:
+                    raise error
+                yield index, None, fail
+                return
+            if entry is None:
+                return
+            
+            name, data = entry
+            async def load(data: bytes = data) -> bytes:
+                return data
+            yield index, name, load
+            index += 1
+    
+    return ndjson_response(entries(), deployment, slot, "Archive prediction")
+
+def explain_batch(deployment: Deployment,
+                  batch: torch.Tensor,
+                  class_indices: Optional[torch.Tensor]) -> List[List[Dict]]:
+    """
+    Compute Grad-CAM heatmaps for a batch and format them for the response.
+    
+    Args:
+        deployment: Model version to explain
+        batch: Preprocessed images of shape (batch_size, channels, height, width)
+        class_indices: Classes to explain per image, or None for each image's top-1 class
+    
+    Returns:
+        Per image, one explanation per requested class
+    """
+    with metrics.stage_timer("explain", *deployment.labels):
+        heatmaps, explained, probabilities = grad_cam(deployment.model, batch, class_indices, config.image_size)
+    
+    results = []
+    for row in range(heatmaps.shape[0]):
+        explanations = []
+        for column in range(heatmaps.shape[1]):
+            class_idx = int(explained[row, column])
+            class_name = config.class_names[class_idx]
+            png = base64.b64encode(heatmap_to_png(heatmaps[row, column])).decode("ascii")
+            explanations.append({
+                "class": class_name,
+                "description": config.class_name_map.get(class_name.lower(), class_name),
+                "confidence": float(probabilities[row, class_idx] * 100),
+                "heatmap": f"data:image/png;base64,{png}"
             })
+        results.append(explanations)
+    return results
+
+@app.post("/explain")
+async def explain(files: List[UploadFile] = File(...),
+                  classes: Optional[List[str]] = Query(None),
+                  x_model_version: Optional[str] = Header(None)):
+    """
+    Grad-CAM heatmaps showing which image regions drove a prediction.
+    
+    All images and classes in a request are explained in one batched
+    forward pass with one backward pass per class. Heatmaps are cached by
+    image content, class and model version, so the same lesion viewed on
+    several pages is only computed once.
     
-    return {"results": results}
+    Args:
+        files: Uploaded image files
+        classes: Class names to explain (defaults to each image's predicted class)
+        x_model_version: Optional X-Model-Version header pinning a deployed version
+    
+    Returns:
+        Per image, a grayscale PNG heatmap (data URI, values 0-255) per class
+    """
+    deployment = select_deployment(x_model_version)
+    if deployment.model is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Explanations need a PyTorch model; version {deployment.version} "
+                   f"is served by the {deployment.backend.name} backend"
+        )
+    if len(files) > config.explain_max_files:
+        raise HTTPException(status_code=400, detail=f"At most {config.explain_max_files} images per request")
+    
+    class_indices = None
+    if classes:
+        lookup = {name.upper(): idx for idx, name in enumerate(config.class_names)}
+        unknown = [name for name in classes if name.upper() not in lookup]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown classes {unknown}. Choose from {config.class_names}")
+        class_indices = list(dict.fromkeys(lookup[name.upper()] for name in classes))
+    labels = [config.class_names[idx] for idx in class_indices] if class_indices else ["top1"]
+    
+    def lookup(filename: str, contents: bytes) -> Tuple[List[str], Optional[Dict]]:
+        keys = [cache_key(contents, deployment, "gradcam", label) for label in labels]
+        if explanation_cache is not None:
+            cached = [explanation_cache.get(key) for key in keys]
+            if all(entry is not None for entry in cached):
+                return keys, {"filename": filename, "explanations": cached}
+        return keys, None
+    
+    async with admitted(deployment):
+        loop = asyncio.get_running_loop()
+        results: List[Optional[Dict]] = [None] * len(files)
+        ready_items = await decode_uploads(files, deployment, results, lookup)
+        
+        chunk_size = max(1, config.inference_max_batch_size)
+        for start in range(0, len(ready_items), chunk_size):
+            chunk = ready_items[start:start + chunk_size]
+            batch = torch.stack([tensor for _, _, tensor in chunk])
+            indices = torch.tensor([class_indices] * len(chunk)) if class_indices else None
+            try:
+                explanations = await loop.run_in_executor(inference_executor, explain_batch, deployment, batch, indices)
+            except Exception as e:
+                logger.error(f"Explanation error: {e}")
+                for index, _, _ in chunk:
+                    results[index] = {"filename": files[index].filename, "error": str(e)}
+                continue
+            
+            for (index, keys, _), image_explanations in zip(chunk, explanations):
+                results[index] = {"filename": files[index].filename, "explanations": image_explanations}
+                if explanation_cache is not None:
+                    for key, entry in zip(keys, image_explanations):
+                        explanation_cache.put(key, entry)
+        
+        return {"results": results, "model_version": deployment.version}
 
 def get_risk_level(class_name: str, confidence: float) -> str:
     """
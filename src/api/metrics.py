@@ -0,0 +1,133 @@
+"""
+Prometheus metrics for the MIDAS API
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+
+# Stages of a /predict call, in pipeline order
+STAGES = ['upload_read', 'decode', 'transform', 'forward', 'tta', 'explain', 'postprocess']
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.075,
+                   0.1, 0.15, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+
+REQUESTS = Counter(
+    "midas_requests_total",
+    "HTTP requests handled",
+    ["endpoint", "method", "status"]
+)
+ERRORS = Counter(
+    "midas_request_errors_total",
+    "HTTP requests that ended with a 4xx/5xx status",
+    ["endpoint", "method", "status"]
+)
+IN_FLIGHT = Gauge(
+    "midas_requests_in_flight",
+    "HTTP requests currently being handled",
+    ["endpoint"],
+    multiprocess_mode="livesum"
+)
+REQUEST_LATENCY = Histogram(
+    "midas_request_latency_seconds",
+    "End-to-end request latency until the response starts",
+    ["endpoint"],
+    buckets=LATENCY_BUCKETS
+)
+QUEUE_DEPTH = Gauge(
+    "midas_queue_depth",
+    "Requests waiting for an admission slot or a batch",
+    ["queue"],
+    multiprocess_mode="livesum"
+)
+STAGE_LATENCY = Histogram(
+    "midas_stage_latency_seconds",
+    "Latency of each inference stage (forward is per batch)",
+    ["stage", "model", "version"],
+    buckets=LATENCY_BUCKETS
+)
+BATCH_SIZE = Histogram(
+    "midas_batch_size",
+    "Images per forward pass",
+    ["model", "version"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+ENSEMBLE_MEMBER_LATENCY = Histogram(
+    "midas_ensemble_member_latency_seconds",
+    "Forward latency of each ensemble member (per batch)",
+    ["ensemble", "member"],
+    buckets=LATENCY_BUCKETS
+)
+CONFIDENCE = Histogram(
+    "midas_prediction_confidence_percent",
+    "Top-1 prediction confidence",
+    ["model", "version", "predicted_class"],
+    buckets=(10, 20, 30, 40, 50, 60, 70, 80, 90, 95, 99, 100)
+)
+CACHE = Gauge(
+    "midas_prediction_cache",
+    "Prediction cache counters and occupancy",
+    ["stat"],
+    multiprocess_mode="livesum"
+)
+
+@contextmanager
+def stage_timer(stage: str, model: str, version: str) -> Iterator[None]:
+    """
+    Time a block and record it as one observation of an inference stage.
+
+    Args:
+        stage: Stage name from STAGES
+        model: Model name label
+        version: Model version label
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(stage, model, version).observe(time.perf_counter() - start)
+
+def record_prediction(predicted_class: str, confidence: float, model: str, version: str) -> None:
+    """
+    Record the top-1 class and confidence of one prediction.
+
+    Args:
+        predicted_class: Top-1 class name
+        confidence: Top-1 confidence in percent
+        model: Model name label
+        version: Model version label
+    """
+    CONFIDENCE.labels(model, version, predicted_class).observe(confidence)
+
+def update_cache_stats(stats: Dict[str, float]) -> None:
+    """
+    Publish prediction cache counters.
+
+    Args:
+        stats: Dictionary from PredictionCache.stats()
+    """
+    for name in ('hits', 'misses', 'coalesced', 'evictions', 'expirations', 'entries', 'bytes', 'inflight'):
+        CACHE.labels(name).set(stats[name])
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    Render all metrics in the Prometheus text format.
+
+    When PROMETHEUS_MULTIPROC_DIR is set (multi-worker serving), metrics
+    from every worker process are aggregated.
+
+    Returns:
+        Tuple of (payload, content type)
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+
+    from prometheus_client import REGISTRY
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,251 @@
+"""
+Multi-process serving for the MIDAS API with shared model weights
+"""
+
+import gc
+import os
+import signal
+import socket
+import logging
+import sys
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import torch
+import uvicorn
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+class RestartPolicy:
+    """
+    Decides when a dead worker is restarted, with exponential backoff.
+
+    A worker that dies within ``min_uptime_s`` of starting counts as a fast
+    failure. Each consecutive fast failure doubles the restart delay, and a
+    slot is given up after ``max_fast_failures`` of them, so a worker that
+    crashes on import or bind cannot turn into an endless fork loop. A
+    worker that stayed up long enough resets its slot's count.
+    """
+
+    def __init__(self,
+                 base_delay_s: float = 1.0,
+                 max_delay_s: float = 60.0,
+                 min_uptime_s: float = 30.0,
+                 max_fast_failures: int = 5,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize restart policy.
+
+        Args:
+            base_delay_s: Delay before restarting after the first fast failure
+            max_delay_s: Upper bound on the delay
+            min_uptime_s: Uptime below which an exit counts as a fast failure
+            max_fast_failures: Consecutive fast failures after which a slot is given up
+            clock: Monotonic time source
+        """
+        self.base_delay_s = base_delay_s
+        self.max_delay_s = max_delay_s
+        self.min_uptime_s = min_uptime_s
+        self.max_fast_failures = max_fast_failures
+        self.clock = clock
+        self._started: Dict[int, float] = {}
+        self._fast_failures: Dict[int, int] = {}
+
+    def started(self, slot: int) -> None:
+        """Record that a slot's worker was (re)started."""
+        self._started[slot] = self.clock()
+
+    def failed(self, slot: int) -> Optional[float]:
+        """
+        Record that a slot's worker died.
+
+        Args:
+            slot: Worker slot
+
+        Returns:
+            Seconds to wait before restarting it, or None to give the slot up
+        """
+        uptime = self.clock() - self._started.get(slot, self.clock())
+        if uptime >= self.min_uptime_s:
+            self._fast_failures[slot] = 0
+            return 0.0
+
+        failures = self._fast_failures.get(slot, 0) + 1
+        self._fast_failures[slot] = failures
+        if failures >= self.max_fast_failures:
+            return None
+        return min(self.max_delay_s, self.base_delay_s * 2 ** (failures - 1))
+
+def _bind_socket(host: str, port: int) -> socket.socket:
+    """
+    Create the listening socket shared by all workers.
+
+    Args:
+        host: Interface to bind
+        port: Port to bind
+
+    Returns:
+        Bound, listening socket
+    """
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+def _run_worker(sock: socket.socket, threads: int, log_level: str) -> None:
+    """
+    Serve requests in a forked worker until told to stop.
+
+    Args:
+        sock: Listening socket inherited from the parent
+        threads: Intra-op threads for this worker's forward passes
+        log_level: Uvicorn log level
+    """
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    torch.set_num_threads(threads)
+
+    from api import inference_api
+    server = uvicorn.Server(uvicorn.Config(inference_api.app, log_level=log_level))
+    server.run(sockets=[sock])
+
+def _spawn_worker(sock: socket.socket, threads: int, log_level: str) -> int:
+    """Fork one worker process and return its pid."""
+    pid = os.fork()
+    if pid == 0:
+        exit_code = 0
+        try:
+            _run_worker(sock, threads, log_level)
+        except BaseException:
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+    return pid
+
+def serve(config, logger: Optional[logging.Logger] = None, log_level: str = "info") -> None:
+    """
+    Run the API with ``config.api_workers`` processes sharing one copy of the weights.
+
+    The model is loaded once in the parent, which then forks the workers.
+    Forked workers map the parent's weight pages copy-on-write, and inference
+    never writes to them, so resident memory for the weights is paid once
+    instead of once per worker. Versions hot swapped in from the model
+    registry later are loaded by each worker on its own; safetensors
+    checkpoints are memory-mapped, so their pages are still shared.
+    Falls back to a single in-process server on platforms without ``fork``,
+    when only one worker is configured, or on CUDA devices: the parent has
+    usually initialised CUDA by then (even querying the GPU name does), and
+    forked children cannot re-initialise it.
+
+    Args:
+        config: Configuration object
+        logger: Optional logger instance
+        log_level: Uvicorn log level
+    """
+    logger = logger or logging.getLogger(__name__)
+    workers = max(1, config.api_workers)
+    cuda = str(config.device).startswith("cuda")
+    forking = workers > 1 and hasattr(os, "fork") and not cuda
+
+    metrics_dir = None
+    if forking and "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        # Workers write their metrics to files here so /metrics can aggregate them;
+        # prometheus_client reads this variable when it is first imported
+        metrics_dir = tempfile.mkdtemp(prefix="midas-metrics-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+
+    from api import inference_api
+    inference_api.config = config
+
+    if not forking:
+        if workers > 1 and cuda:
+            logger.warning("CUDA cannot be used from forked workers; starting a single worker")
+        elif workers > 1:
+            logger.warning("Multi-process serving needs fork(); starting a single worker")
+        uvicorn.run(inference_api.app, host=config.api_host, port=config.api_port, log_level=log_level)
+        return
+
+    # Keep the parent single-threaded so no intra-op thread pool exists at fork time
+    torch.set_num_threads(1)
+    inference_api.preload_deployments()
+
+    # Move everything allocated so far out of the collector's reach so that
+    # garbage collection in the workers does not dirty the shared pages
+    gc.collect()
+    gc.freeze()
+
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    sock = _bind_socket(config.api_host, config.api_port)
+    logger.info(f"Serving on {config.api_host}:{config.api_port} with {workers} workers "
+                f"({threads} inference threads each)")
+
+    restarts = RestartPolicy(
+        base_delay_s=config.api_worker_restart_backoff_s,
+        min_uptime_s=config.api_worker_min_uptime_s,
+        max_fast_failures=config.api_worker_max_fast_failures
+    )
+    children: Dict[int, int] = {}
+    for slot in range(workers):
+        children[_spawn_worker(sock, threads, log_level)] = slot
+        restarts.started(slot)
+
+    stopping = False
+
+    def _shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, _shutdown)
+    signal.signal(signal.SIGTERM, _shutdown)
+
+    # Supervise: restart workers that die unexpectedly until asked to stop
+    failed_slots = 0
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+
+        slot = children.pop(pid, None)
+        if slot is None or stopping:
+            continue
+
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(pid)
+
+        delay = restarts.failed(slot)
+        if delay is None:
+            failed_slots += 1
+            logger.error(f"Worker {slot} (pid {pid}) exited with status {status}; it failed "
+                         f"{restarts.max_fast_failures} times in a row, not restarting it")
+            continue
+        logger.warning(f"Worker {slot} (pid {pid}) exited with status {status}; restarting in {delay:.0f} s")
+        # Sleep in short steps so a shutdown signal is not held up by the backoff
+        deadline = time.monotonic() + delay
+        while not stopping and time.monotonic() < deadline:
+            time.sleep(max(0.0, min(0.5, deadline - time.monotonic())))
+        if stopping:
+            continue
+        children[_spawn_worker(sock, threads, log_level)] = slot
+        restarts.started(slot)
+
+    sock.close()
+    if metrics_dir is not None:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+    logger.info("All API workers stopped")
+    if failed_slots and not stopping:
+        raise RuntimeError(f"{failed_slots} of {workers} API workers kept failing; see the log above")
@@ -52,19 +52,85 @@ class MIDASConfig:
     num_epochs: int = 50
     validation_split: float = 0.2
     test_split: float = 0.1
+    checkpoint_keep_last: int = 3  # Epoch checkpoints kept in models/checkpoints, besides the best model
+    async_checkpointing: bool = True  # Write checkpoints on a background thread
     
     # Image Settings
     image_size: tuple = (224, 224)
     normalize_mean: List[float] = field(default_factory=lambda: [0.485, 0.456, 0.406])
     normalize_std: List[float] = field(default_factory=lambda: [0.229, 0.224, 0.225])
+    reduced_decode: bool = True  # Decode large JPEGs at reduced DCT scale
+    max_image_pixels: int = 40_000_000  # Reject uploads larger than this before decoding
     
     # API Settings
     api_host: str = "0.0.0.0"
     api_port: int = 8000
     api_workers: int = 4
+    api_worker_restart_backoff_s: float = 1.0  # First restart delay after a fast crash; doubles per crash
+    api_worker_min_uptime_s: float = 30.0  # Workers that die sooner count as fast crashes
+    api_worker_max_fast_failures: int = 5  # Stop restarting a worker after this many fast crashes in a row
     
-    def __post_init__(self):
-        """Create directories if they don't exist after initialization."""
+    # Inference Settings
+    inference_max_batch_size: int = 16
+    inference_max_wait_ms: float = 5.0
+    inference_preprocess_workers: int = 4
+    inference_threads: int = 1
+    inference_max_concurrency: int = 32
+    inference_max_queue: int = 64
+    inference_queue_timeout_s: float = 10.0
+    inference_retry_after_s: int = 1
+    stream_max_inflight: int = 32
+    stream_max_files: int = 1000
+    archive_max_entries: int = 1000  # Members of any kind, including directories and non-images
+    archive_max_total_mb: float = 2048.0
+    
+    # Inference Backend Settings
+    inference_backend: str = "torch"  # "torch", "onnx" or "quantized"
+    onnx_model_path: Path = models_dir / "exported" / "midas.onnx"
+    onnx_num_threads: int = 0  # 0 lets ONNX Runtime decide
+    quantized_model_path: Path = models_dir / "exported" / "midas_int8.pt"
+    quantization_calibration_images: int = 512
+    
+    # Graph Mode Settings
+    graph_mode: str = "eager"  # "eager", "torchscript" or "compile"
+    compile_mode: str = "default"  # torch.compile mode, e.g. "max-autotune"
+    compiled_cache_dir: Path = models_dir / "compiled"
+    serving_batch_sizes: List[int] = field(default_factory=lambda: [1, 2, 4, 8, 16])
+    
+    # Readiness Settings
+    warmup_enabled: bool = True  # Run synthetic batches at every serving batch size before /ready
+    warmup_iterations: int = 2
+    serve_untrained_model: bool = False  # Report ready even without trained weights
+    
+    # Model Registry Settings
+    registry_dir: Path = models_dir / "registry"
+    registry_poll_interval_s: float = 5.0  # How often workers check for routing changes (0 disables)
+    
+    # Ensemble Settings
+    ensemble_members: Dict[str, float] = field(default_factory=dict)  # Registry version -> weight; set to serve an ensemble
+    
+    # Test-Time Augmentation Settings
+    tta_enabled: bool = False  # Default for /predict; overridable per request with ?tta=
+    tta_views: List[str] = field(default_factory=lambda: ['identity', 'hflip', 'vflip', 'rot90'])
+    tta_confidence_threshold: float = 100.0  # Only augment when top-1 confidence (%) is below this
+    
+    # CPU Fast-Math Settings
+    cpu_fast_math: bool = False  # channels_last + bf16 autocast where the CPU supports it
+    fast_math_min_agreement: float = 0.99
+    
+    # Prediction Cache Settings
+    prediction_cache_enabled: bool = True
+    prediction_cache_max_entries: int = 4096
+    prediction_cache_ttl_s: float = 3600.0
+    prediction_cache_max_mb: float = 64.0
+    
+    # Explanation Settings
+    explain_max_files: int = 16
+    explain_cache_max_entries: int = 512
+    explain_cache_max_mb: float = 128.0
+    
+    def ensure_dirs(self) -> None:
+        """Create the model, result and log directories if they don't exist."""
         self.models_dir.mkdir(parents=True, exist_ok=True)
         (self.models_dir / "checkpoints").mkdir(exist_ok=True)
         (self.models_dir / "trained").mkdir(exist_ok=True)
@@ -86,6 +152,3 @@ class MIDASConfig:
             "num_epochs": self.num_epochs,
             "image_size": self.image_size
         }
-
-# Global config instance
-config = MIDASConfig()
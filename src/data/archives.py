@@ -0,0 +1,104 @@
+"""
+Streaming image extraction from zip/tar archives for MIDAS system
+"""
+
+import tarfile
+import zipfile
+from pathlib import PurePosixPath
+from typing import BinaryIO, Iterator, Tuple
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp'}
+
+class ArchiveLimitError(ValueError):
+    """
+    Raised when an archive exceeds the configured entry count or size limits.
+    """
+
+def _is_image_entry(name: str) -> bool:
+    """Whether an archive member looks like a user image (skips macOS metadata and dotfiles)."""
+    path = PurePosixPath(name)
+    if path.parts and path.parts[0] == '__MACOSX':
+        return False
+    if path.name.startswith('.'):
+        return False
+    return path.suffix.lower() in IMAGE_EXTENSIONS
+
+def iter_archive_images(fileobj: BinaryIO,
+                        max_entries: int = 1000,
+                        max_total_bytes: int = 2 * 1024 ** 3) -> Iterator[Tuple[str, bytes]]:
+    """
+    Iterate over the images in a zip or tar archive without extracting to disk.
+
+    Entries are read one at a time into memory. Sizes are enforced on the
+    bytes actually decompressed rather than the sizes the archive declares,
+    so archives that lie about their contents (zip bombs) are cut off at
+    the limit. Every member counts toward the entry limit, including
+    directories and skipped non-image files, and tar members are not
+    cached, so memory stays flat however many members an archive holds.
+
+    Args:
+        fileobj: Seekable binary file holding the archive
+        max_entries: Maximum number of archive members
+        max_total_bytes: Maximum total uncompressed size of image entries
+
+    Yields:
+        Tuples of (entry name, raw bytes)
+
+    Raises:
+        ArchiveLimitError: When a limit is exceeded
+        ValueError: If the file is neither a zip nor a tar archive
+    """
+    count = 0
+    remaining = max_total_bytes
+
+    def check_entry() -> None:
+        nonlocal count
+        count += 1
+        if count > max_entries:
+            raise ArchiveLimitError(f"Archive has more than {max_entries} entries")
+
+    def check_size(data: bytes) -> None:
+        nonlocal remaining
+        remaining -= len(data)
+        if remaining < 0:
+            raise ArchiveLimitError(f"Archive images exceed {max_total_bytes} bytes uncompressed")
+
+    fileobj.seek(0)
+    if zipfile.is_zipfile(fileobj):
+        fileobj.seek(0)
+        with zipfile.ZipFile(fileobj) as archive:
+            # The central directory is already parsed, so reject oversized archives up front
+            if len(archive.infolist()) > max_entries:
+                raise ArchiveLimitError(f"Archive has more than {max_entries} entries")
+            for info in archive.infolist():
+                check_entry()
+                if info.is_dir() or not _is_image_entry(info.filename):
+                    continue
+                with archive.open(info) as entry:
+                    data = entry.read(remaining + 1)
+                check_size(data)
+                yield info.filename, data
+        return
+
+    fileobj.seek(0)
+    try:
+        archive = tarfile.open(fileobj=fileobj, mode='r:*')
+    except tarfile.TarError:
+        raise ValueError("Upload must be a zip or tar archive")
+
+    with archive:
+        while True:
+            member = archive.next()
+            if member is None:
+                break
+            # TarFile keeps every member it has read; drop them so memory stays flat
+            archive.members = []
+            check_entry()
+            if not member.isfile() or not _is_image_entry(member.name):
+                continue
+            entry = archive.extractfile(member)
+            if entry is None:
+                continue
+            data = entry.read(remaining + 1)
+            check_size(data)
+            yield member.name, data
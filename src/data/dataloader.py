@@ -3,15 +3,15 @@ Data loading and preprocessing for MIDAS system
 """
 
 import pandas as pd
-import numpy as np
 from pathlib import Path
 from typing import Optional, Tuple, Dict, List
 import logging
-from PIL import Image
 import torch
 from torch.utils.data import Dataset, DataLoader
 from torchvision import transforms
-from sklearn.model_selection import train_test_split, StratifiedKFold
+from sklearn.model_selection import train_test_split
+
+from data.preprocessing import InferencePreprocessor, open_image
 
 class SkinLesionDataset(Dataset):
     """
@@ -21,7 +21,8 @@ class SkinLesionDataset(Dataset):
     def __init__(self, 
                  image_paths: List[Path],
                  labels: List[int],
-                 transform: Optional[transforms.Compose] = None):
+                 transform: Optional[transforms.Compose] = None,
+                 decode_size: Optional[Tuple[int, int]] = None):
         """
         Initialize dataset.
         
@@ -29,10 +30,13 @@ class SkinLesionDataset(Dataset):
             image_paths: List of paths to images
             labels: List of corresponding labels
             transform: Optional transform to apply to images
+            decode_size: Optional (height, width) the transform resizes to;
+                large JPEGs are then decoded at reduced scale
         """
         self.image_paths = image_paths
         self.labels = labels
         self.transform = transform
+        self.decode_size = decode_size
     
     def __len__(self) -> int:
         return len(self.image_paths)
@@ -51,7 +55,7 @@ class SkinLesionDataset(Dataset):
         label = self.labels[idx]
         
         # Load image
-        image = Image.open(image_path).convert('RGB')
+        image = open_image(image_path, self.decode_size)
         
         # Apply transforms
         if self.transform:
@@ -190,6 +194,124 @@ class DataManager:
                 transforms.Normalize(mean=self.config.normalize_mean, std=self.config.normalize_std)
             ])
     
+    def get_labeled_samples(self, dataset: Dict) -> Tuple[List[Path], List[int]]:
+        """
+        Match dataset images to their class labels.
+        
+        Args:
+            dataset: Dictionary returned by load_ham10000
+        
+        Returns:
+            Tuple of (image paths, class indices) for images with a known diagnosis
+        """
+        metadata = dataset.get('metadata')
+        if metadata is None:
+            return [], []
+        
+        paths_by_id = {path.stem: path for path in dataset.get('image_paths', [])}
+        class_index = {name.lower(): idx for idx, name in enumerate(self.config.class_names)}
+        
+        image_paths, labels = [], []
+        for image_id, diagnosis in zip(metadata['image_id'], metadata['dx']):
+            path = paths_by_id.get(image_id)
+            label = class_index.get(str(diagnosis).lower())
+            if path is not None and label is not None:
+                image_paths.append(path)
+                labels.append(label)
+        
+        return image_paths, labels
+    
+    def get_split_loader(self,
+                         split: str = 'val',
+                         max_images: Optional[int] = None,
+                         batch_size: int = 32,
+                         num_workers: int = 4) -> Optional[DataLoader]:
+        """
+        Get a loader over one HAM10000 split with inference transforms.
+        
+        Uses the same stratified split as create_data_loaders, without
+        augmentation, e.g. for calibration (train) or evaluation (val/test).
+        
+        Args:
+            split: One of 'train', 'val' or 'test'
+            max_images: Optional cap on the number of images
+            batch_size: Batch size for the loader
+            num_workers: Number of loader worker processes
+        
+        Returns:
+            DataLoader, or None if HAM10000 is not available
+        """
+        ham10000 = self.load_ham10000()
+        image_paths, labels = self.get_labeled_samples(ham10000) if ham10000 else ([], [])
+        if not image_paths:
+            return None
+        
+        splits = self.split_samples(image_paths, labels, self.config.validation_split, self.config.test_split)
+        split_paths, split_labels = splits[split]
+        if max_images is not None:
+            split_paths, split_labels = split_paths[:max_images], split_labels[:max_images]
+        
+        _, eval_decode_size = self.get_decode_sizes()
+        dataset = SkinLesionDataset(split_paths, split_labels, self.get_transforms(is_train=False), eval_decode_size)
+        
+        return DataLoader(dataset, batch_size=batch_size, shuffle=False, num_workers=num_workers)
+    
+    def split_samples(self,
+                      image_paths: List[Path],
+                      labels: List[int],
+                      val_split: float = 0.2,
+                      test_split: float = 0.1) -> Dict[str, Tuple[List[Path], List[int]]]:
+        """
+        Split samples into stratified train, validation and test sets.
+        
+        Args:
+            image_paths: List of image paths
+            labels: List of labels
+            val_split: Validation split ratio
+            test_split: Test split ratio
+        
+        Returns:
+            Dictionary mapping 'train', 'val' and 'test' to (paths, labels)
+        """
+        X_temp, X_test, y_temp, y_test = train_test_split(
+            image_paths, labels, test_size=test_split, stratify=labels, random_state=self.config.seed
+        )
+        
+        X_train, X_val, y_train, y_val = train_test_split(
+            X_temp, y_temp, test_size=val_split/(1-test_split), stratify=y_temp, random_state=self.config.seed
+        )
+        
+        return {
+            'train': (X_train, y_train),
+            'val': (X_val, y_val),
+            'test': (X_test, y_test)
+        }
+    
+    def get_decode_sizes(self) -> Tuple[Optional[Tuple[int, int]], Optional[Tuple[int, int]]]:
+        """
+        Get the reduced-decode target sizes for the train and eval transforms.
+        
+        Returns:
+            Tuple of (train size, eval size), both None when reduced decode is disabled
+        """
+        if not self.config.reduced_decode:
+            return None, None
+        
+        height, width = self.config.image_size
+        return (height + 32, width + 32), (height, width)
+    
+    def get_inference_preprocessor(self) -> InferencePreprocessor:
+        """
+        Get the fast inference preprocessor.
+        
+        Numerically equivalent to get_transforms(is_train=False), but built
+        once and fused into a single normalization step.
+        
+        Returns:
+            Inference preprocessor
+        """
+        return InferencePreprocessor.from_config(self.config)
+    
     def create_data_loaders(self, 
                           image_paths: List[Path],
                           labels: List[int],
@@ -210,18 +332,16 @@ class DataManager:
             Tuple of (train_loader, val_loader, test_loader)
         """
         # Split data
-        X_temp, X_test, y_temp, y_test = train_test_split(
-            image_paths, labels, test_size=test_split, stratify=labels, random_state=self.config.seed
-        )
-        
-        X_train, X_val, y_train, y_val = train_test_split(
-            X_temp, y_temp, test_size=val_split/(1-test_split), stratify=y_temp, random_state=self.config.seed
-        )
+        splits = self.split_samples(image_paths, labels, val_split, test_split)
+        X_train, y_train = splits['train']
+        X_val, y_val = splits['val']
+        X_test, y_test = splits['test']
         
         # Create datasets
-        train_dataset = SkinLesionDataset(X_train, y_train, self.get_transforms(is_train=True))
-        val_dataset = SkinLesionDataset(X_val, y_val, self.get_transforms(is_train=False))
-        test_dataset = SkinLesionDataset(X_test, y_test, self.get_transforms(is_train=False))
+        train_decode_size, eval_decode_size = self.get_decode_sizes()
+        train_dataset = SkinLesionDataset(X_train, y_train, self.get_transforms(is_train=True), train_decode_size)
+        val_dataset = SkinLesionDataset(X_val, y_val, self.get_transforms(is_train=False), eval_decode_size)
+        test_dataset = SkinLesionDataset(X_test, y_test, self.get_transforms(is_train=False), eval_decode_size)
         
         # Create loaders
         train_loader = DataLoader(train_dataset, batch_size=batch_size, shuffle=True, num_workers=4, pin_memory=True)
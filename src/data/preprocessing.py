@@ -0,0 +1,119 @@
+"""
+Fast inference-time preprocessing for MIDAS system
+"""
+
+from typing import BinaryIO, List, Optional, Tuple, Union
+from pathlib import Path
+
+import numpy as np
+import torch
+from PIL import Image
+
+def open_image(source: Union[str, Path, BinaryIO],
+               target_size: Optional[Tuple[int, int]] = None,
+               max_pixels: Optional[int] = None) -> Image.Image:
+    """
+    Open and decode an image as RGB, decoding large JPEGs at reduced scale.
+
+    For JPEG input, the decoder is asked for the smallest DCT scale (1/2, 1/4
+    or 1/8) whose output is still at least ``target_size``, so a 4000 px
+    photo headed for 224 px is never decoded at full resolution. The result
+    is then resized as usual. Other formats, and JPEGs already close to the
+    target size, are decoded exactly as before.
+
+    Args:
+        source: File path or binary file object
+        target_size: (height, width) the image will be resized to, or None
+            to always decode at full resolution
+        max_pixels: Optional limit on width * height, checked from the
+            header before any pixel data is decoded
+
+    Returns:
+        RGB PIL image
+
+    Raises:
+        ValueError: If the image has more than max_pixels pixels
+    """
+    image = Image.open(source)
+    if max_pixels is not None and image.size[0] * image.size[1] > max_pixels:
+        raise ValueError(f"Image is {image.size[0]}x{image.size[1]}, larger than the {max_pixels} pixel limit")
+    if target_size is not None and image.format == 'JPEG':
+        height, width = target_size
+        image.draft('RGB', (width, height))
+    return image.convert('RGB')
+
+class InferencePreprocessor:
+    """
+    Reusable resize + normalize pipeline for inference.
+
+    Equivalent to ``Resize -> ToTensor -> Normalize`` from
+    ``DataManager.get_transforms(is_train=False)``, but built once and with
+    the ``/255``, mean subtraction and std division folded into a single
+    per-channel scale and bias. The uint8 -> float conversion is fused with
+    the scaling, so the separate float intermediates produced by ToTensor
+    and Normalize are never materialized.
+    """
+
+    def __init__(self,
+                 image_size: Tuple[int, int] = (224, 224),
+                 mean: Optional[List[float]] = None,
+                 std: Optional[List[float]] = None):
+        """
+        Initialize preprocessor.
+
+        Args:
+            image_size: Output (height, width)
+            mean: Per-channel normalization mean
+            std: Per-channel normalization std
+        """
+        mean = mean if mean is not None else [0.485, 0.456, 0.406]
+        std = std if std is not None else [0.229, 0.224, 0.225]
+
+        self.image_size = (int(image_size[0]), int(image_size[1]))
+
+        # (x / 255 - mean) / std  ==  x * scale + bias
+        mean_t = torch.tensor(mean, dtype=torch.float32).view(-1, 1, 1)
+        std_t = torch.tensor(std, dtype=torch.float32).view(-1, 1, 1)
+        self.scale = 1.0 / (255.0 * std_t)
+        self.bias = -mean_t / std_t
+
+    @classmethod
+    def from_config(cls, config) -> "InferencePreprocessor":
+        """
+        Build a preprocessor from the project configuration.
+
+        Args:
+            config: Configuration object
+
+        Returns:
+            Preprocessor matching the config's image size and normalization
+        """
+        return cls(config.image_size, config.normalize_mean, config.normalize_std)
+
+    def __call__(self, image: Image.Image, out: Optional[torch.Tensor] = None) -> torch.Tensor:
+        """
+        Preprocess one image.
+
+        Args:
+            image: PIL image
+            out: Optional preallocated float32 tensor of shape (3, height, width)
+                to write into, e.g. a row of a batch buffer
+
+        Returns:
+            Normalized image tensor of shape (3, height, width)
+        """
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        height, width = self.image_size
+        if image.size != (width, height):
+            image = image.resize((width, height), Image.BILINEAR)
+
+        pixels = torch.from_numpy(np.array(image)).permute(2, 0, 1)
+
+        if out is None:
+            out = torch.empty((3, height, width), dtype=torch.float32)
+
+        # uint8 -> float conversion and scaling in one op, then the folded bias
+        torch.mul(pixels, self.scale, out=out)
+        return out.add_(self.bias)
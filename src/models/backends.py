@@ -0,0 +1,363 @@
+"""
+Pluggable inference backends for MIDAS models
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+class InferenceBackend:
+    """
+    Base class for inference backends.
+
+    A backend maps a preprocessed float batch of shape
+    (batch_size, channels, height, width) to logits of shape
+    (batch_size, num_classes) on the CPU.
+    """
+
+    name = "base"
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        raise NotImplementedError
+
+class TorchBackend(InferenceBackend):
+    """
+    PyTorch backend for eager, TorchScript or torch.compile'd models.
+
+    With ``batch_buckets`` set, every batch is zero-padded up to the nearest
+    bucket size (and split if larger than the largest), so shape-specialized
+    graphs only ever see the batch sizes they were warmed up for.
+    """
+
+    name = "torch"
+
+    def __init__(self,
+                 model: Callable[[torch.Tensor], torch.Tensor],
+                 device: Union[str, torch.device] = 'cpu',
+                 batch_buckets: Optional[List[int]] = None,
+                 channels_last: bool = False,
+                 autocast_dtype: Optional[torch.dtype] = None):
+        """
+        Initialize backend.
+
+        Args:
+            model: Model in eval mode
+            device: Device the model lives on
+            batch_buckets: Optional batch sizes to pad inputs up to
+            channels_last: Feed inputs in channels_last memory format
+            autocast_dtype: Optional reduced precision to autocast the forward to
+        """
+        self.model = model
+        self.device = torch.device(device)
+        self.batch_buckets = sorted(set(batch_buckets)) if batch_buckets else None
+        self.memory_format = torch.channels_last if channels_last else torch.contiguous_format
+        self.autocast_dtype = autocast_dtype
+
+    def _forward(self, batch: torch.Tensor) -> torch.Tensor:
+        """Run one batch through the model in the configured memory format and precision."""
+        batch = batch.to(self.device).contiguous(memory_format=self.memory_format)
+        with torch.no_grad(), torch.autocast(self.device.type,
+                                             dtype=self.autocast_dtype or torch.bfloat16,
+                                             enabled=self.autocast_dtype is not None):
+            return self.model(batch).float().cpu()
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        if not self.batch_buckets:
+            return self._forward(batch)
+
+        largest = self.batch_buckets[-1]
+        outputs = []
+        for start in range(0, batch.shape[0], largest):
+            chunk = batch[start:start + largest]
+            size = chunk.shape[0]
+            bucket = next(b for b in self.batch_buckets if b >= size)
+            if bucket > size:
+                chunk = torch.cat([chunk, chunk.new_zeros((bucket - size, *chunk.shape[1:]))])
+            outputs.append(self._forward(chunk)[:size])
+        return torch.cat(outputs)
+
+class TorchScriptBackend(InferenceBackend):
+    """
+    Backend for serialized TorchScript artifacts, such as INT8 quantized models.
+    """
+
+    name = "torchscript"
+
+    def __init__(self, model_path: Union[str, Path], name: Optional[str] = None):
+        """
+        Initialize backend.
+
+        Args:
+            model_path: Path to the TorchScript file
+            name: Optional backend name override (e.g. 'quantized')
+
+        Raises:
+            FileNotFoundError: If the model file does not exist
+        """
+        if not Path(model_path).exists():
+            raise FileNotFoundError(f"TorchScript model not found at: {model_path}")
+
+        self.model_path = Path(model_path)
+        self.model = torch.jit.load(str(model_path), map_location='cpu').eval()
+        if name:
+            self.name = name
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        with torch.no_grad():
+            return self.model(batch.cpu()).float()
+
+class OnnxRuntimeBackend(InferenceBackend):
+    """
+    ONNX Runtime CPU backend for models exported with ``export_onnx``.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_path: Union[str, Path], num_threads: Optional[int] = None):
+        """
+        Initialize backend.
+
+        Args:
+            model_path: Path to the exported ONNX model
+            num_threads: Intra-op threads for ONNX Runtime (None lets it decide)
+
+        Raises:
+            ImportError: If onnxruntime is not installed
+            FileNotFoundError: If the model file does not exist
+        """
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("The onnx backend requires onnxruntime: pip install onnxruntime") from e
+
+        if not Path(model_path).exists():
+            raise FileNotFoundError(f"ONNX model not found at: {model_path}")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+
+        self.model_path = Path(model_path)
+        self.session = ort.InferenceSession(
+            str(model_path),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        inputs = np.ascontiguousarray(batch.detach().cpu().numpy(), dtype=np.float32)
+        outputs = self.session.run(None, {self.input_name: inputs})
+        return torch.from_numpy(outputs[0])
+
+@dataclass
+class EnsembleMember:
+    """One model in an ensemble."""
+
+    name: str
+    backend: InferenceBackend
+    weight: float = 1.0
+    image_size: Tuple[int, int] = (224, 224)
+
+class EnsembleBackend(InferenceBackend):
+    """
+    Weighted probability-averaging ensemble of backends.
+
+    The incoming batch is resized once per distinct member resolution (in
+    tensor space, so images are decoded and normalized only once), members
+    run concurrently on a thread pool, and their softmax outputs are
+    averaged with the member weights. The log of the averaged probabilities
+    is returned in place of logits, so a downstream softmax recovers them.
+    """
+
+    name = "ensemble"
+
+    def __init__(self,
+                 members: List[EnsembleMember],
+                 on_member_latency: Optional[Callable[[str, float], None]] = None):
+        """
+        Initialize backend.
+
+        Args:
+            members: Ensemble members with positive weights
+            on_member_latency: Optional callback receiving (member name, seconds) per forward
+
+        Raises:
+            ValueError: If there are no members or the weights are not positive
+        """
+        if not members:
+            raise ValueError("An ensemble needs at least one member")
+        if any(member.weight <= 0 for member in members):
+            raise ValueError("Ensemble member weights must be positive")
+
+        self.members = members
+        self.total_weight = sum(member.weight for member in members)
+        self.on_member_latency = on_member_latency
+        self.executor = ThreadPoolExecutor(max_workers=len(members), thread_name_prefix="midas-ensemble")
+
+        self._lock = threading.Lock()
+        self._calls = {member.name: 0 for member in members}
+        self._seconds = {member.name: 0.0 for member in members}
+
+    def _run_member(self, member: EnsembleMember, batch: torch.Tensor) -> torch.Tensor:
+        """Run one member on its resized batch, recording its latency, and return its probabilities."""
+        start = time.perf_counter()
+        probabilities = F.softmax(member.backend(batch), dim=1)
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self._calls[member.name] += 1
+            self._seconds[member.name] += elapsed
+        if self.on_member_latency is not None:
+            self.on_member_latency(member.name, elapsed)
+        return probabilities
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        inputs = {}
+        for size in {tuple(member.image_size) for member in self.members}:
+            if tuple(batch.shape[-2:]) == size:
+                inputs[size] = batch
+            else:
+                inputs[size] = F.interpolate(batch, size=size, mode='bilinear', align_corners=False, antialias=True)
+
+        futures = [
+            (member, self.executor.submit(self._run_member, member, inputs[tuple(member.image_size)]))
+            for member in self.members
+        ]
+        probabilities = sum(member.weight * future.result() for member, future in futures) / self.total_weight
+        return torch.log(probabilities.clamp_min(1e-12))
+
+    def member_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get per-member weights, resolutions and mean forward latency.
+
+        Returns:
+            Dictionary of member name to stats
+        """
+        with self._lock:
+            return {
+                member.name: {
+                    "weight": member.weight,
+                    "image_size": list(member.image_size),
+                    "calls": self._calls[member.name],
+                    "mean_latency_ms": (self._seconds[member.name] / self._calls[member.name] * 1000.0
+                                        if self._calls[member.name] else None)
+                }
+                for member in self.members
+            }
+
+    def close(self) -> None:
+        """Shut down the member thread pool."""
+        self.executor.shutdown(wait=False)
+
+def backend_artifact_path(config) -> Optional[Path]:
+    """
+    Get the serialized model a backend serves from, if it does not use a checkpoint.
+
+    Args:
+        config: Configuration object
+
+    Returns:
+        Artifact path for the onnx and quantized backends, None for torch
+    """
+    if config.inference_backend == "onnx":
+        return Path(config.onnx_model_path)
+    if config.inference_backend == "quantized":
+        return Path(config.quantized_model_path)
+    return None
+
+def create_backend(config,
+                   model: Optional[Callable[[torch.Tensor], torch.Tensor]] = None,
+                   device: Union[str, torch.device] = 'cpu',
+                   logger: Optional[logging.Logger] = None,
+                   fast_math: Optional[Dict[str, Any]] = None) -> InferenceBackend:
+    """
+    Create the inference backend selected by ``config.inference_backend``.
+
+    Args:
+        config: Configuration object
+        model: Loaded (possibly compiled) PyTorch model, required for the torch backend
+        device: Device of the PyTorch model
+        logger: Optional logger
+        fast_math: Settings from ``configure_cpu_fast_math`` for the torch backend
+
+    Returns:
+        Inference backend
+
+    Raises:
+        ValueError: If the configured backend is unknown or its inputs are missing
+    """
+    backend_name = config.inference_backend
+
+    if backend_name == "torch":
+        if model is None:
+            raise ValueError("The torch backend needs a loaded model")
+        batch_buckets = config.serving_batch_sizes if config.graph_mode != "eager" else None
+        fast_math = fast_math or {}
+        backend = TorchBackend(
+            model, device, batch_buckets,
+            channels_last=fast_math.get("channels_last", False),
+            autocast_dtype=torch.bfloat16 if fast_math.get("bf16") else None
+        )
+    elif backend_name == "onnx":
+        backend = OnnxRuntimeBackend(config.onnx_model_path, num_threads=config.onnx_num_threads)
+    elif backend_name == "quantized":
+        backend = TorchScriptBackend(config.quantized_model_path, name="quantized")
+    else:
+        raise ValueError(f"Inference backend {backend_name} not supported. "
+                         f"Choose from ['torch', 'onnx', 'quantized']")
+
+    if logger:
+        logger.info(f"Using {backend.name} inference backend")
+    return backend
+
+def compare_backends(reference: InferenceBackend,
+                     candidate: InferenceBackend,
+                     batches: Iterable[torch.Tensor],
+                     k: int = 3) -> Dict[str, Any]:
+    """
+    Check that two backends produce the same predictions.
+
+    Args:
+        reference: Backend treated as ground truth
+        candidate: Backend under test
+        batches: Preprocessed input batches
+        k: Number of top classes compared
+
+    Returns:
+        Dictionary with top-1/top-k agreement and the largest probability difference
+    """
+    images = 0
+    top1_matches = 0
+    topk_matches = 0
+    max_abs_diff = 0.0
+
+    for batch in batches:
+        ref_probs = F.softmax(reference(batch), dim=1)
+        cand_probs = F.softmax(candidate(batch), dim=1)
+        k = min(k, ref_probs.shape[1])
+
+        ref_topk = torch.topk(ref_probs, k, dim=1).indices
+        cand_topk = torch.topk(cand_probs, k, dim=1).indices
+
+        images += batch.shape[0]
+        top1_matches += int((ref_topk[:, 0] == cand_topk[:, 0]).sum())
+        topk_matches += int((ref_topk == cand_topk).all(dim=1).sum())
+        max_abs_diff = max(max_abs_diff, float((ref_probs - cand_probs).abs().max()))
+
+    return {
+        "images": images,
+        "top1_agreement": top1_matches / images if images else 0.0,
+        "topk_agreement": topk_matches / images if images else 0.0,
+        "k": k,
+        "max_abs_prob_diff": max_abs_diff
+    }
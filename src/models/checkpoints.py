@@ -0,0 +1,368 @@
+"""
+Checkpoint formats for MIDAS system
+"""
+
+import json
+import logging
+import mmap
+import os
+import re
+import shutil
+import struct
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+import torch
+
+SAFETENSORS_SUFFIX = ".safetensors"
+
+_SAFETENSORS_DTYPES = {
+    "F64": torch.float64,
+    "F32": torch.float32,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "I64": torch.int64,
+    "I32": torch.int32,
+    "I16": torch.int16,
+    "I8": torch.int8,
+    "U8": torch.uint8,
+    "BOOL": torch.bool
+}
+
+def is_safetensors(path: Union[str, Path]) -> bool:
+    """Whether a checkpoint path is in the safetensors format."""
+    return Path(path).suffix == SAFETENSORS_SUFFIX
+
+def read_safetensors(path: Union[str, Path]) -> Tuple[Dict[str, torch.Tensor], Dict[str, str]]:
+    """
+    Memory-map a safetensors file and view its tensors without copying them.
+
+    The file is mapped copy-on-write: pages are read from disk when first
+    touched and stay shared through the page cache between every process
+    that maps the same file, until one of them writes to a tensor.
+    (``safetensors.torch.load_file`` copies each tensor out of its map.)
+
+    Args:
+        path: safetensors file
+
+    Returns:
+        Tuple of (state dict, string metadata stored in the file)
+
+    Raises:
+        ValueError: If a tensor has an unsupported dtype
+    """
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    header_size, = struct.unpack("<Q", buffer[:8])
+    header = json.loads(buffer[8:8 + header_size])
+    metadata = header.pop("__metadata__", None) or {}
+    data_start = 8 + header_size
+
+    state_dict = {}
+    for name, info in header.items():
+        if info["dtype"] not in _SAFETENSORS_DTYPES:
+            raise ValueError(f"Unsupported safetensors dtype {info['dtype']} for {name}")
+        dtype = _SAFETENSORS_DTYPES[info["dtype"]]
+        begin, end = info["data_offsets"]
+        if end == begin:
+            state_dict[name] = torch.empty(info["shape"], dtype=dtype)
+            continue
+        # The tensor keeps a reference to the map, which stays open as long as any tensor does
+        count = (end - begin) // torch.empty((), dtype=dtype).element_size()
+        state_dict[name] = torch.frombuffer(buffer, dtype=dtype, count=count,
+                                            offset=data_start + begin).reshape(info["shape"])
+    return state_dict, metadata
+
+def read_state_dict(path: Union[str, Path],
+                    device: Union[str, torch.device] = 'cpu') -> Tuple[Dict[str, torch.Tensor], Dict[str, Any]]:
+    """
+    Read a checkpoint's model weights, memory-mapped where possible.
+
+    safetensors files are always mapped; ``.pth`` files are mapped with
+    ``torch.load(mmap=True)`` when torch and the file format allow it.
+
+    Args:
+        path: Checkpoint file (``.safetensors`` or a ``torch.save`` checkpoint)
+        device: Device to place the weights on (CPU weights stay mapped)
+
+    Returns:
+        Tuple of (model state dict, other checkpoint entries such as epoch and loss)
+    """
+    if is_safetensors(path):
+        state_dict, metadata = read_safetensors(path)
+        if torch.device(device).type != 'cpu':
+            state_dict = {name: tensor.to(device) for name, tensor in state_dict.items()}
+        return state_dict, dict(metadata)
+
+    try:
+        checkpoint = torch.load(path, map_location=device, mmap=True)
+    except (TypeError, RuntimeError):
+        # torch < 2.1, or a checkpoint saved in the legacy (non-zipfile) format
+        checkpoint = torch.load(path, map_location=device)
+
+    if 'model_state_dict' in checkpoint:
+        extra = {k: v for k, v in checkpoint.items() if k not in ('model_state_dict', 'optimizer_state_dict')}
+        return checkpoint['model_state_dict'], extra
+    return checkpoint, {}
+
+def convert_to_safetensors(checkpoint_path: Union[str, Path],
+                           output_path: Optional[Union[str, Path]] = None,
+                           metadata: Optional[Dict[str, Any]] = None) -> Path:
+    """
+    Convert a ``.pth`` checkpoint to safetensors, keeping only the model weights.
+
+    Scalar checkpoint entries (epoch, loss) and ``metadata`` are stored as
+    string metadata in the file header. The file is written next to its
+    destination and renamed into place, so readers never see a partial file.
+
+    Args:
+        checkpoint_path: ``torch.save`` checkpoint
+        output_path: Destination (defaults to the checkpoint path with a .safetensors suffix)
+        metadata: Optional extra metadata
+
+    Returns:
+        Path of the safetensors file
+
+    Raises:
+        ValueError: If the checkpoint already is a safetensors file
+    """
+    from safetensors.torch import save_file
+
+    if is_safetensors(checkpoint_path):
+        raise ValueError(f"Checkpoint is already in safetensors format: {checkpoint_path}")
+
+    state_dict, extra = read_state_dict(checkpoint_path)
+    output_path = Path(output_path) if output_path else Path(checkpoint_path).with_suffix(SAFETENSORS_SUFFIX)
+    header = {key: str(value) for key, value in {**extra, **(metadata or {})}.items()
+              if isinstance(value, (str, int, float, bool))}
+
+    tmp_path = output_path.with_name(f".{output_path.name}.tmp")
+    try:
+        save_file({name: tensor.detach().contiguous() for name, tensor in state_dict.items()},
+                  str(tmp_path), metadata=header)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return output_path
+
+def _fsync_dir(directory: Path) -> None:
+    """Persist a rename by syncing its directory (not possible on Windows)."""
+    if os.name == 'nt':
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def atomic_save(obj: Any, path: Union[str, Path]) -> Path:
+    """
+    ``torch.save`` an object so that a crash never leaves a partial file at ``path``.
+
+    The object is written to a temporary file in the same directory,
+    flushed to disk and renamed over the destination.
+
+    Args:
+        obj: Object to save
+        path: Destination
+
+    Returns:
+        The destination path
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            torch.save(obj, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    _fsync_dir(path.parent)
+    return path
+
+def _atomic_copy(source: Path, path: Path) -> None:
+    """Copy a file over ``path`` through a synced temporary file and an atomic rename."""
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    try:
+        with open(source, "rb") as src, open(tmp_path, "wb") as dst:
+            shutil.copyfileobj(src, dst, 16 * 1024 * 1024)
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    _fsync_dir(path.parent)
+
+def snapshot(obj: Any) -> Any:
+    """
+    Copy every tensor in a (nested) state dict to CPU memory.
+
+    Args:
+        obj: State dict, or any nesting of dicts, lists and tuples holding tensors
+
+    Returns:
+        The same structure with detached CPU copies of the tensors
+    """
+    if isinstance(obj, torch.Tensor):
+        return obj.detach().to('cpu', copy=True)
+    if isinstance(obj, dict):
+        return {key: snapshot(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(snapshot(value) for value in obj)
+    return obj
+
+class CheckpointWriter:
+    """
+    Writes training checkpoints in the background, atomically, with retention.
+
+    ``save`` only copies the model and optimizer state to CPU memory; the
+    serialization and disk writes happen on a writer thread, so training
+    continues while the previous checkpoint is written. At most one write is
+    in flight: a save that arrives while the writer is still busy waits for
+    it, which bounds memory to two snapshots. A failed write is raised from
+    the next ``save`` or ``wait``.
+
+    Layout::
+
+        <directory>/checkpoint_epoch_<n>.pth   last ``keep_last`` epochs
+        <directory>/best_model.pth             best so far (lowest loss unless told otherwise)
+    """
+
+    def __init__(self,
+                 directory: Union[str, Path],
+                 keep_last: int = 3,
+                 best_path: Optional[Union[str, Path]] = None,
+                 background: bool = True,
+                 logger: Optional[logging.Logger] = None):
+        """
+        Initialize checkpoint writer.
+
+        Args:
+            directory: Directory for epoch checkpoints
+            keep_last: Number of most recent epoch checkpoints to keep (0 keeps all)
+            best_path: Where to keep the best checkpoint (defaults to <directory>/best_model.pth)
+            background: Write on a background thread (False writes inside ``save``)
+            logger: Optional logger instance
+        """
+        self.directory = Path(directory)
+        self.keep_last = keep_last
+        self.best_path = Path(best_path) if best_path else self.directory / "best_model.pth"
+        self.logger = logger or logging.getLogger(__name__)
+        self.best_loss: Optional[float] = None
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="midas-checkpoint") if background else None
+        self._pending: Optional[Future] = None
+
+    @classmethod
+    def from_config(cls, config, logger: Optional[logging.Logger] = None) -> "CheckpointWriter":
+        """
+        Create a writer for models/checkpoints, keeping the best model in models/trained.
+
+        Args:
+            config: Configuration object
+            logger: Optional logger instance
+
+        Returns:
+            Checkpoint writer
+        """
+        return cls(
+            config.models_dir / "checkpoints",
+            keep_last=config.checkpoint_keep_last,
+            best_path=config.models_dir / "trained" / "best_model.pth",
+            background=config.async_checkpointing,
+            logger=logger
+        )
+
+    def checkpoint_path(self, epoch: int) -> Path:
+        """Path of an epoch's checkpoint."""
+        return self.directory / f"checkpoint_epoch_{epoch}.pth"
+
+    def save(self,
+             model: torch.nn.Module,
+             optimizer: Optional[torch.optim.Optimizer],
+             epoch: int,
+             loss: float,
+             is_best: Optional[bool] = None) -> Path:
+        """
+        Snapshot the training state and schedule it to be written.
+
+        Args:
+            model: Model being trained
+            optimizer: Its optimizer, if its state should be saved
+            epoch: Current epoch
+            loss: Validation loss, used to track the best checkpoint
+            is_best: Whether this is the best checkpoint so far (defaults to lowest loss)
+
+        Returns:
+            Path the epoch checkpoint will be written to
+        """
+        self.wait()
+
+        if is_best is None:
+            is_best = self.best_loss is None or loss < self.best_loss
+        if is_best:
+            self.best_loss = loss
+
+        checkpoint = {
+            'epoch': epoch,
+            'model_state_dict': snapshot(model.state_dict()),
+            'optimizer_state_dict': snapshot(optimizer.state_dict()) if optimizer is not None else None,
+            'loss': loss
+        }
+        path = self.checkpoint_path(epoch)
+        if self._executor is None:
+            self._write(checkpoint, path, is_best)
+        else:
+            self._pending = self._executor.submit(self._write, checkpoint, path, is_best)
+        return path
+
+    def _write(self, checkpoint: Dict[str, Any], path: Path, is_best: bool) -> None:
+        """Write one snapshot (on the writer thread), copy it to the best path if needed, then prune."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        atomic_save(checkpoint, path)
+        if is_best:
+            self.best_path.parent.mkdir(parents=True, exist_ok=True)
+            _atomic_copy(path, self.best_path)
+        self._prune()
+        self.logger.info(f"Checkpoint saved to {path}" + (f" (new best: {self.best_path})" if is_best else ""))
+
+    def _prune(self) -> None:
+        """Delete epoch checkpoints older than the last ``keep_last``."""
+        if self.keep_last <= 0:
+            return
+        pattern = re.compile(r"^checkpoint_epoch_(\d+)\.pth$")
+        epochs = sorted(int(m.group(1)) for m in (pattern.match(p.name) for p in self.directory.iterdir()) if m)
+        for epoch in epochs[:-self.keep_last]:
+            self.checkpoint_path(epoch).unlink(missing_ok=True)
+
+    def wait(self) -> None:
+        """
+        Block until the pending write has finished.
+
+        Raises:
+            Exception: Whatever the pending write raised
+        """
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            pending.result()
+
+    def close(self) -> None:
+        """Finish the pending write and stop the writer thread."""
+        try:
+            self.wait()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> "CheckpointWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
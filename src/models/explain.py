@@ -0,0 +1,141 @@
+"""
+Grad-CAM class activation heatmaps for MIDAS models
+"""
+
+import io
+import math
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from PIL import Image
+
+def _is_vision_transformer(base_model: nn.Module) -> bool:
+    return hasattr(base_model, 'patch_embed') and hasattr(base_model, 'blocks')
+
+def split_model(model: nn.Module) -> Tuple[Callable[[torch.Tensor], torch.Tensor],
+                                           Callable[[torch.Tensor], torch.Tensor]]:
+    """
+    Split a MIDASModel into a feature extractor and the layers after it.
+
+    CNNs are split at the last convolutional feature map. Vision transformers
+    are split before their last block, since the class token pooled by the
+    head receives no gradient through the patch tokens after the final block.
+
+    Args:
+        model: MIDASModel instance
+
+    Returns:
+        Tuple of (features function, head function) with head(features(x)) == model(x)
+    """
+    base = model.base_model
+
+    if _is_vision_transformer(base):
+        def features(x: torch.Tensor) -> torch.Tensor:
+            x = base.norm_pre(base.patch_drop(base._pos_embed(base.patch_embed(x))))
+            for block in base.blocks[:-1]:
+                x = block(x)
+            return x
+
+        def head(x: torch.Tensor) -> torch.Tensor:
+            return base.forward_head(base.norm(base.blocks[-1](x)))
+
+        return features, head
+
+    return base.forward_features, base.forward_head
+
+def tokens_to_map(features: torch.Tensor, base_model: nn.Module) -> torch.Tensor:
+    """
+    Reshape transformer tokens (batch, tokens, dim) to a feature map (batch, dim, h, w).
+
+    Class/register tokens are dropped. Convolutional feature maps are returned unchanged.
+
+    Args:
+        features: Feature tensor
+        base_model: timm model that produced it
+
+    Returns:
+        Feature map of shape (batch, channels, height, width)
+    """
+    if features.dim() == 4:
+        return features
+
+    patches = features[:, getattr(base_model, 'num_prefix_tokens', 1):]
+    grid = getattr(getattr(base_model, 'patch_embed', None), 'grid_size', None)
+    if grid is None:
+        side = int(math.isqrt(patches.shape[1]))
+        grid = (side, side)
+    return patches.reshape(patches.shape[0], grid[0], grid[1], patches.shape[2]).permute(0, 3, 1, 2)
+
+def grad_cam(model: nn.Module,
+             batch: torch.Tensor,
+             class_indices: Optional[torch.Tensor] = None,
+             output_size: Optional[Tuple[int, int]] = None) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """
+    Compute Grad-CAM heatmaps for several images and classes at once.
+
+    The backbone runs once without autograd; only the layers after the
+    feature map are re-run with gradients, and one backward pass per
+    requested class column covers the whole batch.
+
+    Args:
+        model: MIDASModel in eval mode
+        batch: Preprocessed images of shape (batch_size, channels, height, width)
+        class_indices: Long tensor (batch_size, num_requested) of classes to explain
+                       (defaults to each image's top-1 class)
+        output_size: Heatmap (height, width), defaults to the input size
+
+    Returns:
+        Tuple of (heatmaps in [0, 1] of shape (batch_size, num_requested, height, width),
+        class indices explained, class probabilities of shape (batch_size, num_classes))
+    """
+    features_fn, head_fn = split_model(model)
+    device = next(model.parameters()).device
+    batch = batch.to(device)
+    output_size = output_size or tuple(batch.shape[-2:])
+
+    with torch.no_grad():
+        features = features_fn(batch)
+
+    features = features.detach().requires_grad_(True)
+    with torch.enable_grad():
+        logits = head_fn(features).float()
+        if class_indices is None:
+            class_indices = logits.argmax(dim=1, keepdim=True)
+        class_indices = class_indices.to(logits.device)
+        scores = logits.gather(1, class_indices)
+
+        activations = tokens_to_map(features.detach(), model.base_model).float()
+        heatmaps = []
+        for column in range(scores.shape[1]):
+            # Each image's score only depends on its own features, so summing
+            # over the batch yields every image's gradient in one backward pass
+            gradients, = torch.autograd.grad(scores[:, column].sum(), features,
+                                             retain_graph=column < scores.shape[1] - 1)
+            gradients = tokens_to_map(gradients, model.base_model).float()
+            weights = gradients.mean(dim=(2, 3), keepdim=True)
+            heatmaps.append(F.relu((weights * activations).sum(dim=1)))
+
+    heatmaps = torch.stack(heatmaps, dim=1)
+    heatmaps = F.interpolate(heatmaps, size=output_size, mode='bilinear', align_corners=False)
+    peak = heatmaps.flatten(2).amax(dim=2).clamp_min(1e-8)
+    heatmaps = heatmaps / peak[..., None, None]
+
+    return heatmaps.cpu(), class_indices.cpu(), F.softmax(logits.detach(), dim=1).cpu()
+
+def heatmap_to_png(heatmap: torch.Tensor) -> bytes:
+    """
+    Encode a heatmap in [0, 1] as an 8-bit grayscale PNG.
+
+    Args:
+        heatmap: Tensor of shape (height, width)
+
+    Returns:
+        PNG bytes
+    """
+    pixels = (heatmap.clamp(0, 1) * 255).round().to(torch.uint8).numpy()
+    buffer = io.BytesIO()
+    Image.fromarray(np.ascontiguousarray(pixels)).save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
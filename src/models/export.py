@@ -0,0 +1,56 @@
+"""
+Model export for MIDAS system
+"""
+
+import logging
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import torch
+import torch.nn as nn
+
+def export_onnx(model: nn.Module,
+                output_path: Union[str, Path],
+                image_size: Tuple[int, int] = (224, 224),
+                opset_version: int = 17,
+                logger: Optional[logging.Logger] = None) -> Path:
+    """
+    Export a model to ONNX with a dynamic batch axis.
+
+    Args:
+        model: Model to export
+        output_path: Destination .onnx file
+        image_size: Input (height, width)
+        opset_version: ONNX opset to target
+        logger: Optional logger
+
+    Returns:
+        Path of the exported model
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    model = model.cpu().eval()
+    dummy_input = torch.randn(1, 3, image_size[0], image_size[1])
+
+    try:
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                dummy_input,
+                str(output_path),
+                input_names=["input"],
+                output_names=["logits"],
+                dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+                opset_version=opset_version,
+                do_constant_folding=True
+            )
+
+        if logger:
+            logger.info(f"Exported ONNX model to {output_path}")
+
+        return output_path
+    except Exception as e:
+        if logger:
+            logger.error(f"Failed to export ONNX model: {e}")
+        raise
@@ -2,12 +2,15 @@
 Deep learning models for MIDAS system
 """
 
+import functools
 import torch
 import torch.nn as nn
 import timm
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 import logging
 
+from models.checkpoints import atomic_save, read_state_dict
+
 class MIDASModel(nn.Module):
     """
     MIDAS deep learning model for skin lesion classification.
@@ -148,27 +151,103 @@ class ModelFactory:
         )
     
     @classmethod
-    def get_model_info(cls, model_name: str) -> Dict[str, Any]:
+    def get_model_info(cls,
+                       model_name: str,
+                       num_classes: int = 7,
+                       image_size: Tuple[int, int] = (224, 224)) -> Dict[str, Any]:
         """
         Get information about a model.
         
+        The model is built on the meta device, so no weights are allocated,
+        and results are memoized per architecture, class count and input size.
+        
         Args:
             model_name: Name of the model
+            num_classes: Number of output classes
+            image_size: Input (height, width) used for the FLOPs and memory estimates
         
         Returns:
             Dictionary containing model information
         """
-        model = timm.create_model(model_name, pretrained=False)
-        
-        total_params = sum(p.numel() for p in model.parameters())
-        trainable_params = sum(p.numel() for p in model.parameters() if p.requires_grad)
-        
-        return {
-            'model_name': model_name,
-            'total_parameters': total_params,
-            'trainable_parameters': trainable_params,
-            'input_size': model.default_cfg.get('input_size', (3, 224, 224))
-        }
+        return dict(_model_info(model_name, num_classes, tuple(image_size)))
+
+def _estimate_cost(model: nn.Module, image_size: Tuple[int, int]) -> Dict[str, Optional[int]]:
+    """
+    Count FLOPs and activation sizes of one forward pass on a single image.
+    
+    Works on meta-device models, where only shapes are propagated.
+    
+    Args:
+        model: Model in eval mode
+        image_size: Input (height, width)
+    
+    Returns:
+        Dictionary with total FLOPs (None before torch 2.1), summed and largest activation bytes
+    """
+    try:
+        from torch.utils.flop_counter import FlopCounterMode
+    except ImportError:
+        FlopCounterMode = None
+    
+    activation_bytes = []
+    
+    def record_output(module: nn.Module, inputs: Any, output: Any) -> None:
+        if isinstance(output, torch.Tensor):
+            activation_bytes.append(output.numel() * output.element_size())
+    
+    # Leaf modules produce the tensors autograd keeps for the backward pass
+    hooks = [module.register_forward_hook(record_output)
+             for module in model.modules() if next(module.children(), None) is None]
+    sample = torch.empty(1, 3, image_size[0], image_size[1], device=next(model.parameters()).device)
+    flops = None
+    try:
+        with torch.no_grad():
+            if FlopCounterMode is None:
+                model(sample)
+            else:
+                counter = FlopCounterMode(display=False)
+                with counter:
+                    model(sample)
+                flops = counter.get_total_flops()
+    finally:
+        for hook in hooks:
+            hook.remove()
+    
+    return {
+        'flops': flops,
+        'activation_bytes': sum(activation_bytes),
+        'peak_activation_bytes': max(activation_bytes, default=0)
+    }
+
+@functools.lru_cache(maxsize=None)
+def _model_info(model_name: str, num_classes: int, image_size: Tuple[int, int]) -> Dict[str, Any]:
+    """Build the model on the meta device and collect its size and cost (see ModelFactory.get_model_info)."""
+    try:
+        with torch.device('meta'):
+            model = MIDASModel(model_name, num_classes=num_classes, pretrained=False)
+    except Exception:
+        # A few layer initialisers need real storage; fall back to allocating weights
+        model = MIDASModel(model_name, num_classes=num_classes, pretrained=False)
+    model.eval()
+    
+    total_params = sum(p.numel() for p in model.parameters())
+    trainable_params = sum(p.numel() for p in model.parameters() if p.requires_grad)
+    weight_bytes = sum(t.numel() * t.element_size() for t in (*model.parameters(), *model.buffers()))
+    cost = _estimate_cost(model, image_size)
+    
+    return {
+        'model_name': model_name,
+        'num_classes': num_classes,
+        'total_parameters': total_params,
+        'trainable_parameters': trainable_params,
+        'weights_mb': weight_bytes / 1e6,
+        'input_size': (3, image_size[0], image_size[1]),
+        'gflops': cost['flops'] / 1e9 if cost['flops'] is not None else None,
+        # Per image; forward-pass outputs of every layer, roughly what training keeps for backward
+        'activation_mb': cost['activation_bytes'] / 1e6,
+        # Per image; the largest single layer output, a lower bound for inference
+        'peak_activation_mb': cost['peak_activation_bytes'] / 1e6
+    }
 
 def load_checkpoint(model: nn.Module, 
                    checkpoint_path: str,
@@ -179,7 +258,7 @@ def load_checkpoint(model: nn.Module,
     
     Args:
         model: Model instance
-        checkpoint_path: Path to checkpoint file
+        checkpoint_path: Path to checkpoint file (.pth or .safetensors)
         device: Device to load model on
         logger: Optional logger
     
@@ -187,12 +266,8 @@ def load_checkpoint(model: nn.Module,
         Model with loaded weights
     """
     try:
-        checkpoint = torch.load(checkpoint_path, map_location=device)
-        
-        if 'model_state_dict' in checkpoint:
-            model.load_state_dict(checkpoint['model_state_dict'])
-        else:
-            model.load_state_dict(checkpoint)
+        state_dict, _ = read_state_dict(checkpoint_path, device)
+        model.load_state_dict(state_dict)
         
         if logger:
             logger.info(f"Successfully loaded checkpoint from {checkpoint_path}")
@@ -203,6 +278,64 @@ def load_checkpoint(model: nn.Module,
             logger.error(f"Failed to load checkpoint: {e}")
         raise
 
+def _assign_weights(model_name: str,
+                    num_classes: int,
+                    state_dict: Dict[str, torch.Tensor]) -> Optional[MIDASModel]:
+    """Build a model on the meta device and adopt the checkpoint tensors as its weights, if possible."""
+    try:
+        with torch.device('meta'):
+            model = MIDASModel(model_name, num_classes=num_classes, pretrained=False)
+        model.load_state_dict(state_dict, assign=True)
+    except Exception:
+        # torch < 2.1 has no assign=True, and a few layer initialisers need real storage
+        return None
+    # Non-persistent buffers are not in the checkpoint and would be left on the meta device
+    if any(t.is_meta for t in (*model.parameters(), *model.buffers())):
+        return None
+    return model
+
+def load_model(model_name: str,
+               checkpoint_path: Optional[str] = None,
+               num_classes: int = 7,
+               device: str = 'cpu',
+               logger: Optional[logging.Logger] = None) -> MIDASModel:
+    """
+    Build a model with trained weights without initialising random weights first.
+    
+    The architecture is built on the meta device and the checkpoint tensors
+    become its parameters directly. CPU weights from safetensors or mmap-able
+    .pth files stay memory-mapped, so loading reads only what is touched and
+    processes serving the same file share its pages.
+    
+    Args:
+        model_name: Name of the model architecture
+        checkpoint_path: Checkpoint to load (None gives untrained weights)
+        num_classes: Number of output classes
+        device: Device to load model on
+        logger: Optional logger
+    
+    Returns:
+        Model on the requested device
+    """
+    if checkpoint_path is None:
+        return ModelFactory.create_model(model_name, num_classes=num_classes, pretrained=False).to(device)
+    
+    try:
+        state_dict, _ = read_state_dict(checkpoint_path, device)
+        model = _assign_weights(model_name, num_classes, state_dict)
+        if model is None:
+            model = ModelFactory.create_model(model_name, num_classes=num_classes, pretrained=False)
+            model.load_state_dict(state_dict)
+        
+        if logger:
+            logger.info(f"Successfully loaded checkpoint from {checkpoint_path}")
+        
+        return model.to(device)
+    except Exception as e:
+        if logger:
+            logger.error(f"Failed to load checkpoint: {e}")
+        raise
+
 def save_checkpoint(model: nn.Module,
                    optimizer: torch.optim.Optimizer,
                    epoch: int,
@@ -210,7 +343,10 @@ def save_checkpoint(model: nn.Module,
                    checkpoint_path: str,
                    logger: Optional[logging.Logger] = None) -> None:
     """
-    Save model checkpoint.
+    Save model checkpoint atomically, blocking until it is on disk.
+    
+    Use ``CheckpointWriter`` in training loops to write in the background
+    with retention of recent and best checkpoints.
     
     Args:
         model: Model instance
@@ -228,7 +364,7 @@ def save_checkpoint(model: nn.Module,
             'loss': loss
         }
         
-        torch.save(checkpoint, checkpoint_path)
+        atomic_save(checkpoint, checkpoint_path)
         
         if logger:
             logger.info(f"Checkpoint saved to {checkpoint_path}")
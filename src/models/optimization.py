@@ -0,0 +1,259 @@
+"""
+Serving-time model optimizations for MIDAS system
+"""
+
+import hashlib
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, Union
+
+import torch
+import torch.nn as nn
+
+GRAPH_MODES = ['eager', 'torchscript', 'compile']
+
+def artifact_key(*parts: str) -> str:
+    """
+    Build a short, filesystem-safe key identifying a compiled artifact.
+
+    Args:
+        *parts: Everything the artifact depends on (model identity, device, options)
+
+    Returns:
+        Hex digest prefix
+    """
+    digest = hashlib.sha256()
+    for part in (*parts, torch.__version__):
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+def trace_torchscript(model: nn.Module,
+                      cache_dir: Union[str, Path],
+                      key: str,
+                      image_size: Tuple[int, int] = (224, 224),
+                      device: Union[str, torch.device] = 'cpu',
+                      logger: Optional[logging.Logger] = None) -> torch.jit.ScriptModule:
+    """
+    Trace, freeze and optimize a model with TorchScript, reusing a cached trace.
+
+    Args:
+        model: Model in eval mode
+        cache_dir: Directory holding traced artifacts
+        key: Artifact key from ``artifact_key``
+        image_size: Input (height, width)
+        device: Device the model lives on
+        logger: Optional logger
+
+    Returns:
+        Optimized TorchScript module
+    """
+    cache_path = Path(cache_dir) / f"torchscript_{key}.pt"
+    if cache_path.exists():
+        try:
+            scripted = torch.jit.load(str(cache_path), map_location=device)
+            if logger:
+                logger.info(f"Loaded cached TorchScript graph from {cache_path}")
+            return scripted
+        except Exception as e:
+            if logger:
+                logger.warning(f"Ignoring unreadable TorchScript cache {cache_path}: {e}")
+
+    example = torch.randn(1, 3, image_size[0], image_size[1], device=device)
+    with torch.no_grad():
+        scripted = torch.jit.optimize_for_inference(torch.jit.freeze(torch.jit.trace(model.eval(), example)))
+
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix(".tmp")
+    torch.jit.save(scripted, str(tmp_path))
+    os.replace(tmp_path, cache_path)
+
+    if logger:
+        logger.info(f"Traced TorchScript graph and cached it at {cache_path}")
+    return scripted
+
+def compile_model(model: nn.Module,
+                  cache_dir: Union[str, Path],
+                  compile_mode: str = 'default',
+                  logger: Optional[logging.Logger] = None) -> Callable:
+    """
+    Wrap a model with torch.compile, persisting Inductor's caches on disk.
+
+    Compilation itself happens lazily on the first call for each input
+    shape, which is why the server warms up every serving batch size.
+
+    Args:
+        model: Model in eval mode
+        cache_dir: Directory for the Inductor/FX graph caches
+        compile_mode: torch.compile mode ('default', 'reduce-overhead', 'max-autotune')
+        logger: Optional logger
+
+    Returns:
+        Compiled model
+    """
+    inductor_dir = Path(cache_dir) / "inductor"
+    inductor_dir.mkdir(parents=True, exist_ok=True)
+    os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", str(inductor_dir))
+
+    import torch._inductor.config as inductor_config
+    inductor_config.fx_graph_cache = True
+
+    if logger:
+        logger.info(f"Compiling model with torch.compile (mode={compile_mode}, cache={inductor_dir})")
+    return torch.compile(model.eval(), mode=compile_mode, dynamic=False)
+
+def apply_graph_mode(model: nn.Module,
+                     config,
+                     model_id: str,
+                     device: Union[str, torch.device] = 'cpu',
+                     logger: Optional[logging.Logger] = None) -> Callable:
+    """
+    Apply the graph mode selected by ``config.graph_mode`` to a loaded model.
+
+    Args:
+        model: Model in eval mode
+        config: Configuration object
+        model_id: Identity of the architecture and weights, used for cache keys
+        device: Device the model lives on
+        logger: Optional logger
+
+    Returns:
+        The model itself for eager mode, otherwise its compiled form
+
+    Raises:
+        ValueError: If the graph mode is unknown
+    """
+    mode = config.graph_mode
+    if mode not in GRAPH_MODES:
+        raise ValueError(f"Graph mode {mode} not supported. Choose from {GRAPH_MODES}")
+
+    if mode == 'eager':
+        return model
+
+    key = artifact_key(model_id, device, mode, config.image_size, config.cpu_fast_math)
+    try:
+        if mode == 'torchscript':
+            return trace_torchscript(model, config.compiled_cache_dir, key, config.image_size, device, logger)
+        return compile_model(model, config.compiled_cache_dir, config.compile_mode, logger)
+    except Exception as e:
+        if logger:
+            logger.warning(f"{mode} graph mode failed ({e}); serving in eager mode")
+        return model
+
+def cpu_supports_bf16() -> bool:
+    """
+    Check whether this CPU has native bfloat16 support (AVX512-BF16 or AMX).
+
+    Without it, bf16 math is emulated and slower than float32.
+
+    Returns:
+        True if native bf16 instructions are available
+    """
+    for check in (getattr(torch.cpu, '_is_avx512_bf16_supported', None),
+                  getattr(torch.cpu, '_is_amx_tile_supported', None)):
+        try:
+            if check is not None and check():
+                return True
+        except Exception:
+            continue
+    return False
+
+def _time_forward(fn: Callable[[], Any], iterations: int = 3) -> float:
+    """Mean wall time of a forward pass after one untimed call."""
+    fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations
+
+def configure_cpu_fast_math(model: nn.Module,
+                            config,
+                            logger: Optional[logging.Logger] = None,
+                            batch_size: int = 8) -> Dict[str, Any]:
+    """
+    Convert a CPU model to channels_last and decide whether to run it under bf16 autocast.
+
+    channels_last is always applied. bf16 autocast is only kept if the CPU
+    supports bf16 natively, a short benchmark shows it is faster than
+    float32, and its top-1 predictions agree with float32 on at least
+    ``config.fast_math_min_agreement`` of a probe batch. Otherwise the model
+    is served in float32.
+
+    Args:
+        model: Model in eval mode on the CPU (converted in place)
+        config: Configuration object
+        logger: Optional logger
+        batch_size: Probe batch size for the speed and accuracy checks
+
+    Returns:
+        Dictionary with 'channels_last', 'bf16' and the measurements behind the decision
+    """
+    model.to(memory_format=torch.channels_last)
+    settings: Dict[str, Any] = {"channels_last": True, "bf16": False, "bf16_supported": cpu_supports_bf16()}
+
+    if config.graph_mode == 'torchscript':
+        settings["reason"] = "bf16 autocast is not applied to traced TorchScript graphs"
+    elif not settings["bf16_supported"]:
+        settings["reason"] = "CPU lacks native bf16 support"
+    else:
+        generator = torch.Generator().manual_seed(config.seed)
+        probe = torch.randn(batch_size, 3, config.image_size[0], config.image_size[1], generator=generator)
+        probe = probe.contiguous(memory_format=torch.channels_last)
+
+        def run_fp32():
+            return model(probe)
+
+        def run_bf16():
+            with torch.autocast('cpu', dtype=torch.bfloat16):
+                return model(probe).float()
+
+        with torch.no_grad():
+            fp32_time = _time_forward(run_fp32)
+            bf16_time = _time_forward(run_bf16)
+            agreement = float((run_fp32().argmax(dim=1) == run_bf16().argmax(dim=1)).float().mean())
+
+        settings.update({
+            "fp32_ms": fp32_time * 1000.0,
+            "bf16_ms": bf16_time * 1000.0,
+            "top1_agreement": agreement
+        })
+        if bf16_time >= fp32_time:
+            settings["reason"] = "bf16 autocast was not faster than float32"
+        elif agreement < config.fast_math_min_agreement:
+            settings["reason"] = f"bf16 top-1 agreement {agreement:.2%} below threshold"
+        else:
+            settings["bf16"] = True
+
+    if logger:
+        precision = "bf16 autocast" if settings["bf16"] else f"float32 ({settings.get('reason')})"
+        logger.info(f"CPU fast math: channels_last with {precision}")
+    return settings
+
+def warmup(fn: Callable[[torch.Tensor], torch.Tensor],
+           batch_sizes: Iterable[int],
+           image_size: Tuple[int, int] = (224, 224),
+           iterations: int = 2,
+           logger: Optional[logging.Logger] = None) -> None:
+    """
+    Run synthetic batches through a model at every serving batch size.
+
+    Triggers shape-specialized compilation and kernel selection before real
+    traffic arrives. Two iterations per shape also let TorchScript's
+    profiling executor produce its optimized plan.
+
+    Args:
+        fn: Model or backend to warm up
+        batch_sizes: Batch sizes the server will run
+        image_size: Input (height, width)
+        iterations: Forward passes per batch size
+        logger: Optional logger
+    """
+    for batch_size in batch_sizes:
+        batch = torch.randn(batch_size, 3, image_size[0], image_size[1])
+        with torch.no_grad():
+            for _ in range(iterations):
+                fn(batch)
+        if logger:
+            logger.info(f"Warmed up batch size {batch_size}")
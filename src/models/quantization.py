@@ -0,0 +1,201 @@
+"""
+INT8 quantization for MIDAS models
+"""
+
+import copy
+import io
+import logging
+from pathlib import Path
+from typing import Iterable, Optional, Tuple, Union
+
+import torch
+import torch.nn as nn
+
+QUANTIZATION_MODES = ['dynamic', 'static']
+
+def get_head_name(model: nn.Module) -> str:
+    """
+    Get the qualified name of the classification head of a MIDASModel.
+
+    Args:
+        model: MIDASModel instance
+
+    Returns:
+        Module name such as 'base_model.classifier'
+
+    Raises:
+        ValueError: If no known head attribute exists
+    """
+    for attr in ('classifier', 'fc', 'head'):
+        if isinstance(getattr(model.base_model, attr, None), nn.Module):
+            return f"base_model.{attr}"
+    raise ValueError(f"Could not find a classification head on {type(model.base_model).__name__}")
+
+def select_quantized_engine() -> str:
+    """
+    Select the best available quantized kernel backend for this CPU.
+
+    Returns:
+        Name of the engine now in use
+    """
+    supported = torch.backends.quantized.supported_engines
+    for engine in ('x86', 'fbgemm', 'qnnpack'):
+        if engine in supported:
+            torch.backends.quantized.engine = engine
+            return engine
+    return torch.backends.quantized.engine
+
+def quantize_dynamic_head(model: nn.Module) -> nn.Module:
+    """
+    Dynamically quantize the Linear layers of the classification head to INT8.
+
+    Weights are stored as INT8 and activations are quantized on the fly, so
+    no calibration data is needed.
+
+    Args:
+        model: Float model in eval mode
+
+    Returns:
+        Model with an INT8 head (the input model is left unchanged)
+    """
+    from torch.ao.quantization import default_dynamic_qconfig, quantize_dynamic
+
+    head_name = get_head_name(model)
+    return quantize_dynamic(
+        copy.deepcopy(model).eval(),
+        qconfig_spec={head_name: default_dynamic_qconfig},
+        dtype=torch.qint8
+    )
+
+def quantize_static_backbone(model: nn.Module,
+                             calibration_batches: Iterable[torch.Tensor],
+                             logger: Optional[logging.Logger] = None) -> nn.Module:
+    """
+    Post-training static INT8 quantization of the backbone.
+
+    The backbone is traced with FX, observers are calibrated on the given
+    batches, and the result is converted to INT8 kernels. The head is left
+    out of static quantization and dynamically quantized afterwards.
+
+    Args:
+        model: Float model in eval mode
+        calibration_batches: Representative preprocessed input batches
+        logger: Optional logger
+
+    Returns:
+        Quantized model (the input model is left unchanged)
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+    engine = select_quantized_engine()
+    head_name = get_head_name(model)
+
+    qconfig_mapping = get_default_qconfig_mapping(engine).set_module_name(head_name, None)
+
+    calibration_batches = iter(calibration_batches)
+    first_batch = next(calibration_batches)
+
+    prepared = prepare_fx(copy.deepcopy(model).eval(), qconfig_mapping, example_inputs=(first_batch,))
+
+    calibrated = 0
+    with torch.no_grad():
+        for batch in (first_batch, *calibration_batches):
+            prepared(batch)
+            calibrated += batch.shape[0]
+
+    if logger:
+        logger.info(f"Calibrated static quantization on {calibrated} images ({engine} engine)")
+
+    quantized = convert_fx(prepared)
+    return quantize_dynamic_head(quantized)
+
+def quantize_model(model: nn.Module,
+                   mode: str = 'static',
+                   calibration_batches: Optional[Iterable[torch.Tensor]] = None,
+                   logger: Optional[logging.Logger] = None) -> nn.Module:
+    """
+    Quantize a model for CPU inference.
+
+    Static quantization falls back to dynamic head quantization when the
+    backbone cannot be FX-traced. The mode actually applied is recorded on
+    the returned model as ``quantization_mode``.
+
+    Args:
+        model: Float model in eval mode
+        mode: 'dynamic' (head only) or 'static' (calibrated backbone + dynamic head)
+        calibration_batches: Input batches, required for static quantization
+        logger: Optional logger
+
+    Returns:
+        Quantized model
+
+    Raises:
+        ValueError: If the mode is unknown or calibration data is missing
+    """
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"Quantization mode {mode} not supported. Choose from {QUANTIZATION_MODES}")
+
+    model = model.cpu().eval()
+    select_quantized_engine()
+
+    if mode == 'static' and calibration_batches is None:
+        raise ValueError("Static quantization needs calibration batches")
+
+    quantized = None
+    if mode == 'static':
+        try:
+            quantized = quantize_static_backbone(model, calibration_batches, logger)
+        except Exception as e:
+            # Some backbones are not FX-traceable; the INT8 head still helps
+            if logger:
+                logger.warning(f"Static quantization failed ({e}); falling back to dynamic head quantization")
+            mode = 'dynamic'
+
+    if quantized is None:
+        quantized = quantize_dynamic_head(model)
+    quantized.quantization_mode = mode
+    return quantized
+
+def save_quantized(model: nn.Module,
+                   output_path: Union[str, Path],
+                   image_size: Tuple[int, int] = (224, 224),
+                   logger: Optional[logging.Logger] = None) -> Path:
+    """
+    Save a quantized model as a self-contained TorchScript artifact.
+
+    Args:
+        model: Quantized model
+        output_path: Destination file
+        image_size: Input (height, width) used for tracing
+        logger: Optional logger
+
+    Returns:
+        Path of the saved artifact
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    example = torch.randn(1, 3, image_size[0], image_size[1])
+    with torch.no_grad():
+        scripted = torch.jit.freeze(torch.jit.trace(model.eval(), example))
+    torch.jit.save(scripted, str(output_path))
+
+    if logger:
+        logger.info(f"Quantized model saved to {output_path}")
+
+    return output_path
+
+def serialized_size(model: nn.Module) -> int:
+    """
+    Get the serialized size of a model's weights.
+
+    Args:
+        model: Model instance
+
+    Returns:
+        Size of the saved state_dict in bytes
+    """
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell()
@@ -0,0 +1,229 @@
+"""
+Local model registry for MIDAS system
+"""
+
+import json
+import os
+import re
+import shutil
+import tempfile
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+VERSION_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,63}$")
+CHECKPOINT_NAME = "model.pth"
+SAFETENSORS_CHECKPOINT_NAME = "model.safetensors"
+METADATA_NAME = "version.json"
+ROUTING_NAME = "routing.json"
+
+@dataclass
+class ModelVersion:
+    """A registered model version."""
+
+    version: str
+    model_name: str
+    checkpoint_path: Path
+    created: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert version to a JSON-serializable dictionary."""
+        return {
+            "version": self.version,
+            "model_name": self.model_name,
+            "checkpoint_path": str(self.checkpoint_path),
+            "created": self.created,
+            "metadata": self.metadata
+        }
+
+class ModelRegistry:
+    """
+    Versioned model store on a local directory.
+
+    Layout::
+
+        <root>/<version>/model.pth      checkpoint (or model.safetensors)
+        <root>/<version>/version.json   architecture, creation time, metadata
+        <root>/routing.json             traffic weights, {version: weight}
+
+    Versions are immutable once registered and are published with an atomic
+    rename, so readers never see a half-copied checkpoint. The routing file
+    is the single source of truth for what is served; every API worker
+    watches it and hot swaps when it changes.
+    """
+
+    def __init__(self, root: Union[str, Path]):
+        """
+        Initialize registry.
+
+        Args:
+            root: Registry directory (created on first registration)
+        """
+        self.root = Path(root)
+
+    @property
+    def routing_path(self) -> Path:
+        """Path of the routing file."""
+        return self.root / ROUTING_NAME
+
+    def _read_version(self, directory: Path) -> Optional[ModelVersion]:
+        metadata_path = directory / METADATA_NAME
+        checkpoint_path = next((directory / name for name in (SAFETENSORS_CHECKPOINT_NAME, CHECKPOINT_NAME)
+                                if (directory / name).exists()), None)
+        if not metadata_path.exists() or checkpoint_path is None:
+            return None
+        with open(metadata_path) as f:
+            info = json.load(f)
+        return ModelVersion(
+            version=directory.name,
+            model_name=info["model_name"],
+            checkpoint_path=checkpoint_path,
+            created=info.get("created", ""),
+            metadata=info.get("metadata", {})
+        )
+
+    def list_versions(self) -> List[ModelVersion]:
+        """
+        List registered versions, oldest first.
+
+        Returns:
+            Registered versions
+        """
+        if not self.root.exists():
+            return []
+        versions = []
+        for directory in self.root.iterdir():
+            if directory.is_dir() and VERSION_PATTERN.match(directory.name):
+                version = self._read_version(directory)
+                if version is not None:
+                    versions.append(version)
+        return sorted(versions, key=lambda v: (v.created, v.version))
+
+    def get(self, version: str) -> ModelVersion:
+        """
+        Get a registered version.
+
+        Args:
+            version: Version name
+
+        Returns:
+            The model version
+
+        Raises:
+            KeyError: If the version is not registered
+        """
+        if VERSION_PATTERN.match(version):
+            found = self._read_version(self.root / version)
+            if found is not None:
+                return found
+        raise KeyError(f"Model version {version} is not registered")
+
+    def latest(self) -> Optional[ModelVersion]:
+        """
+        Get the most recently registered version.
+
+        Returns:
+            Latest version, or None if the registry is empty
+        """
+        versions = self.list_versions()
+        return versions[-1] if versions else None
+
+    def register(self,
+                 checkpoint_path: Union[str, Path],
+                 model_name: str,
+                 version: Optional[str] = None,
+                 metadata: Optional[Dict[str, Any]] = None) -> ModelVersion:
+        """
+        Copy a checkpoint into the registry as a new version.
+
+        safetensors checkpoints keep their format, so API workers memory-map them.
+
+        Args:
+            checkpoint_path: Checkpoint to register
+            model_name: Architecture the checkpoint belongs to
+            version: Version name (defaults to a timestamp)
+            metadata: Optional extra information (metrics, dataset, notes)
+
+        Returns:
+            The registered version
+
+        Raises:
+            FileNotFoundError: If the checkpoint does not exist
+            ValueError: If the version name is invalid or already taken
+        """
+        checkpoint_path = Path(checkpoint_path)
+        if not checkpoint_path.exists():
+            raise FileNotFoundError(f"Checkpoint not found at: {checkpoint_path}")
+
+        version = version or datetime.now().strftime("%Y%m%d_%H%M%S")
+        if not VERSION_PATTERN.match(version):
+            raise ValueError(f"Invalid version name: {version}")
+
+        target = self.root / version
+        if target.exists():
+            raise ValueError(f"Model version {version} is already registered")
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=f".{version}-", dir=self.root))
+        try:
+            name = SAFETENSORS_CHECKPOINT_NAME if checkpoint_path.suffix == ".safetensors" else CHECKPOINT_NAME
+            shutil.copy2(checkpoint_path, staging / name)
+            with open(staging / METADATA_NAME, "w") as f:
+                json.dump({
+                    "model_name": model_name,
+                    "created": datetime.now().isoformat(timespec="seconds"),
+                    "source": str(checkpoint_path),
+                    "metadata": metadata or {}
+                }, f, indent=2)
+            os.rename(staging, target)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        return self.get(version)
+
+    def get_routing(self) -> Dict[str, float]:
+        """
+        Get the traffic weights per version.
+
+        Without a routing file, all traffic goes to the latest version.
+
+        Returns:
+            Dictionary of version to weight (empty if nothing is registered)
+        """
+        if self.routing_path.exists():
+            with open(self.routing_path) as f:
+                return {str(k): float(v) for k, v in json.load(f).items()}
+        latest = self.latest()
+        return {latest.version: 1.0} if latest else {}
+
+    def set_routing(self, weights: Dict[str, float]) -> Dict[str, float]:
+        """
+        Atomically replace the traffic weights.
+
+        Args:
+            weights: Dictionary of version to non-negative weight
+
+        Returns:
+            The weights written, without zero-weight entries
+
+        Raises:
+            KeyError: If a version is not registered
+            ValueError: If weights are negative or all zero
+        """
+        weights = {version: float(weight) for version, weight in weights.items() if float(weight) != 0.0}
+        if any(weight < 0 for weight in weights.values()):
+            raise ValueError("Routing weights must be non-negative")
+        if not weights:
+            raise ValueError("At least one version needs a positive weight")
+        for version in weights:
+            self.get(version)
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.routing_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(weights, f, indent=2)
+        os.replace(tmp_path, self.routing_path)
+        return weights
@@ -0,0 +1,70 @@
+"""
+Test-time augmentation for MIDAS models
+"""
+
+from typing import List, Sequence
+
+import torch
+
+TTA_VIEWS = ['identity', 'hflip', 'vflip', 'rot90', 'rot180', 'rot270', 'transpose']
+
+# Views that swap height and width, which only keeps the shape for square inputs
+_TRANSPOSING_VIEWS = {'rot90', 'rot270', 'transpose'}
+
+def _apply_view(batch: torch.Tensor, view: str) -> torch.Tensor:
+    if view == 'identity':
+        return batch
+    if view == 'hflip':
+        return torch.flip(batch, dims=(3,))
+    if view == 'vflip':
+        return torch.flip(batch, dims=(2,))
+    if view == 'rot90':
+        return torch.rot90(batch, 1, dims=(2, 3))
+    if view == 'rot180':
+        return torch.rot90(batch, 2, dims=(2, 3))
+    if view == 'rot270':
+        return torch.rot90(batch, 3, dims=(2, 3))
+    return batch.transpose(2, 3)
+
+def augment_batch(batch: torch.Tensor, views: Sequence[str]) -> torch.Tensor:
+    """
+    Build augmented views of preprocessed images as one batch.
+
+    Views are generated in tensor space, so images are not decoded or
+    transformed again. Dermoscopy images have no canonical orientation,
+    which makes flips and right-angle rotations label-preserving.
+
+    Args:
+        batch: Preprocessed images of shape (batch_size, channels, height, width)
+        views: View names from TTA_VIEWS
+
+    Returns:
+        Tensor of shape (len(views) * batch_size, channels, height, width), view-major
+
+    Raises:
+        ValueError: If a view is unknown, or rotates non-square images
+    """
+    unknown = [view for view in views if view not in TTA_VIEWS]
+    if unknown:
+        raise ValueError(f"TTA views {unknown} not supported. Choose from {TTA_VIEWS}")
+    if batch.shape[2] != batch.shape[3] and _TRANSPOSING_VIEWS.intersection(views):
+        raise ValueError("Rotated/transposed TTA views need square inputs")
+
+    return torch.cat([_apply_view(batch, view) for view in views])
+
+def average_views(probabilities: torch.Tensor, num_views: int) -> torch.Tensor:
+    """
+    Average per-view class probabilities back to one row per image.
+
+    Args:
+        probabilities: View-major tensor of shape (num_views * batch_size, num_classes)
+        num_views: Number of views per image
+
+    Returns:
+        Tensor of shape (batch_size, num_classes)
+    """
+    return probabilities.reshape(num_views, -1, probabilities.shape[-1]).mean(dim=0)
+
+def non_identity_views(views: Sequence[str]) -> List[str]:
+    """Views other than the unaugmented image."""
+    return [view for view in views if view != 'identity']
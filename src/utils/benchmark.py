@@ -0,0 +1,879 @@
+"""
+Benchmarks for MIDAS system
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import logging
+import subprocess
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+from PIL import Image
+
+from utils.helpers import ensure_dir, get_timestamp
+
+def time_callable(fn: Callable[[], Any], iterations: int = 100, warmup: int = 10) -> List[float]:
+    """
+    Time repeated calls of a function.
+
+    Args:
+        fn: Zero-argument function to time
+        iterations: Number of timed calls
+        warmup: Number of untimed calls made first
+
+    Returns:
+        Per-call wall time in seconds
+    """
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def summarize_latencies(samples: List[float]) -> Dict[str, float]:
+    """
+    Summarize latency samples.
+
+    Args:
+        samples: Latencies in seconds
+
+    Returns:
+        Mean and percentile latencies in milliseconds
+    """
+    values = np.asarray(samples, dtype=np.float64) * 1000.0
+    return {
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "min_ms": float(values.min()),
+        "max_ms": float(values.max())
+    }
+
+def save_results(results: Any, name: str, results_dir: Path) -> Path:
+    """
+    Write benchmark results as JSON under results/metrics.
+
+    Args:
+        results: JSON-serializable results
+        name: Benchmark name used in the file name
+        results_dir: Project results directory
+
+    Returns:
+        Path of the written file
+    """
+    metrics_dir = results_dir / "metrics"
+    ensure_dir(metrics_dir)
+    output_path = metrics_dir / f"{name}_{get_timestamp()}.json"
+    with open(output_path, "w") as f:
+        json.dump(results, f, indent=2)
+    return output_path
+
+def save_csv(rows: List[Dict[str, Any]], name: str, results_dir: Path) -> Path:
+    """
+    Write flat benchmark rows as CSV under results/metrics.
+
+    Args:
+        rows: Dictionaries sharing the same keys, one per CSV row
+        name: Benchmark name used in the file name
+        results_dir: Project results directory
+
+    Returns:
+        Path of the written file
+    """
+    import csv
+
+    metrics_dir = results_dir / "metrics"
+    ensure_dir(metrics_dir)
+    output_path = metrics_dir / f"{name}_{get_timestamp()}.csv"
+    fieldnames = list(dict.fromkeys(key for row in rows for key in row))
+    with open(output_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+    return output_path
+
+def synthetic_image(size: Tuple[int, int] = (600, 450), seed: int = 0) -> Image.Image:
+    """
+    Create a reproducible random RGB image.
+
+    Args:
+        size: Image (width, height); defaults to the HAM10000 resolution
+        seed: Random seed
+
+    Returns:
+        PIL image
+    """
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 256, size=(size[1], size[0], 3), dtype=np.uint8)
+    return Image.fromarray(pixels)
+
+def labeled_sample_batches(config,
+                           logger: Optional[logging.Logger] = None,
+                           max_images: int = 256,
+                           batch_size: int = 32,
+                           split: str = 'val') -> Tuple[List[torch.Tensor], Optional[List[torch.Tensor]], str]:
+    """
+    Get preprocessed input batches, with labels when real data is available.
+
+    Uses the requested HAM10000 split when the dataset is available and
+    falls back to unlabeled synthetic inputs otherwise.
+
+    Args:
+        config: Configuration object
+        logger: Optional logger
+        max_images: Maximum number of images
+        batch_size: Images per batch
+        split: HAM10000 split to draw from ('train', 'val' or 'test')
+
+    Returns:
+        Tuple of (image batches, label batches or None, source name)
+    """
+    from data.dataloader import DataManager
+
+    logger = logger or logging.getLogger(__name__)
+    loader = DataManager(config, logger).get_split_loader(split, max_images=max_images, batch_size=batch_size)
+    if loader is not None:
+        images, labels = [], []
+        for batch_images, batch_labels in loader:
+            images.append(batch_images)
+            labels.append(torch.as_tensor(batch_labels))
+        return images, labels, f"ham10000_{split}"
+
+    logger.warning("HAM10000 data not available; using synthetic inputs")
+    generator = torch.Generator().manual_seed(config.seed)
+    height, width = config.image_size
+    batches = []
+    for start in range(0, max_images, batch_size):
+        count = min(batch_size, max_images - start)
+        batches.append(torch.randn(count, 3, height, width, generator=generator))
+    return batches, None, "synthetic"
+
+def sample_batches(config,
+                   logger: Optional[logging.Logger] = None,
+                   max_images: int = 256,
+                   batch_size: int = 32) -> Tuple[List[torch.Tensor], str]:
+    """
+    Get preprocessed validation input batches for parity checks.
+
+    Args:
+        config: Configuration object
+        logger: Optional logger
+        max_images: Maximum number of images
+        batch_size: Images per batch
+
+    Returns:
+        Tuple of (batches, source name)
+    """
+    batches, _, source = labeled_sample_batches(config, logger, max_images, batch_size)
+    return batches, source
+
+def benchmark_backend(backend: Callable[[torch.Tensor], Any],
+                      image_size: Tuple[int, int],
+                      batch_sizes: Tuple[int, ...] = (1, 8, 32),
+                      iterations: int = 50) -> Dict[str, Any]:
+    """
+    Measure latency and throughput of a backend at several batch sizes.
+
+    Args:
+        backend: Callable mapping an input batch to outputs
+        image_size: Input (height, width)
+        batch_sizes: Batch sizes to measure
+        iterations: Timed iterations per batch size
+
+    Returns:
+        Latency summary and images/sec keyed by batch size
+    """
+    results = {}
+    for batch_size in batch_sizes:
+        batch = torch.randn(batch_size, 3, image_size[0], image_size[1])
+        summary = summarize_latencies(time_callable(lambda: backend(batch), iterations=iterations, warmup=3))
+        summary["images_per_sec"] = batch_size / (summary["mean_ms"] / 1000.0)
+        results[str(batch_size)] = summary
+    return results
+
+def benchmark_preprocessing(config,
+                            logger: Optional[logging.Logger] = None,
+                            iterations: int = 200,
+                            source_size: Tuple[int, int] = (600, 450)) -> Dict[str, Any]:
+    """
+    Compare the torchvision inference transforms with the fused preprocessor.
+
+    Args:
+        config: Configuration object
+        logger: Optional logger
+        iterations: Timed iterations per variant
+        source_size: Synthetic input (width, height)
+
+    Returns:
+        Per-variant latency summaries and the maximum numerical difference
+    """
+    from data.dataloader import DataManager
+
+    logger = logger or logging.getLogger(__name__)
+    data_manager = DataManager(config, logger)
+    image = synthetic_image(source_size, seed=config.seed)
+
+    transform = data_manager.get_transforms(is_train=False)
+    preprocessor = data_manager.get_inference_preprocessor()
+
+    variants = {
+        # What /predict used to do: build the Compose on every request
+        "transforms_per_call": lambda: data_manager.get_transforms(is_train=False)(image),
+        "transforms_prebuilt": lambda: transform(image),
+        "fused_preprocessor": lambda: preprocessor(image)
+    }
+
+    results: Dict[str, Any] = {
+        "benchmark": "preprocessing",
+        "source_size": list(source_size),
+        "image_size": list(config.image_size),
+        "iterations": iterations,
+        "variants": {}
+    }
+    for name, fn in variants.items():
+        summary = summarize_latencies(time_callable(fn, iterations=iterations))
+        results["variants"][name] = summary
+        logger.info(f"{name:>22}: mean {summary['mean_ms']:.3f} ms | p50 {summary['p50_ms']:.3f} ms "
+                    f"| p99 {summary['p99_ms']:.3f} ms")
+
+    max_abs_diff = float((transform(image) - preprocessor(image)).abs().max())
+    results["max_abs_diff"] = max_abs_diff
+    logger.info(f"Max abs difference vs. torchvision transforms: {max_abs_diff:.2e}")
+
+    return results
+
+def benchmark_decode(config,
+                     logger: Optional[logging.Logger] = None,
+                     iterations: int = 20,
+                     source_sizes: Tuple[Tuple[int, int], ...] = ((600, 450), (3000, 2250), (6000, 4000))) -> Dict[str, Any]:
+    """
+    Compare full-resolution and reduced-scale JPEG decoding.
+
+    Args:
+        config: Configuration object
+        logger: Optional logger
+        iterations: Timed iterations per case
+        source_sizes: Synthetic JPEG (width, height) sizes to decode
+
+    Returns:
+        Per-size latency summaries and decoded pixel counts for both paths
+    """
+    from data.preprocessing import InferencePreprocessor, open_image
+
+    logger = logger or logging.getLogger(__name__)
+    preprocessor = InferencePreprocessor.from_config(config)
+
+    results: Dict[str, Any] = {
+        "benchmark": "decode",
+        "image_size": list(config.image_size),
+        "iterations": iterations,
+        "cases": []
+    }
+    for source_size in source_sizes:
+        buffer = io.BytesIO()
+        synthetic_image(source_size, seed=config.seed).save(buffer, format='JPEG', quality=90)
+        data = buffer.getvalue()
+
+        case: Dict[str, Any] = {"source_size": list(source_size), "jpeg_bytes": len(data)}
+        for name, decode_size in (("full_decode", None), ("reduced_decode", config.image_size)):
+            decoded = open_image(io.BytesIO(data), decode_size)
+            samples = time_callable(
+                lambda: preprocessor(open_image(io.BytesIO(data), decode_size)),
+                iterations=iterations,
+                warmup=2
+            )
+            case[name] = {
+                "decoded_size": list(decoded.size),
+                "decoded_pixels": decoded.size[0] * decoded.size[1],
+                **summarize_latencies(samples)
+            }
+
+        case["speedup"] = case["full_decode"]["mean_ms"] / case["reduced_decode"]["mean_ms"]
+        results["cases"].append(case)
+        logger.info(f"{source_size[0]}x{source_size[1]}: full {case['full_decode']['mean_ms']:.2f} ms | "
+                    f"reduced {case['reduced_decode']['mean_ms']:.2f} ms "
+                    f"(decoded at {case['reduced_decode']['decoded_size']}) | {case['speedup']:.1f}x")
+
+    return results
+
+def benchmark_backends(config,
+                       logger: Optional[logging.Logger] = None,
+                       iterations: int = 50,
+                       batch_sizes: Tuple[int, ...] = (1, 8, 32),
+                       model_names: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Compare eager PyTorch and ONNX Runtime on CPU for each supported model.
+
+    Every architecture is exported to a temporary ONNX file, checked for
+    top-k parity against eager PyTorch and timed at each batch size.
+
+    Args:
+        config: Configuration object
+        logger: Optional logger
+        iterations: Timed iterations per batch size
+        batch_sizes: Batch sizes to measure
+        model_names: Architectures to run (defaults to all supported models)
+
+    Returns:
+        Per-model parity and latency results for both backends
+    """
+    import tempfile
+    from models.model import ModelFactory
+    from models.export import export_onnx
+    from models.backends import TorchBackend, OnnxRuntimeBackend, compare_backends
+
+    logger = logger or logging.getLogger(__name__)
+    model_names = model_names or ModelFactory.SUPPORTED_MODELS
+    parity_batches = [torch.randn(8, 3, config.image_size[0], config.image_size[1],
+                                  generator=torch.Generator().manual_seed(config.seed))]
+
+    results: Dict[str, Any] = {
+        "benchmark": "backends",
+        "image_size": list(config.image_size),
+        "batch_sizes": list(batch_sizes),
+        "iterations": iterations,
+        "torch_threads": torch.get_num_threads(),
+        "models": {}
+    }
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for model_name in model_names:
+            logger.info(f"Benchmarking backends for {model_name}...")
+            try:
+                model = ModelFactory.create_model(model_name, num_classes=config.num_classes, pretrained=False).eval()
+                onnx_path = export_onnx(model, Path(tmp_dir) / f"{model_name}.onnx", config.image_size)
+
+                torch_backend = TorchBackend(model)
+                onnx_backend = OnnxRuntimeBackend(onnx_path, num_threads=config.onnx_num_threads)
+
+                entry = {
+                    "parity": compare_backends(torch_backend, onnx_backend, parity_batches),
+                    "torch": benchmark_backend(torch_backend, config.image_size, batch_sizes, iterations),
+                    "onnx": benchmark_backend(onnx_backend, config.image_size, batch_sizes, iterations)
+                }
+                for batch_size in entry["torch"]:
+                    speedup = entry["torch"][batch_size]["mean_ms"] / entry["onnx"][batch_size]["mean_ms"]
+                    logger.info(f"  batch {batch_size:>3}: torch {entry['torch'][batch_size]['mean_ms']:.2f} ms | "
+                                f"onnx {entry['onnx'][batch_size]['mean_ms']:.2f} ms | {speedup:.2f}x")
+                results["models"][model_name] = entry
+            except Exception as e:
+                logger.error(f"Backend benchmark failed for {model_name}: {e}")
+                results["models"][model_name] = {"error": str(e)}
+
+    return results
+
+def evaluate_quantization(float_model: torch.nn.Module,
+                          quantized_model: torch.nn.Module,
+                          config,
+                          logger: Optional[logging.Logger] = None,
+                          iterations: int = 30,
+                          max_images: int = 512) -> Dict[str, Any]:
+    """
+    Report accuracy, speed and size of a quantized model against its float original.
+
+    Args:
+        float_model: Float model in eval mode
+        quantized_model: Quantized model
+        config: Configuration object
+        logger: Optional logger
+        iterations: Timed iterations per batch size
+        max_images: Maximum number of evaluation images
+
+    Returns:
+        Dictionary with accuracy delta, prediction agreement, speedup and size reduction
+    """
+    from models.backends import TorchBackend, compare_backends
+    from models.quantization import serialized_size
+
+    logger = logger or logging.getLogger(__name__)
+    float_backend = TorchBackend(float_model)
+    quantized_backend = TorchBackend(quantized_model)
+
+    batches, labels, source = labeled_sample_batches(config, logger, max_images=max_images)
+    results: Dict[str, Any] = {
+        "benchmark": "quantization",
+        "evaluation_data": source,
+        "agreement": compare_backends(float_backend, quantized_backend, batches)
+    }
+
+    if labels is not None:
+        total = sum(int(batch_labels.numel()) for batch_labels in labels)
+        float_correct = sum(int((float_backend(images).argmax(dim=1) == batch_labels).sum())
+                            for images, batch_labels in zip(batches, labels))
+        quantized_correct = sum(int((quantized_backend(images).argmax(dim=1) == batch_labels).sum())
+                                for images, batch_labels in zip(batches, labels))
+        results["accuracy"] = {
+            "float": float_correct / total,
+            "int8": quantized_correct / total,
+            "delta": (quantized_correct - float_correct) / total
+        }
+        logger.info(f"Accuracy on {total} images: float {results['accuracy']['float']:.2%} | "
+                    f"int8 {results['accuracy']['int8']:.2%} | delta {results['accuracy']['delta']:+.2%}")
+
+    latency = {
+        "float": benchmark_backend(float_backend, config.image_size, (1, 8), iterations),
+        "int8": benchmark_backend(quantized_backend, config.image_size, (1, 8), iterations)
+    }
+    latency["speedup"] = {
+        batch_size: latency["float"][batch_size]["mean_ms"] / latency["int8"][batch_size]["mean_ms"]
+        for batch_size in latency["float"]
+    }
+    results["latency"] = latency
+
+    float_bytes = serialized_size(float_model)
+    quantized_bytes = serialized_size(quantized_model)
+    results["size"] = {
+        "float_bytes": float_bytes,
+        "int8_bytes": quantized_bytes,
+        "reduction": float_bytes / quantized_bytes if quantized_bytes else 0.0
+    }
+
+    logger.info(f"Top-1 agreement with float: {results['agreement']['top1_agreement']:.2%}")
+    for batch_size, speedup in latency["speedup"].items():
+        logger.info(f"Batch {batch_size}: {speedup:.2f}x faster")
+    logger.info(f"Weights: {float_bytes / 1e6:.1f} MB -> {quantized_bytes / 1e6:.1f} MB "
+                f"({results['size']['reduction']:.1f}x smaller)")
+
+    return results
+
+def benchmark_fast_math(config,
+                        logger: Optional[logging.Logger] = None,
+                        iterations: int = 30,
+                        batch_sizes: Tuple[int, ...] = (1, 8, 32),
+                        model_names: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Compare float32 NCHW, channels_last and channels_last + bf16 autocast on CPU.
+
+    Runs every convolutional backbone in ``ModelFactory.SUPPORTED_MODELS``
+    (vision transformers have no convolutions to benefit from channels_last)
+    and checks each variant's predictions against float32 NCHW.
+
+    Args:
+        config: Configuration object
+        logger: Optional logger
+        iterations: Timed iterations per batch size
+        batch_sizes: Batch sizes to measure
+        model_names: Architectures to run (defaults to all conv backbones)
+
+    Returns:
+        Per-model latency and accuracy for each variant
+    """
+    import copy
+    from models.model import ModelFactory
+    from models.backends import TorchBackend, compare_backends
+    from models.optimization import cpu_supports_bf16
+
+    logger = logger or logging.getLogger(__name__)
+    model_names = model_names or [name for name in ModelFactory.SUPPORTED_MODELS if not name.startswith('vit')]
+    batches, labels, source = labeled_sample_batches(config, logger, max_images=256)
+
+    results: Dict[str, Any] = {
+        "benchmark": "fast_math",
+        "bf16_supported": cpu_supports_bf16(),
+        "evaluation_data": source,
+        "batch_sizes": list(batch_sizes),
+        "iterations": iterations,
+        "torch_threads": torch.get_num_threads(),
+        "models": {}
+    }
+    for model_name in model_names:
+        logger.info(f"Benchmarking CPU fast math for {model_name}...")
+        try:
+            model = ModelFactory.create_model(model_name, num_classes=config.num_classes, pretrained=False).eval()
+            channels_last_model = copy.deepcopy(model).to(memory_format=torch.channels_last)
+
+            variants = {
+                "fp32": TorchBackend(model),
+                "channels_last": TorchBackend(channels_last_model, channels_last=True),
+                "channels_last_bf16": TorchBackend(channels_last_model, channels_last=True,
+                                                   autocast_dtype=torch.bfloat16)
+            }
+
+            entry: Dict[str, Any] = {}
+            for name, backend in variants.items():
+                variant = {"latency": benchmark_backend(backend, config.image_size, batch_sizes, iterations)}
+                if name != "fp32":
+                    variant["agreement"] = compare_backends(variants["fp32"], backend, batches)
+                if labels is not None:
+                    correct = sum(int((backend(images).argmax(dim=1) == batch_labels).sum())
+                                  for images, batch_labels in zip(batches, labels))
+                    variant["accuracy"] = correct / sum(int(batch_labels.numel()) for batch_labels in labels)
+                entry[name] = variant
+
+            for batch_size in entry["fp32"]["latency"]:
+                timings = " | ".join(f"{name} {entry[name]['latency'][batch_size]['mean_ms']:.2f} ms"
+                                     for name in variants)
+                logger.info(f"  batch {batch_size:>3}: {timings}")
+            results["models"][model_name] = entry
+        except Exception as e:
+            logger.error(f"Fast math benchmark failed for {model_name}: {e}")
+            results["models"][model_name] = {"error": str(e)}
+
+    return results
+
+# Code run in a fresh interpreter for each import-time case, from the project root
+IMPORT_CASES = {
+    "interpreter": "pass",
+    "config": "import src.config.config",
+    "helpers": "import src.utils.helpers",
+    "cli_help": None,
+    "api": "import api.inference_api",
+    "dataloader": "import src.data.dataloader",
+    "model": "import src.models.model",
+    "torch": "import torch"
+}
+
+def _import_command(config, code: Optional[str]) -> List[str]:
+    """Command line for one import-time case (None runs ``main.py --help``)."""
+    if code is None:
+        return [sys.executable, str(Path(config.base_dir) / "main.py"), "--help"]
+    return [sys.executable, "-c", code]
+
+def _slowest_imports(stderr: str, top: int = 10) -> List[Dict[str, Any]]:
+    """Parse ``python -X importtime`` output into the modules with the largest cumulative time."""
+    entries = []
+    for line in stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        entries.append({"module": parts[2].strip(), "cumulative_ms": int(parts[1]) / 1000.0})
+    return sorted(entries, key=lambda entry: entry["cumulative_ms"], reverse=True)[:top]
+
+def benchmark_imports(config,
+                      logger: Optional[logging.Logger] = None,
+                      iterations: int = 5,
+                      cases: Optional[Dict[str, Optional[str]]] = None) -> Dict[str, Any]:
+    """
+    Measure cold import and CLI startup times, each in a fresh interpreter.
+
+    Every run spawns a new Python process, so at most 10 runs are made per
+    case whatever ``iterations`` says. The slowest imports behind the API
+    are listed from ``python -X importtime``.
+
+    Args:
+        config: Configuration object
+        logger: Optional logger
+        iterations: Runs per case (capped at 10)
+        cases: Case name to Python code (defaults to IMPORT_CASES)
+
+    Returns:
+        Per-case wall-time summaries and the API's slowest imports
+    """
+    logger = logger or logging.getLogger(__name__)
+    cases = cases or IMPORT_CASES
+    runs = max(1, min(iterations, 10))
+
+    base_dir = Path(config.base_dir)
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(base_dir / "src"), str(base_dir), env.get("PYTHONPATH")]))
+
+    results: Dict[str, Any] = {
+        "benchmark": "imports",
+        "python": sys.version.split()[0],
+        "runs": runs,
+        "cases": {}
+    }
+    for name, code in cases.items():
+        command = _import_command(config, code)
+        samples = []
+        error = None
+        for _ in range(runs):
+            start = time.perf_counter()
+            completed = subprocess.run(command, cwd=base_dir, env=env, capture_output=True, text=True)
+            samples.append(time.perf_counter() - start)
+            if completed.returncode != 0:
+                error = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "failed"
+                break
+
+        if error is not None:
+            results["cases"][name] = {"error": error}
+            logger.warning(f"{name}: {error}")
+            continue
+        results["cases"][name] = summarize_latencies(samples)
+        logger.info(f"{name}: p50 {results['cases'][name]['p50_ms']:.0f} ms")
+
+    profile = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", cases.get("api") or IMPORT_CASES["api"]],
+        cwd=base_dir, env=env, capture_output=True, text=True
+    )
+    results["api_slowest_imports"] = _slowest_imports(profile.stderr)
+
+    return results
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB."""
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+def profile_model(model_name: str,
+                  num_classes: int,
+                  image_size: Tuple[int, int],
+                  batch_sizes: Tuple[int, ...],
+                  thread_counts: Tuple[int, ...],
+                  iterations: int) -> Dict[str, Any]:
+    """
+    Measure load time, latency and peak memory of one architecture in this process.
+
+    Meant to run in a fresh interpreter (see ``benchmark_models``) so that
+    peak RSS and load time are not skewed by previously loaded models.
+
+    Args:
+        model_name: Architecture from ``ModelFactory.SUPPORTED_MODELS``
+        num_classes: Number of output classes
+        image_size: Input (height, width)
+        batch_sizes: Batch sizes to measure
+        thread_counts: intra-op thread counts to measure
+        iterations: Timed iterations per case
+
+    Returns:
+        Load timings, peak RSS and a latency summary per thread count and batch size
+    """
+    baseline_rss_mb = _peak_rss_mb()
+    start = time.perf_counter()
+    from models.model import ModelFactory
+    import_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    model = ModelFactory.create_model(model_name, num_classes=num_classes, pretrained=False).eval()
+    load_s = time.perf_counter() - start
+    loaded_rss_mb = _peak_rss_mb()
+
+    def forward(batch: torch.Tensor) -> torch.Tensor:
+        with torch.inference_mode():
+            return model(batch)
+
+    cases = {}
+    for threads in thread_counts:
+        torch.set_num_threads(threads)
+        cases[str(threads)] = benchmark_backend(forward, image_size, batch_sizes, iterations)
+
+    info = ModelFactory.get_model_info(model_name, num_classes, tuple(image_size))
+    return {
+        "parameters": info["total_parameters"],
+        "gflops": info["gflops"],
+        "activation_mb": info["activation_mb"],
+        "import_s": import_s,
+        "load_s": load_s,
+        "baseline_rss_mb": baseline_rss_mb,
+        "loaded_rss_mb": loaded_rss_mb,
+        "peak_rss_mb": _peak_rss_mb(),
+        "threads": cases
+    }
+
+def _default_thread_counts() -> Tuple[int, ...]:
+    """1 thread, half the cores and all cores."""
+    cores = os.cpu_count() or 1
+    return tuple(sorted({1, max(1, cores // 2), cores}))
+
+def benchmark_models(config,
+                     logger: Optional[logging.Logger] = None,
+                     iterations: int = 50,
+                     batch_sizes: Tuple[int, ...] = (1, 8, 32),
+                     thread_counts: Optional[Tuple[int, ...]] = None,
+                     model_names: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Compare CPU latency, throughput, memory and load time of every supported architecture.
+
+    Each architecture is profiled in its own Python process, so peak RSS
+    and load time reflect that model alone. Results carry flat ``rows``
+    (one per model, thread count and batch size) for CSV export.
+
+    Args:
+        config: Configuration object
+        logger: Optional logger
+        iterations: Timed iterations per case
+        batch_sizes: Batch sizes to measure
+        thread_counts: intra-op thread counts (defaults to 1, half and all cores)
+        model_names: Architectures to run (defaults to all supported models)
+
+    Returns:
+        Per-model results and flat rows
+    """
+    from models.model import ModelFactory
+
+    logger = logger or logging.getLogger(__name__)
+    model_names = model_names or ModelFactory.SUPPORTED_MODELS
+    thread_counts = thread_counts or _default_thread_counts()
+
+    base_dir = Path(config.base_dir)
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(base_dir / "src"), env.get("PYTHONPATH")]))
+
+    results: Dict[str, Any] = {
+        "benchmark": "models",
+        "image_size": list(config.image_size),
+        "batch_sizes": list(batch_sizes),
+        "thread_counts": list(thread_counts),
+        "iterations": iterations,
+        "cpu_count": os.cpu_count(),
+        "torch_version": torch.__version__,
+        "models": {},
+        "rows": []
+    }
+    for model_name in model_names:
+        logger.info(f"Benchmarking {model_name}...")
+        arguments = json.dumps([model_name, config.num_classes, list(config.image_size),
+                                list(batch_sizes), list(thread_counts), iterations])
+        code = ("import json, sys; from utils.benchmark import profile_model; "
+                "print(json.dumps(profile_model(*json.loads(sys.argv[1]))))")
+        completed = subprocess.run([sys.executable, "-c", code, arguments],
+                                   cwd=base_dir, env=env, capture_output=True, text=True)
+        if completed.returncode != 0:
+            error = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "failed"
+            logger.error(f"Model benchmark failed for {model_name}: {error}")
+            results["models"][model_name] = {"error": error}
+            continue
+
+        entry = json.loads(completed.stdout.strip().splitlines()[-1])
+        results["models"][model_name] = entry
+        logger.info(f"  load {entry['load_s']:.2f} s | peak RSS {entry['peak_rss_mb']:.0f} MB")
+        for threads, by_batch in entry["threads"].items():
+            for batch_size, summary in by_batch.items():
+                results["rows"].append({
+                    "model": model_name,
+                    "threads": int(threads),
+                    "batch_size": int(batch_size),
+                    "p50_ms": summary["p50_ms"],
+                    "p95_ms": summary["p95_ms"],
+                    "p99_ms": summary["p99_ms"],
+                    "images_per_sec": summary["images_per_sec"],
+                    "peak_rss_mb": entry["peak_rss_mb"],
+                    "load_s": entry["load_s"],
+                    "parameters": entry["parameters"],
+                    "gflops": entry["gflops"]
+                })
+                logger.info(f"  {threads:>2} threads, batch {batch_size:>3}: p50 {summary['p50_ms']:.2f} ms | "
+                            f"p99 {summary['p99_ms']:.2f} ms | {summary['images_per_sec']:.1f} img/s")
+
+    return results
+
+# How a checkpoint is turned into a model in each checkpoint-loading case
+CHECKPOINT_LOAD_METHODS = ["init_and_copy", "mmap_pth", "safetensors"]
+
+def time_checkpoint_load(method: str, model_name: str, num_classes: int, checkpoint_path: str) -> Dict[str, Any]:
+    """
+    Load a checkpoint one way and measure time and peak memory in this process.
+
+    Meant to run in a fresh interpreter (see ``benchmark_checkpoint_loading``).
+
+    Args:
+        method: One of CHECKPOINT_LOAD_METHODS
+        model_name: Architecture the checkpoint belongs to
+        num_classes: Number of output classes
+        checkpoint_path: .pth checkpoint, or .safetensors for the safetensors method
+
+    Returns:
+        Load time, time to first read every weight and peak RSS
+    """
+    from models.model import ModelFactory, load_model
+
+    baseline_rss_mb = _peak_rss_mb()
+    start = time.perf_counter()
+    if method == "init_and_copy":
+        # What loading used to do: random initialisation, a full read, then a copy
+        model = ModelFactory.create_model(model_name, num_classes=num_classes, pretrained=False)
+        model.load_state_dict(torch.load(checkpoint_path, map_location='cpu')['model_state_dict'])
+    else:
+        model = load_model(model_name, checkpoint_path, num_classes)
+    load_s = time.perf_counter() - start
+
+    # Mapped pages are only read from disk when touched, as the first forward pass would
+    start = time.perf_counter()
+    with torch.no_grad():
+        for tensor in model.state_dict().values():
+            tensor.sum()
+    touch_s = time.perf_counter() - start
+
+    return {
+        "load_s": load_s,
+        "first_touch_s": touch_s,
+        "baseline_rss_mb": baseline_rss_mb,
+        "peak_rss_mb": _peak_rss_mb()
+    }
+
+def benchmark_checkpoint_loading(config,
+                                 logger: Optional[logging.Logger] = None,
+                                 iterations: int = 5,
+                                 model_names: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Compare model load time and peak memory for .pth and safetensors checkpoints.
+
+    Each load runs in a fresh Python process. The files were just written,
+    so they are usually in the page cache; this measures CPU and memory
+    cost rather than disk speed.
+
+    Args:
+        config: Configuration object
+        logger: Optional logger
+        iterations: Loads per method (capped at 5)
+        model_names: Architectures to run
+
+    Returns:
+        Per-model load time and peak RSS summaries for each method
+    """
+    import tempfile
+    from models.model import ModelFactory
+    from models.checkpoints import convert_to_safetensors
+
+    logger = logger or logging.getLogger(__name__)
+    model_names = model_names or ['efficientnet_b0', 'resnet50', 'vit_base_patch16_224']
+    runs = max(1, min(iterations, 5))
+
+    base_dir = Path(config.base_dir)
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(base_dir / "src"), env.get("PYTHONPATH")]))
+    code = ("import json, sys; from utils.benchmark import time_checkpoint_load; "
+            "print(json.dumps(time_checkpoint_load(*json.loads(sys.argv[1]))))")
+
+    results: Dict[str, Any] = {
+        "benchmark": "checkpoint_loading",
+        "runs": runs,
+        "models": {}
+    }
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for model_name in model_names:
+            logger.info(f"Benchmarking checkpoint loading for {model_name}...")
+            try:
+                pth_path = Path(tmp_dir) / f"{model_name}.pth"
+                model = ModelFactory.create_model(model_name, num_classes=config.num_classes, pretrained=False)
+                torch.save({'model_state_dict': model.state_dict()}, pth_path)
+                del model
+                paths = {"init_and_copy": pth_path, "mmap_pth": pth_path,
+                         "safetensors": convert_to_safetensors(pth_path)}
+
+                entry: Dict[str, Any] = {"checkpoint_mb": pth_path.stat().st_size / 1e6}
+                for method in CHECKPOINT_LOAD_METHODS:
+                    arguments = json.dumps([method, model_name, config.num_classes, str(paths[method])])
+                    samples = []
+                    for _ in range(runs):
+                        completed = subprocess.run([sys.executable, "-c", code, arguments], cwd=base_dir,
+                                                   env=env, capture_output=True, text=True, check=True)
+                        samples.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+                    entry[method] = {
+                        "load": summarize_latencies([sample["load_s"] for sample in samples]),
+                        "first_touch": summarize_latencies([sample["first_touch_s"] for sample in samples]),
+                        "peak_rss_mb": float(np.median([sample["peak_rss_mb"] for sample in samples])),
+                        "load_rss_mb": float(np.median([sample["peak_rss_mb"] - sample["baseline_rss_mb"]
+                                                        for sample in samples]))
+                    }
+                    logger.info(f"  {method:>13}: load p50 {entry[method]['load']['p50_ms']:.0f} ms | "
+                                f"peak RSS {entry[method]['peak_rss_mb']:.0f} MB")
+                results["models"][model_name] = entry
+            except Exception as e:
+                logger.error(f"Checkpoint loading benchmark failed for {model_name}: {e}")
+                results["models"][model_name] = {"error": str(e)}
+
+    return results
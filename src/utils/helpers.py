@@ -6,9 +6,6 @@ import os
 import sys
 import logging
 import random
-import numpy as np
-import torch
-import psutil
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
@@ -53,6 +50,10 @@ def set_seed(seed: int = 42) -> None:
     Args:
         seed: Random seed value
     """
+    # Heavy libraries are imported on first use so light CLI paths start fast
+    import numpy as np
+    import torch
+    
     random.seed(seed)
     np.random.seed(seed)
     torch.manual_seed(seed)
@@ -70,6 +71,9 @@ def get_system_info() -> dict:
     Returns:
         Dictionary containing system information
     """
+    import psutil
+    import torch
+    
     info = {
         "device": "cuda" if torch.cuda.is_available() else "cpu",
         "cpu_count": psutil.cpu_count(),
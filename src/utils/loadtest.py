@@ -0,0 +1,353 @@
+"""
+HTTP load testing for MIDAS system
+"""
+
+import asyncio
+import io
+import logging
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from utils.benchmark import summarize_latencies, synthetic_image
+
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png'}
+ENDPOINTS = ['/predict', '/batch_predict']
+
+@dataclass
+class RequestRecord:
+    """Outcome of one load-test request."""
+
+    sent_s: float
+    latency_s: float
+    status: int
+    images: int
+
+def load_payloads(image_dir: Optional[Path] = None,
+                  count: int = 32,
+                  source_size: Tuple[int, int] = (600, 450),
+                  seed: int = 0) -> List[bytes]:
+    """
+    Get encoded images to replay.
+
+    Args:
+        image_dir: Directory of sample lesion images (searched recursively);
+                   synthetic JPEGs are generated when not given
+        count: Maximum number of images
+        source_size: Synthetic image (width, height)
+        seed: Random seed for synthetic images
+
+    Returns:
+        Encoded image bytes
+
+    Raises:
+        FileNotFoundError: If image_dir contains no images
+    """
+    if image_dir is not None:
+        paths = sorted(p for p in Path(image_dir).rglob('*') if p.suffix.lower() in IMAGE_SUFFIXES)[:count]
+        if not paths:
+            raise FileNotFoundError(f"No images found in: {image_dir}")
+        return [path.read_bytes() for path in paths]
+
+    payloads = []
+    for index in range(count):
+        buffer = io.BytesIO()
+        synthetic_image(source_size, seed=seed + index).save(buffer, format='JPEG', quality=90)
+        payloads.append(buffer.getvalue())
+    return payloads
+
+def _upload(data: bytes, name: str, rng: random.Random, unique: bool) -> Tuple[str, bytes, str]:
+    """Multipart file tuple for one image."""
+    is_png = data.startswith(b'\x89PNG')
+    if unique:
+        # Decoders stop at the end-of-image marker, so trailing bytes leave the
+        # pixels unchanged but give every upload a new content hash, keeping
+        # the server's prediction cache from answering load-test requests
+        data = data + rng.getrandbits(128).to_bytes(16, 'big')
+    return (f"{name}.png" if is_png else f"{name}.jpg", data, "image/png" if is_png else "image/jpeg")
+
+async def _send(client: httpx.AsyncClient,
+                endpoint: str,
+                payloads: List[bytes],
+                batch_files: int,
+                rng: random.Random,
+                unique: bool,
+                origin: float) -> RequestRecord:
+    """Send one request and record its outcome."""
+    if endpoint == '/predict':
+        images = 1
+        files = {"file": _upload(rng.choice(payloads), "image", rng, unique)}
+    else:
+        images = batch_files
+        files = [("files", _upload(rng.choice(payloads), f"image_{i}", rng, unique)) for i in range(batch_files)]
+
+    sent = time.perf_counter()
+    try:
+        response = await client.post(endpoint, files=files)
+        status = response.status_code
+    except httpx.HTTPError:
+        status = 0
+    return RequestRecord(sent - origin, time.perf_counter() - sent, status, images)
+
+async def run_load(client: httpx.AsyncClient,
+                   payloads: List[bytes],
+                   endpoint: str = '/predict',
+                   duration_s: float = 30.0,
+                   concurrency: Optional[int] = 8,
+                   rate: Optional[float] = None,
+                   batch_files: int = 4,
+                   unique: bool = True,
+                   seed: int = 0) -> List[RequestRecord]:
+    """
+    Generate load against an endpoint for a fixed time.
+
+    With ``rate`` set, requests arrive as a Poisson process regardless of
+    how fast the server answers (open loop), which exposes queueing and
+    load shedding. Otherwise ``concurrency`` clients each send their next
+    request as soon as the previous one returns (closed loop).
+
+    Args:
+        client: HTTP client pointed at the API
+        payloads: Encoded images to replay
+        endpoint: '/predict' or '/batch_predict'
+        duration_s: How long to send requests for
+        concurrency: Closed-loop client count
+        rate: Open-loop arrival rate in requests/sec
+        batch_files: Images per /batch_predict request
+        unique: Make every upload unique so the prediction cache is bypassed
+        seed: Random seed for image choice and arrival times
+
+    Returns:
+        One record per request, including requests still in flight at the end
+    """
+    if endpoint not in ENDPOINTS:
+        raise ValueError(f"Endpoint {endpoint} not supported. Choose from {ENDPOINTS}")
+
+    rng = random.Random(seed)
+    origin = time.perf_counter()
+    end = origin + duration_s
+
+    if rate is not None:
+        tasks = []
+        arrival = origin
+        while True:
+            arrival += rng.expovariate(rate)
+            if arrival >= end:
+                break
+            await asyncio.sleep(max(0.0, arrival - time.perf_counter()))
+            tasks.append(asyncio.create_task(_send(client, endpoint, payloads, batch_files, rng, unique, origin)))
+        return list(await asyncio.gather(*tasks))
+
+    records: List[RequestRecord] = []
+
+    async def closed_loop_client() -> None:
+        while time.perf_counter() < end:
+            records.append(await _send(client, endpoint, payloads, batch_files, rng, unique, origin))
+
+    await asyncio.gather(*(closed_loop_client() for _ in range(concurrency or 1)))
+    return records
+
+def _status_rates(records: List[RequestRecord]) -> Dict[str, float]:
+    total = len(records) or 1
+    return {
+        "error_rate": sum(1 for r in records if not 200 <= r.status < 300) / total,
+        "rate_429": sum(1 for r in records if r.status == 429) / total,
+        "rate_503": sum(1 for r in records if r.status == 503) / total
+    }
+
+def summarize_records(records: List[RequestRecord],
+                      duration_s: float,
+                      warmup_s: float = 0.0,
+                      interval_s: float = 1.0) -> Dict[str, Any]:
+    """
+    Summarize load-test records overall and per time interval.
+
+    Requests sent during warmup are left out. Latency percentiles only
+    cover successful (2xx) responses.
+
+    Args:
+        records: Request records from ``run_load``
+        duration_s: Total load duration including warmup
+        warmup_s: Initial seconds to leave out
+        interval_s: Timeline bucket width
+
+    Returns:
+        Dictionary with the overall summary and a timeline of intervals
+    """
+    measured = [r for r in records if r.sent_s >= warmup_s]
+    window_s = max(duration_s - warmup_s, 1e-9)
+    succeeded = [r for r in measured if 200 <= r.status < 300]
+
+    summary: Dict[str, Any] = {
+        "requests": len(measured),
+        "succeeded": len(succeeded),
+        "images": sum(r.images for r in succeeded),
+        "throughput_rps": len(succeeded) / window_s,
+        "images_per_sec": sum(r.images for r in succeeded) / window_s,
+        **_status_rates(measured),
+        "status_counts": dict(sorted(Counter(str(r.status) for r in measured).items())),
+        "latency": summarize_latencies([r.latency_s for r in succeeded]) if succeeded else {}
+    }
+
+    buckets: Dict[int, List[RequestRecord]] = {}
+    for record in measured:
+        buckets.setdefault(int((record.sent_s - warmup_s) // interval_s), []).append(record)
+
+    timeline = []
+    for index in sorted(buckets):
+        bucket = buckets[index]
+        ok = [r for r in bucket if 200 <= r.status < 300]
+        latency = summarize_latencies([r.latency_s for r in ok]) if ok else {}
+        timeline.append({
+            "t_s": warmup_s + index * interval_s,
+            "requests": len(bucket),
+            "throughput_rps": len(ok) / interval_s,
+            "p50_ms": latency.get("p50_ms"),
+            "p95_ms": latency.get("p95_ms"),
+            "p99_ms": latency.get("p99_ms"),
+            **_status_rates(bucket)
+        })
+
+    return {"summary": summary, "timeline": timeline}
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout_s: float = 300.0) -> Dict[str, Any]:
+    """
+    Poll /ready until the API can serve predictions.
+
+    Args:
+        client: HTTP client pointed at the API
+        timeout_s: Maximum time to wait
+
+    Returns:
+        The /ready response body
+
+    Raises:
+        TimeoutError: If the API is not ready in time
+    """
+    deadline = time.perf_counter() + timeout_s
+    while True:
+        try:
+            response = await client.get("/ready")
+            if response.status_code == 200:
+                return response.json()
+            detail = response.json().get("detail")
+        except httpx.HTTPError as e:
+            detail = str(e)
+        if time.perf_counter() > deadline:
+            raise TimeoutError(f"API not ready after {timeout_s:.0f} s: {detail}")
+        await asyncio.sleep(0.5)
+
+async def _load_test(config,
+                     logger: logging.Logger,
+                     url: Optional[str],
+                     payloads: List[bytes],
+                     allow_untrained: bool,
+                     ready_timeout_s: float,
+                     timeout_s: float,
+                     **load) -> Tuple[List[RequestRecord], Dict[str, Any]]:
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=load.get("concurrency") or 100)
+    if url is not None:
+        async with httpx.AsyncClient(base_url=url, timeout=timeout_s, limits=limits) as client:
+            ready_info = await wait_until_ready(client, ready_timeout_s)
+            logger.info(f"Generating load against {url}...")
+            return await run_load(client, payloads, **load), ready_info
+
+    from api import inference_api
+
+    # Serve the same settings the caller configured
+    inference_api.config = config
+    if allow_untrained:
+        inference_api.config.serve_untrained_model = True
+
+    # ASGITransport does not send lifespan events, so run the app's lifespan here
+    app = inference_api.app
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://midas",
+                                     timeout=timeout_s, limits=limits) as client:
+            ready_info = await wait_until_ready(client, ready_timeout_s)
+            logger.info("Generating load against the in-process app...")
+            return await run_load(client, payloads, **load), ready_info
+
+def load_test(config,
+              logger: Optional[logging.Logger] = None,
+              url: Optional[str] = None,
+              endpoint: str = '/predict',
+              concurrency: int = 8,
+              rate: Optional[float] = None,
+              duration_s: float = 30.0,
+              warmup_s: float = 5.0,
+              batch_files: int = 4,
+              image_dir: Optional[Path] = None,
+              unique: bool = True,
+              allow_untrained: bool = False,
+              interval_s: float = 1.0,
+              ready_timeout_s: float = 300.0,
+              timeout_s: float = 30.0) -> Dict[str, Any]:
+    """
+    Load test the API in-process or at a URL and summarize the results.
+
+    The in-process app shares the CPU and event loop with the load
+    generator, which suits quick comparisons between changes; capacity
+    numbers should come from a separately running instance (``url``).
+
+    Args:
+        config: Configuration object
+        logger: Optional logger
+        url: Base URL of a running instance (defaults to an in-process app)
+        endpoint: '/predict' or '/batch_predict'
+        concurrency: Closed-loop client count (ignored when rate is set)
+        rate: Open-loop arrival rate in requests/sec
+        duration_s: Measured duration, after warmup
+        warmup_s: Initial load duration left out of the results
+        batch_files: Images per /batch_predict request
+        image_dir: Directory of sample lesion images (synthetic images otherwise)
+        unique: Make every upload unique so the prediction cache is bypassed
+        allow_untrained: Let the in-process app serve randomly initialised weights
+        interval_s: Timeline bucket width
+        ready_timeout_s: Maximum time to wait for /ready
+        timeout_s: Per-request timeout
+
+    Returns:
+        Run settings, overall summary and per-interval timeline
+    """
+    logger = logger or logging.getLogger(__name__)
+    payloads = load_payloads(image_dir, seed=config.seed)
+    total_s = warmup_s + duration_s
+
+    records, ready_info = asyncio.run(_load_test(
+        config, logger, url, payloads, allow_untrained, ready_timeout_s, timeout_s,
+        endpoint=endpoint, duration_s=total_s, concurrency=None if rate else concurrency,
+        rate=rate, batch_files=batch_files, unique=unique, seed=config.seed
+    ))
+
+    results: Dict[str, Any] = {
+        "benchmark": "loadtest",
+        "target": url or "in-process",
+        "model_versions": ready_info.get("model_versions", {}),
+        "endpoint": endpoint,
+        "mode": "open" if rate else "closed",
+        "concurrency": None if rate else concurrency,
+        "rate": rate,
+        "duration_s": duration_s,
+        "warmup_s": warmup_s,
+        "batch_files": batch_files if endpoint == '/batch_predict' else 1,
+        "images": "sample" if image_dir else "synthetic",
+        "unique_uploads": unique,
+        **summarize_records(records, total_s, warmup_s, interval_s)
+    }
+
+    summary = results["summary"]
+    latency = summary["latency"]
+    logger.info(f"{summary['requests']} requests | {summary['throughput_rps']:.1f} req/s | "
+                f"{summary['images_per_sec']:.1f} img/s | errors {summary['error_rate']:.1%} | "
+                f"429 {summary['rate_429']:.1%} | 503 {summary['rate_503']:.1%}")
+    if latency:
+        logger.info(f"Latency p50 {latency['p50_ms']:.1f} ms | p95 {latency['p95_ms']:.1f} ms | "
+                    f"p99 {latency['p99_ms']:.1f} ms")
+    return results
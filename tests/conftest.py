@@ -0,0 +1,81 @@
+"""
+Shared fixtures for MIDAS tests
+"""
+
+import io
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator
+
+import pytest
+import torch
+from PIL import Image
+
+# Tests import modules the same way the API does
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from config.config import MIDASConfig
+from api.deployments import Deployment, DeploymentRouter
+
+NUM_CLASSES = 7
+
+def image_bytes(seed: int = 0, size=(64, 48), format: str = "JPEG") -> bytes:
+    """Encode a small random RGB image."""
+    pixels = torch.randint(0, 256, (size[1], size[0], 3), generator=torch.Generator().manual_seed(seed),
+                           dtype=torch.uint8).numpy()
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format=format)
+    return buffer.getvalue()
+
+def tiny_backend(batch: torch.Tensor) -> torch.Tensor:
+    """Deterministic stand-in for a model: logits from each image's channel means."""
+    means = batch.mean(dim=(2, 3))
+    return torch.cat([means, -means, means[:, :1]], dim=1)[:, :NUM_CLASSES]
+
+@pytest.fixture
+def test_config(tmp_path) -> MIDASConfig:
+    """Config with small limits, no warmup and an empty registry."""
+    config = MIDASConfig()
+    config.registry_dir = tmp_path / "registry"
+    config.models_dir = tmp_path / "models"
+    config.warmup_enabled = False
+    config.registry_poll_interval_s = 0
+    config.image_size = (32, 32)
+    config.inference_max_wait_ms = 1.0
+    return config
+
+@pytest.fixture
+def api(test_config, monkeypatch):
+    """
+    The inference API module, serving a tiny deterministic backend.
+
+    Use ``async with api_client(api) as client`` inside a test to run the
+    app's startup/shutdown and talk to it in-process.
+    """
+    from api import inference_api
+
+    def load_deployments(current, routing):
+        deployment = Deployment("test", "tiny", "tiny:test", tiny_backend)
+        return {deployment.version: deployment}, {deployment.version: 1.0}
+
+    monkeypatch.setattr(inference_api, "config", test_config)
+    monkeypatch.setattr(inference_api, "router", DeploymentRouter())
+    monkeypatch.setattr(inference_api, "registry", None)
+    monkeypatch.setattr(inference_api, "applied_routing", None)
+    monkeypatch.setattr(inference_api, "ready", False)
+    monkeypatch.setattr(inference_api, "load_deployments", load_deployments)
+    return inference_api
+
+@asynccontextmanager
+async def api_client(inference_api) -> AsyncIterator["httpx.AsyncClient"]:
+    """Run the app's lifespan and yield an httpx client bound to it, once ready."""
+    import httpx
+    from utils.loadtest import wait_until_ready
+
+    app = inference_api.app
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://midas", timeout=30) as client:
+            await wait_until_ready(client, timeout_s=30)
+            yield client
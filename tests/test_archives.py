@@ -0,0 +1,70 @@
+"""
+Tests for streaming archive extraction
+"""
+
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from data.archives import ArchiveLimitError, iter_archive_images
+
+def make_zip(entries) -> io.BytesIO:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, data in entries:
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+def make_tar(entries) -> io.BytesIO:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, data in entries:
+            info = tarfile.TarInfo(name)
+            if data is None:
+                info.type = tarfile.DIRTYPE
+                archive.addfile(info)
+            else:
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+    buffer.seek(0)
+    return buffer
+
+@pytest.mark.parametrize("make_archive", [make_zip, make_tar])
+def test_yields_only_images(make_archive):
+    entries = [("a.jpg", b"1"), ("notes.txt", b"2"), ("__MACOSX/._a.jpg", b"3"), (".hidden.png", b"4"),
+               ("dir/b.PNG", b"5")]
+    assert list(iter_archive_images(make_archive(entries))) == [("a.jpg", b"1"), ("dir/b.PNG", b"5")]
+
+@pytest.mark.parametrize("make_archive", [make_zip, make_tar])
+def test_non_image_members_count_toward_entry_limit(make_archive):
+    entries = [(f"junk_{i}.txt", b"x") for i in range(10)] + [("a.jpg", b"1")]
+    with pytest.raises(ArchiveLimitError):
+        list(iter_archive_images(make_archive(entries), max_entries=5))
+
+def test_tar_directories_count_toward_entry_limit():
+    entries = [(f"dir_{i}", None) for i in range(10)]
+    with pytest.raises(ArchiveLimitError):
+        list(iter_archive_images(make_tar(entries), max_entries=5))
+
+@pytest.mark.parametrize("make_archive", [make_zip, make_tar])
+def test_total_size_limit_uses_decompressed_bytes(make_archive):
+    entries = [("a.jpg", b"\0" * 1000), ("b.jpg", b"\0" * 1000)]
+    images = iter_archive_images(make_archive(entries), max_total_bytes=1500)
+    assert next(images)[0] == "a.jpg"
+    with pytest.raises(ArchiveLimitError):
+        next(images)
+
+def test_tar_members_are_not_cached():
+    fileobj = make_tar([(f"{i}.jpg", b"x") for i in range(20)])
+    images = iter_archive_images(fileobj)
+    for _ in range(20):
+        next(images)
+    frame = images.gi_frame
+    assert len(frame.f_locals["archive"].members) == 0
+
+def test_rejects_other_files():
+    with pytest.raises(ValueError):
+        list(iter_archive_images(io.BytesIO(b"plain bytes, not an archive")))
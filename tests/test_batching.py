@@ -0,0 +1,114 @@
+"""
+Tests for dynamic micro-batching
+"""
+
+import asyncio
+import threading
+
+import pytest
+import torch
+
+from api.batching import MicroBatcher
+
+class RecordingBackend:
+    """Doubles its input and records the size of every batch it sees."""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        self.batch_sizes.append(batch.shape[0])
+        return batch * 2
+
+def test_concurrent_requests_share_one_forward():
+    backend = RecordingBackend()
+
+    async def run():
+        batcher = MicroBatcher(backend, max_batch_size=8, max_wait_ms=50.0)
+        batcher.start()
+        try:
+            return await asyncio.gather(*(batcher.submit(torch.full((1, 2, 2), float(i))) for i in range(5)))
+        finally:
+            await batcher.stop()
+
+    outputs = asyncio.run(run())
+    assert backend.batch_sizes == [5]
+    assert [output[0, 0, 0].item() for output in outputs] == [0.0, 2.0, 4.0, 6.0, 8.0]
+
+def test_batches_are_capped_at_max_batch_size():
+    backend = RecordingBackend()
+
+    async def run():
+        batcher = MicroBatcher(backend, max_batch_size=4, max_wait_ms=50.0)
+        batcher.start()
+        try:
+            await asyncio.gather(*(batcher.submit(torch.zeros(1, 2, 2)) for _ in range(10)))
+        finally:
+            await batcher.stop()
+
+    asyncio.run(run())
+    assert sum(backend.batch_sizes) == 10
+    assert max(backend.batch_sizes) == 4
+
+def test_backend_errors_reach_every_caller_in_the_batch():
+    def failing(batch):
+        raise ValueError("forward failed")
+
+    async def run():
+        batcher = MicroBatcher(failing, max_batch_size=4, max_wait_ms=20.0)
+        batcher.start()
+        try:
+            return await asyncio.gather(*(batcher.submit(torch.zeros(1, 2, 2)) for _ in range(3)),
+                                        return_exceptions=True)
+        finally:
+            await batcher.stop()
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+
+def test_submit_requires_a_running_batcher():
+    async def run():
+        batcher = MicroBatcher(RecordingBackend())
+        with pytest.raises(RuntimeError):
+            await batcher.submit(torch.zeros(1, 2, 2))
+
+    asyncio.run(run())
+
+def test_stop_fails_queued_and_in_flight_requests():
+    release = threading.Event()
+
+    def blocking(batch):
+        release.wait(5)
+        return batch
+
+    async def run():
+        batcher = MicroBatcher(blocking, max_batch_size=1, max_wait_ms=0.0)
+        batcher.start()
+        # The first request occupies the forward pass, so the second stays queued
+        first = asyncio.ensure_future(batcher.submit(torch.zeros(1, 2, 2)))
+        await asyncio.sleep(0.05)
+        second = asyncio.ensure_future(batcher.submit(torch.zeros(1, 2, 2)))
+        while batcher.queue_size == 0:
+            await asyncio.sleep(0.01)
+        await batcher.stop()
+        release.set()
+        return await asyncio.wait_for(asyncio.gather(first, second, return_exceptions=True), 1.0)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results), results
+
+def test_stop_fails_requests_in_the_collect_window():
+    backend = RecordingBackend()
+
+    async def run():
+        batcher = MicroBatcher(backend, max_batch_size=8, max_wait_ms=1000.0)
+        batcher.start()
+        request = asyncio.ensure_future(batcher.submit(torch.zeros(1, 2, 2)))
+        while batcher.queue_size or not batcher._batch:
+            await asyncio.sleep(0.01)
+        await batcher.stop()
+        return await asyncio.wait_for(asyncio.gather(request, return_exceptions=True), 1.0)
+
+    (result,) = asyncio.run(run())
+    assert isinstance(result, RuntimeError)
+    assert backend.batch_sizes == []
@@ -0,0 +1,108 @@
+"""
+Tests for the prediction cache
+"""
+
+import asyncio
+
+import pytest
+
+from api.cache import PredictionCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def test_concurrent_misses_share_one_computation():
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"prediction": "nv"}
+
+    async def run():
+        cache = PredictionCache()
+        results = await asyncio.gather(*(cache.get_or_compute("key", compute) for _ in range(10)))
+        return cache, results
+
+    cache, results = asyncio.run(run())
+    assert calls == 1
+    assert results == [{"prediction": "nv"}] * 10
+    assert cache.coalesced == 9
+    assert cache.stats()["inflight"] == 0
+    assert cache.get("key") == {"prediction": "nv"}
+
+def test_cancelled_caller_does_not_cancel_shared_computation():
+    async def compute():
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def run():
+        cache = PredictionCache()
+        first = asyncio.ensure_future(cache.get_or_compute("key", compute))
+        second = asyncio.ensure_future(cache.get_or_compute("key", compute))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == "value"
+
+def test_failed_computation_is_not_cached():
+    async def fail():
+        raise ValueError("boom")
+
+    async def succeed():
+        return "value"
+
+    async def run():
+        cache = PredictionCache()
+        with pytest.raises(ValueError):
+            await cache.get_or_compute("key", fail)
+        return await cache.get_or_compute("key", succeed)
+
+    assert asyncio.run(run()) == "value"
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = PredictionCache(ttl_s=10.0, clock=clock)
+    cache.put("key", "value")
+    clock.now += 9.0
+    assert cache.get("key") == "value"
+    clock.now += 2.0
+    assert cache.get("key") is None
+    assert cache.expirations == 1
+    assert cache.stats()["entries"] == 0
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache = PredictionCache(max_entries=2, sizeof=lambda value: len(value))
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.evictions == 1
+
+    cache = PredictionCache(max_bytes=10, sizeof=lambda value: len(value))
+    cache.put("a", "x" * 6)
+    cache.put("b", "y" * 6)
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 6
+
+def test_oversized_value_replaces_the_old_entry():
+    cache = PredictionCache(max_bytes=10, sizeof=lambda value: len(value))
+    cache.put("key", "old")
+    cache.put("key", "x" * 20)
+    assert cache.get("key") is None
+    assert cache.stats()["bytes"] == 0
+
+def test_keys_depend_on_contents_and_model():
+    key = PredictionCache.make_key(b"image", "model:v1")
+    assert key == PredictionCache.make_key(b"image", "model:v1")
+    assert key != PredictionCache.make_key(b"image", "model:v2")
+    assert key != PredictionCache.make_key(b"other", "model:v1")
+    assert key != PredictionCache.make_key(b"image", "model:v1", "tta")
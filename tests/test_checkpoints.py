@@ -0,0 +1,42 @@
+"""
+Tests for checkpoint formats and the background checkpoint writer
+"""
+
+import torch
+import torch.nn as nn
+
+from models.checkpoints import CheckpointWriter, convert_to_safetensors, read_state_dict
+
+def test_writer_keeps_last_checkpoints_and_best(tmp_path):
+    model = nn.Linear(4, 2)
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.1)
+    with CheckpointWriter(tmp_path / "checkpoints", keep_last=2) as writer:
+        for epoch, loss in enumerate([1.0, 0.5, 0.8, 0.9]):
+            writer.save(model, optimizer, epoch, loss)
+
+    names = sorted(path.name for path in (tmp_path / "checkpoints").iterdir())
+    assert names == ["best_model.pth", "checkpoint_epoch_2.pth", "checkpoint_epoch_3.pth"]
+    best = torch.load(tmp_path / "checkpoints" / "best_model.pth")
+    assert best["epoch"] == 1 and best["loss"] == 0.5
+
+def test_writer_snapshots_state_at_save_time(tmp_path):
+    model = nn.Linear(4, 2)
+    with CheckpointWriter(tmp_path, keep_last=0) as writer:
+        path = writer.save(model, None, 0, 1.0)
+        expected = model.weight.detach().clone()
+        with torch.no_grad():
+            model.weight.add_(1.0)
+
+    state_dict, extra = read_state_dict(path)
+    assert torch.equal(state_dict["weight"], expected)
+    assert extra["epoch"] == 0
+
+def test_safetensors_round_trip(tmp_path):
+    model = nn.Linear(4, 2)
+    torch.save({"model_state_dict": model.state_dict(), "epoch": 3}, tmp_path / "model.pth")
+    output_path = convert_to_safetensors(tmp_path / "model.pth")
+
+    state_dict, metadata = read_state_dict(output_path)
+    assert metadata["epoch"] == "3"
+    for name, tensor in model.state_dict().items():
+        assert torch.equal(state_dict[name], tensor)
@@ -0,0 +1,107 @@
+"""
+Tests for admission control and backpressure
+"""
+
+import asyncio
+
+import pytest
+
+from conftest import api_client, image_bytes
+from api.concurrency import AdmissionController, ServerBusyError
+
+async def hold(admission: AdmissionController, release: asyncio.Event) -> None:
+    async with admission.slot():
+        await release.wait()
+
+def test_rejects_when_wait_queue_is_full():
+    async def run():
+        admission = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout_s=5.0, retry_after=7)
+        release = asyncio.Event()
+        holders = [asyncio.ensure_future(hold(admission, release)) for _ in range(2)]
+        while admission.waiting == 0:
+            await asyncio.sleep(0.01)
+
+        with pytest.raises(ServerBusyError) as excinfo:
+            async with admission.slot():
+                pass
+        assert excinfo.value.retry_after == 7
+        assert admission.active == 1
+
+        release.set()
+        await asyncio.gather(*holders)
+        assert admission.active == 0
+
+    asyncio.run(run())
+
+def test_rejects_after_queue_timeout():
+    async def run():
+        admission = AdmissionController(max_concurrency=1, max_queue=4, queue_timeout_s=0.05)
+        async with admission.slot():
+            with pytest.raises(ServerBusyError):
+                async with admission.slot():
+                    pass
+        assert admission.waiting == 0
+        assert admission.active == 0
+
+    asyncio.run(run())
+
+def test_permit_granted_after_giving_up_is_returned():
+    async def run():
+        admission = AdmissionController(max_concurrency=1)
+        # The acquire succeeds, but the waiter has already timed out
+        acquire = asyncio.ensure_future(admission._semaphore.acquire())
+        await asyncio.sleep(0)
+        assert acquire.done() and admission._semaphore.locked()
+        admission._abandon(acquire)
+        await asyncio.sleep(0)
+        return admission._semaphore.locked()
+
+    assert asyncio.run(run()) is False
+
+def test_timeouts_under_churn_keep_full_capacity():
+    async def worker(admission):
+        try:
+            async with admission.slot():
+                await asyncio.sleep(0.001)
+        except ServerBusyError:
+            pass
+
+    async def run():
+        admission = AdmissionController(max_concurrency=2, max_queue=100, queue_timeout_s=0.001)
+        await asyncio.gather(*(worker(admission) for _ in range(300)))
+        await asyncio.sleep(0.01)
+        return admission
+
+    admission = asyncio.run(run())
+    assert admission.active == 0 and admission.waiting == 0
+    assert admission._semaphore._value == 2
+
+def test_queued_request_gets_the_freed_slot():
+    order = []
+
+    async def worker(admission, name):
+        async with admission.slot():
+            order.append(name)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        admission = AdmissionController(max_concurrency=1, max_queue=4, queue_timeout_s=5.0)
+        await asyncio.gather(*(worker(admission, i) for i in range(3)))
+
+    asyncio.run(run())
+    assert sorted(order) == [0, 1, 2]
+
+def test_saturated_api_returns_503_with_retry_after(api, test_config):
+    test_config.inference_max_concurrency = 1
+    test_config.inference_max_queue = 0
+    test_config.inference_retry_after_s = 3
+
+    async def run():
+        async with api_client(api) as client:
+            async with api.admission.slot():
+                files = [("files", ("a.jpg", image_bytes(), "image/jpeg"))]
+                return await client.post("/batch_predict", files=files)
+
+    response = asyncio.run(run())
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "3"
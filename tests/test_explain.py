@@ -0,0 +1,61 @@
+"""
+Tests for the Grad-CAM explanation endpoint
+"""
+
+import asyncio
+
+import torch
+import torch.nn as nn
+
+from conftest import NUM_CLASSES, api_client, image_bytes
+from api.deployments import Deployment
+
+class TinyBase(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.conv = nn.Conv2d(3, 4, 3, padding=1)
+        self.classifier = nn.Linear(4, NUM_CLASSES)
+
+    def forward_features(self, x):
+        return torch.relu(self.conv(x))
+
+    def forward_head(self, x):
+        return self.classifier(x.mean(dim=(2, 3)))
+
+    def forward(self, x):
+        return self.forward_head(self.forward_features(x))
+
+class TinyModel(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.base_model = TinyBase()
+
+    def forward(self, x):
+        return self.base_model(x)
+
+def test_explain_decodes_uploads_and_caches_heatmaps(api):
+    model = TinyModel().eval()
+
+    async def run():
+        async with api_client(api) as client:
+            await api.activate({"cam": Deployment("cam", "tiny", "tiny:cam", model, model)}, {"cam": 1.0})
+            files = [
+                ("files", ("a.jpg", image_bytes(0), "image/jpeg")),
+                ("files", ("notes.txt", b"not an image", "text/plain")),
+                ("files", ("broken.jpg", b"not a jpeg", "image/jpeg")),
+            ]
+            first = await client.post("/explain", files=files, params={"classes": ["MEL", "NV"]})
+            hits = api.explanation_cache.hits
+            second = await client.post("/explain", files=files[:1], params={"classes": ["MEL", "NV"]})
+            await asyncio.gather(*api.draining)
+            return first, second, api.explanation_cache.hits - hits
+
+    first, second, hits = asyncio.run(run())
+    assert first.status_code == 200
+    results = first.json()["results"]
+    assert [entry["class"] for entry in results[0]["explanations"]] == ["MEL", "NV"]
+    assert results[0]["explanations"][0]["heatmap"].startswith("data:image/png;base64,")
+    assert results[1]["error"] == "File must be an image"
+    assert "error" in results[2]
+    assert second.json()["results"][0]["explanations"] == results[0]["explanations"]
+    assert hits == 2
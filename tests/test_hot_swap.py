@@ -0,0 +1,54 @@
+"""
+Tests for hot swapping model deployments under load
+"""
+
+import asyncio
+
+from conftest import api_client, image_bytes, tiny_backend
+from api.deployments import Deployment
+
+class ClosableBackend:
+    """Tiny backend that fails once closed, like an ensemble after its pool shuts down."""
+
+    def __init__(self):
+        self.closed = False
+
+    def __call__(self, batch):
+        if self.closed:
+            raise RuntimeError("backend is closed")
+        return tiny_backend(batch)
+
+    def close(self):
+        self.closed = True
+
+def test_request_queued_for_admission_survives_hot_swap(api, test_config):
+    test_config.inference_max_concurrency = 1
+    test_config.inference_queue_timeout_s = 10.0
+
+    async def run():
+        async with api_client(api) as client:
+            old = api.router.choose()
+            old.backend = ClosableBackend()
+
+            # Occupy the only slot so the request below waits in the admission queue
+            async with api.admission.slot():
+                files = [("files", ("a.jpg", image_bytes(), "image/jpeg"))]
+                request = asyncio.ensure_future(client.post("/batch_predict", files=files))
+                while api.admission.waiting == 0:
+                    await asyncio.sleep(0.01)
+
+                new = Deployment("v2", "tiny", "tiny:v2", tiny_backend)
+                await api.activate({"v2": new}, {"v2": 1.0})
+                await asyncio.sleep(0.05)
+                assert not old.backend.closed
+
+            response = await request
+            await asyncio.gather(*api.draining)
+            return response, old
+
+    response, old = asyncio.run(run())
+    assert response.status_code == 200
+    body = response.json()
+    assert body["model_version"] == "test"
+    assert "prediction" in body["results"][0], body
+    assert old.backend.closed
@@ -0,0 +1,30 @@
+"""
+Tests for the HTTP load-test harness
+"""
+
+from utils import loadtest
+from utils.loadtest import RequestRecord, summarize_records
+
+def test_in_process_load_test_runs_app_lifespan(api, test_config):
+    results = loadtest.load_test(test_config, concurrency=2, duration_s=0.5, warmup_s=0.1,
+                                 ready_timeout_s=30)
+    summary = results["summary"]
+    assert results["target"] == "in-process"
+    assert results["model_versions"] == {"test": 1.0}
+    assert summary["succeeded"] > 0
+    assert summary["error_rate"] == 0.0
+
+def test_summarize_records_skips_warmup_and_counts_statuses():
+    records = [
+        RequestRecord(sent_s=0.5, latency_s=0.1, status=200, images=1),
+        RequestRecord(sent_s=1.2, latency_s=0.2, status=200, images=1),
+        RequestRecord(sent_s=1.5, latency_s=0.3, status=429, images=1),
+        RequestRecord(sent_s=2.5, latency_s=0.4, status=503, images=1)
+    ]
+    results = summarize_records(records, duration_s=3.0, warmup_s=1.0)
+    summary = results["summary"]
+    assert summary["requests"] == 3
+    assert summary["succeeded"] == 1
+    assert summary["rate_429"] == summary["rate_503"] == 1 / 3
+    assert summary["status_counts"] == {"200": 1, "429": 1, "503": 1}
+    assert [bucket["requests"] for bucket in results["timeline"]] == [2, 1]
@@ -0,0 +1,27 @@
+"""
+Tests for the fast inference preprocessor
+"""
+
+import pytest
+import torch
+from PIL import Image
+
+from data.dataloader import DataManager
+
+@pytest.mark.parametrize("mode", ["RGB", "RGBA", "L"])
+@pytest.mark.parametrize("size", [(64, 48), (20, 30), (32, 32)])
+def test_inference_preprocessor_matches_eval_transforms(test_config, mode, size):
+    manager = DataManager(test_config)
+    reference = manager.get_transforms(is_train=False)
+    preprocessor = manager.get_inference_preprocessor()
+
+    channels = len(mode)
+    pixels = torch.randint(0, 256, (size[1], size[0], channels), generator=torch.Generator().manual_seed(channels),
+                           dtype=torch.uint8).numpy()
+    image = Image.fromarray(pixels.squeeze(-1) if channels == 1 else pixels, mode)
+
+    # Training and evaluation load images as RGB before transforming them
+    expected = reference(image.convert("RGB"))
+    actual = preprocessor(image)
+    assert actual.shape == expected.shape == (3, *test_config.image_size)
+    torch.testing.assert_close(actual, expected, atol=1e-5, rtol=0)
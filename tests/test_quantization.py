@@ -0,0 +1,43 @@
+"""
+Tests for INT8 quantization
+"""
+
+import torch
+import torch.nn as nn
+
+from models.quantization import quantize_model
+
+class TinyBase(nn.Module):
+    def __init__(self, traceable: bool = True):
+        super().__init__()
+        self.traceable = traceable
+        self.features = nn.Sequential(nn.Conv2d(3, 4, 3), nn.ReLU(), nn.AdaptiveAvgPool2d(1), nn.Flatten())
+        self.classifier = nn.Linear(4, 7)
+
+    def forward(self, x):
+        features = self.features(x)
+        if not self.traceable and features.sum() > 0:
+            # Data-dependent control flow cannot be FX-traced
+            features = features * 2
+        return self.classifier(features)
+
+class TinyModel(nn.Module):
+    def __init__(self, traceable: bool = True):
+        super().__init__()
+        self.base_model = TinyBase(traceable)
+
+    def forward(self, x):
+        return self.base_model(x)
+
+def calibration():
+    return [torch.randn(2, 3, 16, 16) for _ in range(2)]
+
+def test_static_quantization_records_mode():
+    quantized = quantize_model(TinyModel().eval(), 'static', calibration())
+    assert quantized.quantization_mode == 'static'
+    assert quantized(torch.randn(1, 3, 16, 16)).shape == (1, 7)
+
+def test_static_fallback_is_reported_as_dynamic():
+    quantized = quantize_model(TinyModel(traceable=False).eval(), 'static', calibration())
+    assert quantized.quantization_mode == 'dynamic'
+    assert quantized(torch.randn(1, 3, 16, 16)).shape == (1, 7)
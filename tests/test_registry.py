@@ -0,0 +1,121 @@
+"""
+Tests for the model registry and A/B routing
+"""
+
+import asyncio
+import os
+import shutil
+from collections import Counter
+
+import pytest
+
+from conftest import api_client, image_bytes, tiny_backend
+from api import inference_api
+from api.deployments import Deployment, DeploymentRouter
+from models.registry import ModelRegistry
+
+@pytest.fixture
+def registry(tmp_path) -> ModelRegistry:
+    checkpoint = tmp_path / "model.pth"
+    checkpoint.write_bytes(b"weights")
+    registry = ModelRegistry(tmp_path / "registry")
+    registry.register(checkpoint, "efficientnet_b0", version="v1")
+    registry.register(checkpoint, "efficientnet_b0", version="v2")
+    return registry
+
+def deployment(version: str) -> Deployment:
+    return Deployment(version, "tiny", f"tiny:{version}", tiny_backend)
+
+def test_routing_defaults_to_latest_version(registry):
+    assert [v.version for v in registry.list_versions()] == ["v1", "v2"]
+    assert registry.get_routing() == {"v2": 1.0}
+
+def test_set_routing_validates_and_drops_zero_weights(registry):
+    assert registry.set_routing({"v1": 0.9, "v2": 0.1}) == {"v1": 0.9, "v2": 0.1}
+    assert registry.set_routing({"v1": 1, "v2": 0}) == {"v1": 1.0}
+    assert registry.get_routing() == {"v1": 1.0}
+
+    with pytest.raises(KeyError):
+        registry.set_routing({"v3": 1.0})
+    with pytest.raises(ValueError):
+        registry.set_routing({"v1": -1.0, "v2": 2.0})
+    with pytest.raises(ValueError):
+        registry.set_routing({"v1": 0.0})
+    assert registry.get_routing() == {"v1": 1.0}
+
+def test_register_rejects_taken_or_invalid_versions(registry, tmp_path):
+    checkpoint = tmp_path / "model.pth"
+    with pytest.raises(ValueError):
+        registry.register(checkpoint, "efficientnet_b0", version="v1")
+    with pytest.raises(ValueError):
+        registry.register(checkpoint, "efficientnet_b0", version="../escape")
+    with pytest.raises(KeyError):
+        registry.get("../escape")
+
+def test_router_splits_traffic_by_weight():
+    router = DeploymentRouter()
+    router.swap({"v1": deployment("v1"), "v2": deployment("v2")}, {"v1": 0.8, "v2": 0.2})
+    counts = Counter(router.choose().version for _ in range(2000))
+    assert 0.7 < counts["v1"] / 2000 < 0.9
+    assert router.choose("v2").version == "v2"
+
+def test_router_keeps_zero_weight_versions_pinnable():
+    router = DeploymentRouter()
+    router.swap({"v1": deployment("v1"), "v2": deployment("v2")}, {"v1": 1.0})
+    assert {router.choose().version for _ in range(50)} == {"v1"}
+    assert router.choose("v2").version == "v2"
+    with pytest.raises(KeyError):
+        router.choose("v3")
+
+def test_router_swap_returns_retired_deployments():
+    router = DeploymentRouter()
+    v1, v2 = deployment("v1"), deployment("v2")
+    assert router.swap({"v1": v1}, {"v1": 1.0}) == []
+    assert router.swap({"v1": v1, "v2": v2}, {"v2": 1.0}) == []
+    assert router.swap({"v2": deployment("v2")}, {"v2": 1.0}) == [v1, v2]
+
+def test_api_routes_pinned_versions(api):
+    async def run():
+        async with api_client(api) as client:
+            await api.activate({"v1": deployment("v1"), "v2": deployment("v2")}, {"v1": 1.0})
+            files = [("files", ("a.jpg", image_bytes(), "image/jpeg"))]
+            default = await client.post("/batch_predict", files=files)
+            pinned = await client.post("/batch_predict", files=files, headers={"X-Model-Version": "v2"})
+            missing = await client.post("/batch_predict", files=files, headers={"X-Model-Version": "v3"})
+            await asyncio.gather(*api.draining)
+            return default, pinned, missing
+
+    default, pinned, missing = asyncio.run(run())
+    assert default.json()["model_version"] == "v1"
+    assert pinned.json()["model_version"] == "v2"
+    assert missing.status_code == 404
+
+def test_cached_results_keep_the_serving_version(api):
+    async def run():
+        async with api_client(api) as client:
+            # The same checkpoint registered twice loads with the same model_id
+            v1 = Deployment("v1", "tiny", "tiny:same", tiny_backend)
+            v2 = Deployment("v2", "tiny", "tiny:same", tiny_backend)
+            await api.activate({"v1": v1, "v2": v2}, {"v1": 1.0})
+            files = {"file": ("a.jpg", image_bytes(), "image/jpeg")}
+            first = await client.post("/predict", files=files)
+            second = await client.post("/predict", files=files, headers={"X-Model-Version": "v2"})
+            await asyncio.gather(*api.draining)
+            return first, second
+
+    first, second = asyncio.run(run())
+    assert first.json()["model_version"] == "v1"
+    assert second.json()["model_version"] == "v2"
+
+def test_file_identity_follows_contents(tmp_path):
+    first = tmp_path / "model.pth"
+    first.write_bytes(b"weights-a")
+    copy = tmp_path / "copy" / "model.pth"
+    copy.parent.mkdir()
+    shutil.copy2(first, copy)
+    assert inference_api.file_identity(first) == inference_api.file_identity(copy)
+
+    stat = first.stat()
+    copy.write_bytes(b"weights-b")
+    os.utime(copy, (stat.st_atime, stat.st_mtime))
+    assert inference_api.file_identity(first) != inference_api.file_identity(copy)
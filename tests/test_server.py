@@ -0,0 +1,62 @@
+"""
+Tests for multi-process worker supervision
+"""
+
+import os
+
+from api import inference_api, server
+from api.server import RestartPolicy
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_fast_failures_back_off_exponentially_then_give_up():
+    clock = FakeClock()
+    policy = RestartPolicy(base_delay_s=1.0, max_delay_s=4.0, min_uptime_s=10.0, max_fast_failures=5, clock=clock)
+    delays = []
+    for _ in range(5):
+        policy.started(0)
+        clock.now += 1.0
+        delays.append(policy.failed(0))
+    assert delays == [1.0, 2.0, 4.0, 4.0, None]
+
+def test_long_lived_worker_resets_failure_count():
+    clock = FakeClock()
+    policy = RestartPolicy(base_delay_s=1.0, min_uptime_s=10.0, max_fast_failures=3, clock=clock)
+    policy.started(0)
+    clock.now += 1.0
+    assert policy.failed(0) == 1.0
+    policy.started(0)
+    clock.now += 60.0
+    assert policy.failed(0) == 0.0
+    policy.started(0)
+    clock.now += 1.0
+    assert policy.failed(0) == 1.0
+
+def test_slots_are_tracked_separately():
+    clock = FakeClock()
+    policy = RestartPolicy(base_delay_s=1.0, min_uptime_s=10.0, clock=clock)
+    policy.started(0)
+    policy.started(1)
+    assert policy.failed(0) == 1.0
+    assert policy.failed(0) == 2.0
+    assert policy.failed(1) == 1.0
+
+def test_cuda_device_serves_in_a_single_process(test_config, monkeypatch):
+    test_config.device = "cuda"
+    test_config.api_workers = 4
+    runs = []
+    # serve() installs the config on the API module; restore it afterwards
+    monkeypatch.setattr(inference_api, "config", inference_api.config)
+    monkeypatch.setattr(server.uvicorn, "run", lambda app, **kwargs: runs.append(kwargs))
+    monkeypatch.setattr(os, "fork", lambda: (_ for _ in ()).throw(AssertionError("forked")), raising=False)
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR", raising=False)
+
+    server.serve(test_config)
+
+    assert runs == [{"host": test_config.api_host, "port": test_config.api_port, "log_level": "info"}]
+    assert "PROMETHEUS_MULTIPROC_DIR" not in os.environ
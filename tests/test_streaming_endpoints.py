@@ -0,0 +1,66 @@
+"""
+Tests for the streaming prediction endpoints
+"""
+
+import asyncio
+import io
+import json
+import zipfile
+
+from conftest import api_client, image_bytes
+
+def parse_lines(response) -> list:
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+def test_batch_predict_stream_classifies_every_upload(api):
+    async def run():
+        async with api_client(api) as client:
+            files = [("files", (f"image_{i}.jpg", image_bytes(i), "image/jpeg")) for i in range(3)]
+            return await client.post("/batch_predict/stream", files=files)
+
+    response = asyncio.run(run())
+    assert response.status_code == 200
+    assert response.headers["x-model-version"] == "test"
+    lines = sorted(parse_lines(response), key=lambda line: line["index"])
+    assert [line["index"] for line in lines] == [0, 1, 2]
+    assert all("prediction" in line for line in lines), lines
+    assert [line["filename"] for line in lines] == ["image_0.jpg", "image_1.jpg", "image_2.jpg"]
+
+def test_batch_predict_stream_handles_many_uploads_and_bad_files(api):
+    async def run():
+        async with api_client(api) as client:
+            files = [("files", (f"image_{i}.png", image_bytes(i, format="PNG"), "image/png")) for i in range(40)]
+            files.append(("files", ("notes.txt", b"not an image", "text/plain")))
+            return await client.post("/batch_predict/stream", files=files)
+
+    response = asyncio.run(run())
+    lines = {line["index"]: line for line in parse_lines(response)}
+    assert len(lines) == 41
+    assert all("prediction" in lines[index] for index in range(40))
+    assert lines[40]["error"] == "File must be an image"
+
+def test_archive_predict_streams_zip_entries(api):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for i in range(5):
+            archive.writestr(f"lesions/image_{i}.jpg", image_bytes(i))
+        archive.writestr("lesions/", b"")
+
+    async def run():
+        async with api_client(api) as client:
+            files = {"archive": ("lesions.zip", buffer.getvalue(), "application/zip")}
+            return await client.post("/archive_predict", files=files)
+
+    response = asyncio.run(run())
+    assert response.status_code == 200
+    lines = parse_lines(response)
+    assert sorted(line["filename"] for line in lines) == [f"lesions/image_{i}.jpg" for i in range(5)]
+    assert all("prediction" in line for line in lines), lines
+
+def test_archive_predict_requires_archive_part(api):
+    async def run():
+        async with api_client(api) as client:
+            return await client.post("/archive_predict", files={"other": ("a.jpg", image_bytes(), "image/jpeg")})
+
+    response = asyncio.run(run())
+    assert response.status_code == 400